@@ -0,0 +1,708 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite.
+Drives the same membership, pagination, cache and polling code the app uses
+against the local fake Spotify API in fake_spotify.py, and reports:
+  - cold start time (network catalog fetch vs. on-disk cache)
+  - UI import time, which must not pull in spotipy (see main.py --profile-startup)
+  - membership check latency by playlist size (first check vs. cached snapshot)
+  - reverse index build/resync cost, memory and "which playlists have this track" latency
+  - playlist catalog refresh and per-keystroke search time for large libraries
+  - bulk add of a whole album: requests per phase and tracks written per request
+  - streaming dedupe of a large playlist: requests, time and peak memory vs. loading it whole
+  - Liked Songs indicator: requests per track change with batched, prefetched lookups
+  - prefetch for upcoming tracks: how often the button and heart are known as a track starts
+  - MPRIS playback events: track-change latency and Web API requests (needs jeepney and dbus-daemon)
+  - ETag response cache: bytes and time to re-read an unchanged catalog and playlist, with and without it
+  - headless daemon command throughput over its Unix socket
+  - multi-account polling: fairness and 429 handling under a shared budget, memory per account
+  - monitor requests per hour (adaptive scheduler vs. the old fixed 2s poll)
+  - peak Python memory per scenario
+
+Runs without network or a display:
+  python benchmark.py --latency 0.03 --sizes 100 1000 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from bulk_add import bulk_add, collect
+from cache_store import CacheStore
+from catalog import PlaylistCatalog
+from daemon import DaemonClient, PlaylistDaemon
+from dedupe import dedupe, find_duplicates
+from engine import PlaylistEngine
+from fake_spotify import FakeSpotifyServer, FakeSpotifyState, fake_client
+from membership import MembershipIndex
+from multi_account import MultiAccountEngine
+from mutation_queue import MutationQueue
+from pagination import fetch_all_pages
+from scheduler import FIXED_INTERVAL, PollScheduler
+
+
+class _Measure:
+    """
+    Context manager recording wall time, and peak traced memory when trace=True.
+    Tracing slows Python down several times over (the fake server runs in-process
+    too), so timings are taken from untraced runs and memory from separate traced ones.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.peak_bytes = None
+
+    def __enter__(self):
+        if self.trace:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        if self.trace:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def bench_cold_start(args, workdir):
+    """Time to a populated playlist menu: full catalog fetch vs. reading cache.db."""
+    state = FakeSpotifyState(playlists=args.playlists, tracks_per_playlist=1,
+                             latency=args.latency, rate_limit_ratio=args.rate_limit)
+    with FakeSpotifyServer(state) as server:
+        sp = fake_client(server)
+        def fetch():
+            items = fetch_all_pages(lambda offset: sp.current_user_playlists(limit=50, offset=offset), page_size=50)
+            return [(p['name'], p['id']) for p in items]
+
+        with _Measure() as network:
+            playlists = fetch()
+        requests = state.requests
+        with _Measure(trace=True) as network_memory:
+            fetch()
+
+    store = CacheStore(os.path.join(workdir, 'cold_start.db'))
+    store.save_playlists(playlists)
+    with _Measure() as cached:
+        cached_playlists = CacheStore(os.path.join(workdir, 'cold_start.db')).load_playlists()
+    assert cached_playlists == playlists
+    with _Measure(trace=True) as cached_memory:
+        CacheStore(os.path.join(workdir, 'cold_start.db')).load_playlists()
+
+    return {
+        'playlists': len(playlists),
+        'network_seconds': network.seconds,
+        'network_requests': requests,
+        'network_peak_bytes': network_memory.peak_bytes,
+        'cached_seconds': cached.seconds,
+        'cached_peak_bytes': cached_memory.peak_bytes,
+    }
+
+
+def bench_imports(args):
+    """Time a fresh interpreter importing the UI modules, and check spotipy stays unloaded."""
+    code = ("import time; t = time.perf_counter(); import main; "
+            "import sys, json; print(json.dumps([time.perf_counter() - t, 'spotipy' in sys.modules]))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True,
+                                text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'main_import_seconds': min(seconds for seconds, _ in runs),
+        'spotipy_imported': any(loaded for _, loaded in runs),
+    }
+
+
+def bench_membership(args, workdir):
+    """Membership check latency for each playlist size, first check and with a cached snapshot."""
+    results = []
+    for size in args.sizes:
+        state = FakeSpotifyState(playlists=1, big_playlist_tracks=size,
+                                 latency=args.latency, rate_limit_ratio=args.rate_limit)
+        playlist_id = state.playlist_order[0]
+        last_track = state.playlists[playlist_id]['tracks'][-1]
+        with FakeSpotifyServer(state) as server:
+            sp = fake_client(server)
+            index = MembershipIndex(CacheStore(os.path.join(workdir, f'membership_{size}.db')))
+
+            with _Measure() as cold:
+                assert index.contains(sp, playlist_id, last_track)
+            cold_requests = state.requests
+            with _Measure(trace=True) as cold_memory:
+                assert MembershipIndex().contains(sp, playlist_id, last_track)
+
+            state.reset_counters()
+            with _Measure() as warm:
+                for _ in range(args.repeat):
+                    assert index.contains(sp, playlist_id, last_track)
+            warm_requests = state.requests / args.repeat
+
+        results.append({
+            'tracks': size,
+            'first_check_seconds': cold.seconds,
+            'first_check_requests': cold_requests,
+            'first_check_peak_bytes': cold_memory.peak_bytes,
+            'cached_check_seconds': warm.seconds / args.repeat,
+            'cached_check_requests': warm_requests,
+        })
+    return results
+
+
+def bench_reverse_index(args):
+    """Index every playlist, resync with one changed snapshot, and time reverse lookups."""
+    state = FakeSpotifyState(playlists=args.index_playlists, tracks_per_playlist=args.index_tracks,
+                             latency=args.latency, rate_limit_ratio=args.rate_limit)
+    with FakeSpotifyServer(state) as server:
+        sp = fake_client(server)
+        index = MembershipIndex()
+
+        def catalog():
+            items = fetch_all_pages(lambda offset: sp.current_user_playlists(limit=50, offset=offset), page_size=50)
+            return [(p['id'], p['snapshot_id']) for p in items]
+
+        with _Measure() as build:
+            index.sync(sp, catalog())
+        build_requests = state.requests
+
+        # One playlist changes elsewhere: only it should be rescanned
+        changed = state.playlist_order[len(state.playlist_order) // 2]
+        state.playlist_add(changed, ['spotify:track:fakeresyncedtrack0001'])
+        state.reset_counters()
+        with _Measure() as resync:
+            rescanned = index.sync(sp, catalog())
+        resync_requests = state.requests
+
+    # Memory held by the index itself, rebuilt offline from the same data
+    with _Measure(trace=True) as index_memory:
+        rebuilt = MembershipIndex()
+        for playlist_id in state.playlist_order:
+            rebuilt.store(playlist_id, state.snapshot_id(playlist_id), state.playlists[playlist_id]['tracks'])
+        index_bytes = tracemalloc.get_traced_memory()[0]
+
+    track_id = state.playlists[state.playlist_order[0]]['tracks'][-1]
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        found = index.playlists_containing(track_id)
+    lookup_seconds = (time.perf_counter() - started) / args.repeat
+
+    return dict(index.stats(), **{
+        'build_seconds': build.seconds,
+        'build_requests': build_requests,
+        'index_bytes': index_bytes,
+        'resync_seconds': resync.seconds,
+        'resync_requests': resync_requests,
+        'resync_rescanned': len(rescanned),
+        'lookup_seconds': lookup_seconds,
+        'lookup_matches': len(found),
+    })
+
+
+def bench_catalog(args):
+    """Catalog build, diffed refresh and type-ahead search over a large library."""
+    names = ['Road Trip', 'Chill Vibes', 'Workout', 'Late Night', 'Focus', 'Indie Mix', 'Jazz Classics']
+    playlists = [(f"{names[i % len(names)]} {i}", f"pl{i:020d}") for i in range(args.catalog_playlists)]
+
+    with _Measure() as build:
+        catalog = PlaylistCatalog(playlists)
+
+    # A typical refresh: one playlist renamed, one added
+    refreshed = list(playlists)
+    refreshed[len(refreshed) // 2] = ("Renamed", refreshed[len(refreshed) // 2][1])
+    refreshed.append(("Brand New", "pl-new"))
+    with _Measure() as refresh:
+        diff = catalog.update(refreshed)
+
+    query = "late nig 1"
+    keystrokes = []
+    for length in range(1, len(query) + 1):
+        with _Measure() as keystroke:
+            matches = catalog.search(query[:length])
+        keystrokes.append(keystroke.seconds)
+
+    return {
+        'playlists': len(refreshed),
+        'build_seconds': build.seconds,
+        'refresh_seconds': refresh.seconds,
+        'refresh_changes': len(diff['added']) + len(diff['removed']) + len(diff['renamed']),
+        'query': query,
+        'keystroke_max_seconds': max(keystrokes),
+        'keystroke_mean_seconds': sum(keystrokes) / len(keystrokes),
+        'final_matches': len(matches),
+    }
+
+
+def bench_bulk_add(args, workdir):
+    """Add a large album to a playlist that already holds some of it, counting requests per phase."""
+    state = FakeSpotifyState(playlists=1, tracks_per_playlist=args.bulk_existing,
+                             album_tracks=args.bulk_tracks, latency=args.latency)
+    playlist_id = state.playlist_order[0]
+    before = len(state.playlists[playlist_id]['tracks'])
+    with FakeSpotifyServer(state) as server:
+        sp = fake_client(server)
+        membership = MembershipIndex()
+        mutations = MutationQueue(CacheStore(os.path.join(workdir, 'bulk_add.db')), sp, membership, batch_delay=0)
+        with _Measure() as measure:
+            track_ids = collect(sp, 'album')
+            collect_requests = state.requests
+            queued, skipped = bulk_add(sp, membership, mutations, playlist_id, track_ids)
+            mutations.wait(playlist_id, queued)
+        mutations.stop()
+    added = len(queued)
+    assert len(state.playlists[playlist_id]['tracks']) == before + added
+    return {
+        'candidates': len(track_ids),
+        'added': added,
+        'skipped': skipped,
+        'seconds': measure.seconds,
+        'collect_requests': collect_requests,
+        'write_requests': mutations.requests,
+        'total_requests': state.requests,
+    }
+
+
+def bench_dedupe(args):
+    """Find and remove duplicates in a large playlist; compare peak memory with loading it whole."""
+    size = args.dedupe_tracks
+    state = FakeSpotifyState(playlists=1, big_playlist_tracks=size, latency=args.latency)
+    playlist_id = state.playlist_order[0]
+    tracks = state.playlists[playlist_id]['tracks']
+    # Every 20th track is repeated later on; every 50th has a re-release under a new ID
+    for i in range(0, size, 20):
+        tracks.append(tracks[i])
+    for i in range(10, size, 50):
+        state.isrcs[f"alias{i:017d}"] = state.isrc(tracks[i])
+        tracks.append(f"alias{i:017d}")
+    expected = len(tracks) - size
+
+    with FakeSpotifyServer(state) as server:
+        sp = fake_client(server)
+        with _Measure(trace=True) as streamed:
+            found = sum(1 for _ in find_duplicates(sp, [playlist_id]))
+        with _Measure(trace=True) as whole:
+            items = fetch_all_pages(lambda offset: sp.playlist_items(playlist_id, limit=100, offset=offset),
+                                    page_size=100)
+            del items
+
+        state.reset_counters()
+        with _Measure() as measure:
+            removed = len(dedupe(sp, playlist_id, apply=True))
+        requests = dict(state.requests_by_endpoint)
+    assert found == removed == expected and len(state.playlists[playlist_id]['tracks']) == size
+    return {
+        'tracks': size + expected,
+        'duplicates': removed,
+        'seconds': measure.seconds,
+        'requests': sum(requests.values()),
+        'streaming_peak_bytes': streamed.peak_bytes,
+        'whole_playlist_peak_bytes': whole.peak_bytes,
+    }
+
+
+def bench_liked(args, workdir):
+    """Play through tracks and count the extra requests the Liked Songs indicator costs."""
+    state = FakeSpotifyState(playlists=1, latency=args.latency)
+    changes = []
+    with FakeSpotifyServer(state) as server:
+        engine = PlaylistEngine(sp=fake_client(server), cache=CacheStore(os.path.join(workdir, 'liked.db')),
+                                on_liked=lambda track_id, liked: changes.append(track_id))
+        engine.start(monitor=False, load_playlists=False)
+        state.reset_counters()
+        for i in range(args.liked_tracks):
+            engine.poll_playback()
+            while len(changes) <= i:  # Wait for the lookup before skipping ahead
+                time.sleep(0.001)
+            state.advance(state.track_duration_ms / 1000 + 0.5)
+        engine.stop()
+        requests = dict(state.requests_by_endpoint)
+    extra = sum(count for endpoint, count in requests.items() if endpoint != 'me/player')
+    return {
+        'tracks': args.liked_tracks,
+        'extra_requests': extra,
+        'requests_per_track': extra / args.liked_tracks,
+        'cache': engine.liked.stats(),
+    }
+
+
+def bench_prefetch(args, workdir):
+    """Play through tracks and check the button and heart state are known the moment each one starts."""
+    state = FakeSpotifyState(playlists=1, latency=args.latency)
+    known = []  # (membership known, liked known) when on_track_changed fired
+
+    def on_track_changed(track_id, label):
+        known.append((engine.known_membership(playlist_id, track_id) is not None,
+                      engine.liked.get(track_id) is not None))
+
+    with FakeSpotifyServer(state) as server:
+        engine = PlaylistEngine(sp=fake_client(server), cache=CacheStore(os.path.join(workdir, 'prefetch.db')),
+                                on_track_changed=on_track_changed, on_liked=lambda track_id, liked: None)
+        playlist_id = engine.selected_playlist_id = state.playlist_order[0]
+        engine.start(monitor=False, load_playlists=False)
+        state.reset_counters()
+        for _ in range(args.prefetch_tracks):
+            engine.poll_playback()
+            for work_queue in (engine.work_queue, engine.index_queue):
+                done = threading.Event()
+                work_queue.submit(None, done.set)  # Runs once the prefetch (and any index build) has finished
+                done.wait()
+            state.advance(state.track_duration_ms / 1000 + 0.5)
+        engine.stop()
+        requests = dict(state.requests_by_endpoint)
+    extra = sum(count for endpoint, count in requests.items() if endpoint != 'me/player')
+    # The first track can't have been prefetched
+    warm = known[1:]
+    return {
+        'tracks': args.prefetch_tracks,
+        'membership_ready': sum(m for m, _ in warm) / len(warm),
+        'liked_ready': sum(l for _, l in warm) / len(warm),
+        'extra_requests': extra,
+        'requests_per_track': extra / args.prefetch_tracks,
+        'prefetch': engine.stats()['prefetch'],
+    }
+
+
+def bench_mpris(args, workdir):
+    """Skip tracks on a fake desktop client and time how fast the engine hears about it."""
+    import mpris
+    if not mpris.available():
+        return {'skipped': "jeepney is not installed"}
+    from fake_mpris import FakeMprisPlayer, private_session_bus
+
+    if not shutil.which('dbus-daemon'):
+        return {'skipped': "dbus-daemon is not installed"}
+
+    state = FakeSpotifyState(playlists=1, latency=args.latency)
+    changes = []
+    with private_session_bus() as address, FakeSpotifyServer(state) as server:
+        player = FakeMprisPlayer(address)
+        engine = PlaylistEngine(sp=fake_client(server), cache=CacheStore(os.path.join(workdir, 'mpris.db')),
+                                on_track_changed=lambda track_id, label: changes.append(time.perf_counter()),
+                                playback_source='mpris', mpris_bus=address)
+        engine.start(load_playlists=False)
+        state.reset_counters()
+        latencies = []
+        for _ in range(args.mpris_changes):
+            seen = len(changes)
+            player.next()
+            while len(changes) == seen:
+                time.sleep(0.0001)
+            latencies.append(changes[-1] - player.changed_at)
+        player.set_playing(False)
+        time.sleep(args.mpris_idle_seconds)  # Paused: nothing should be polled
+        requests = state.requests
+        engine.stop()
+        player.quit()
+    return {
+        'changes': len(latencies),
+        'mean_latency_seconds': sum(latencies) / len(latencies),
+        'max_latency_seconds': max(latencies),
+        'web_requests': requests,
+        'idle_seconds': args.mpris_idle_seconds,
+    }
+
+
+def bench_http_cache(args):
+    """Refresh the playlist list and re-read a large playlist twice, with and without the ETag cache."""
+    from spotify_auth import build_session
+
+    state = FakeSpotifyState(playlists=args.playlists, big_playlist_tracks=args.sizes[-1], latency=args.latency)
+    playlist_id = state.playlist_order[0]
+    results = {}
+    with FakeSpotifyServer(state) as server:
+        for name, http in (('cached', {}), ('uncached', {'etag_cache_entries': 0})):
+            session = build_session(http)
+            sp = fake_client(server, session)
+
+            def refresh():
+                fetch_all_pages(lambda offset: sp.current_user_playlists(limit=50, offset=offset), page_size=50)
+                fetch_all_pages(lambda offset: sp.playlist_items(playlist_id, limit=100, offset=offset),
+                                page_size=100)
+
+            refresh()  # First read fills the cache
+            state.reset_counters()
+            with _Measure() as measure:
+                refresh()
+            results[name] = {'seconds': measure.seconds, 'bytes': state.bytes_sent,
+                             'requests': state.requests, 'not_modified': state.not_modified}
+            if session.cache:
+                results['cache'] = session.cache.stats()
+    return results
+
+
+def bench_daemon(args, workdir):
+    """Commands per second through the headless daemon: local lookups and snapshot-checked ones."""
+    state = FakeSpotifyState(playlists=20, tracks_per_playlist=200,
+                             latency=args.latency, rate_limit_ratio=args.rate_limit)
+    with FakeSpotifyServer(state) as server:
+        engine = PlaylistEngine(sp=fake_client(server), cache=CacheStore(os.path.join(workdir, 'daemon.db')))
+        engine.start(monitor=False)
+        while len(engine.membership) < 20:  # Catalog load and index sync queued by start()
+            time.sleep(0.01)
+        engine.poll_playback()
+
+        daemon = PlaylistDaemon(engine, os.path.join(workdir, 'daemon.sock'))
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        client = DaemonClient(daemon.path)
+        try:
+            results = {}
+            for name, command in (('where', 'where'), ('in', 'in "Playlist 0"')):
+                client.call(command)  # Warm up the index for this playlist
+                state.reset_counters()
+                started = time.perf_counter()
+                for _ in range(args.daemon_commands):
+                    assert client.call(command)['ok']
+                seconds = time.perf_counter() - started
+                results[f'{name}_per_second'] = args.daemon_commands / seconds
+                results[f'{name}_requests_per_command'] = state.requests / args.daemon_commands
+        finally:
+            client.close()
+            daemon.shutdown()
+            daemon.server_close()
+            engine.stop()
+    return results
+
+
+def bench_multi_account(args, workdir):
+    """
+    Many accounts polling aggressively through one shared RateBudget against a fake API
+    that answers some requests with 429. Accounts use real spotify_auth clients and
+    TokenManagers (with pre-seeded tokens), so the memory per account is representative.
+    """
+    from spotify_auth import SCOPE, build_session, get_spotify_client
+
+    state = FakeSpotifyState(playlists=1, tracks_per_playlist=1, latency=args.latency,
+                             rate_limit_ratio=args.account_rate_limit, retry_after=1)
+    with FakeSpotifyServer(state) as server:
+        session = build_session({'retry_rate_limited': False})
+        engine = MultiAccountEngine({'rate': args.budget_rate})
+
+        with _Measure(trace=True) as memory:
+            for n in range(args.accounts):
+                token_cache = os.path.join(workdir, f'token-{n}')
+                with open(token_cache, 'w') as f:
+                    json.dump({'access_token': 'fake', 'token_type': 'Bearer', 'expires_in': 3600,
+                               'expires_at': int(time.time()) + 36000, 'refresh_token': 'fake',
+                               'scope': SCOPE}, f)
+                sp = get_spotify_client(token_cache=token_cache, session=session,
+                                        client_id='bench', client_secret='bench')
+                sp.prefix = server.prefix
+                # Poll as fast as the budget allows so it's the bottleneck
+                engine.add_account(f"account-{n}", sp, PollScheduler(max_playing_interval=0.1,
+                                                                       idle_interval=0.1, burst_interval=0.1))
+
+        async def run():
+            task = asyncio.get_running_loop().create_task(engine.run())
+            await asyncio.sleep(args.multi_seconds)
+            engine.stop()
+            await task
+
+        state.reset_counters()
+        started = time.perf_counter()
+        asyncio.run(run())
+        seconds = time.perf_counter() - started
+        engine.close()
+
+    stats = engine.stats()
+    granted = [stats['granted'].get(name, 0) for name in engine.accounts]
+    return {
+        'accounts': args.accounts,
+        'budget_rate': args.budget_rate,
+        'requests_per_second': state.requests / seconds,
+        'rate_limited': state.rate_limited,
+        'final_rate': stats['rate'],
+        'shed': sum(stats['shed'].values()),
+        'min_requests_per_account': min(granted),
+        'max_requests_per_account': max(granted),
+        'bytes_per_account': memory.peak_bytes / args.accounts,
+    }
+
+
+def bench_monitor(args):
+    """
+    Requests per hour from the monitor loop over one virtual hour of listening:
+    playing, then paused for a quarter of the hour, then playing again.
+    The fake server's clock is advanced by each scheduled delay instead of sleeping.
+    """
+    state = FakeSpotifyState(playlists=1, tracks_per_playlist=1)
+    hour = 3600.0
+    with FakeSpotifyServer(state) as server:
+        sp = fake_client(server)
+        scheduler = PollScheduler()
+        paused = False
+        with _Measure(trace=True) as measure:
+            while state.clock < hour:
+                if not paused and hour * 0.5 <= state.clock < hour * 0.75:
+                    state.player_command('pause')
+                    paused = True
+                elif paused and state.clock >= hour * 0.75:
+                    state.player_command('play')
+                    paused = False
+                delay = scheduler.next_delay(sp.current_playback())
+                state.advance(delay)
+
+    return {
+        'adaptive_requests_per_hour': state.requests,
+        'fixed_interval_requests_per_hour': int(hour / FIXED_INTERVAL),
+        'peak_bytes': measure.peak_bytes,
+    }
+
+
+def _print_report(report):
+    cold = report['cold_start']
+    print(f"Cold start ({cold['playlists']} playlists)")
+    print(f"  network fetch: {cold['network_seconds'] * 1000:8.1f} ms  "
+          f"{cold['network_requests']} requests  peak {cold['network_peak_bytes'] / 1024:.0f} KiB")
+    print(f"  from cache.db: {cold['cached_seconds'] * 1000:8.1f} ms  "
+          f"0 requests  peak {cold['cached_peak_bytes'] / 1024:.0f} KiB")
+    imports = report['imports']
+    print(f"  import main:   {imports['main_import_seconds'] * 1000:8.1f} ms  "
+          f"(spotipy {'imported - lazy loading broke' if imports['spotipy_imported'] else 'not imported'})")
+    print()
+    print("Membership check latency")
+    print(f"  {'tracks':>8}  {'first ms':>9}  {'reqs':>5}  {'peak KiB':>9}  {'cached ms':>9}  {'reqs':>5}")
+    for row in report['membership']:
+        print(f"  {row['tracks']:>8}  {row['first_check_seconds'] * 1000:>9.1f}  {row['first_check_requests']:>5}  "
+              f"{row['first_check_peak_bytes'] / 1024:>9.0f}  {row['cached_check_seconds'] * 1000:>9.1f}  "
+              f"{row['cached_check_requests']:>5.1f}")
+    print()
+    index = report['reverse_index']
+    print(f"Reverse index ({index['playlists']} playlists, {index['entries']} entries, "
+          f"{index['unique_tracks']} unique tracks, {index['array_bytes'] / 1024:.0f} KiB of arrays)")
+    print(f"  full build:  {index['build_seconds'] * 1000:8.1f} ms  {index['build_requests']} requests  "
+          f"index holds {index['index_bytes'] / 1024:.0f} KiB")
+    print(f"  resync:      {index['resync_seconds'] * 1000:8.1f} ms  {index['resync_requests']} requests  "
+          f"{index['resync_rescanned']} playlist rescanned")
+    print(f"  lookup:      {index['lookup_seconds'] * 1e6:8.1f} us  ({index['lookup_matches']} playlists contain the track)")
+    print()
+    catalog = report['catalog']
+    print(f"Playlist catalog ({catalog['playlists']} playlists)")
+    print(f"  build:       {catalog['build_seconds'] * 1000:8.1f} ms")
+    print(f"  refresh:     {catalog['refresh_seconds'] * 1000:8.1f} ms  ({catalog['refresh_changes']} changes applied)")
+    print(f"  search:      {catalog['keystroke_mean_seconds'] * 1000:8.1f} ms mean, "
+          f"{catalog['keystroke_max_seconds'] * 1000:.1f} ms worst per keystroke typing '{catalog['query']}' "
+          f"({catalog['final_matches']} matches)")
+    print()
+    bulk = report['bulk_add']
+    print(f"Bulk add ({bulk['candidates']}-track album)")
+    print(f"  added:       {bulk['added']:8} tracks  ({bulk['skipped']} already in) "
+          f"in {bulk['seconds'] * 1000:.0f} ms")
+    print(f"  requests:    {bulk['total_requests']:8}  ({bulk['collect_requests']} collecting, "
+          f"{bulk['write_requests']} writes)")
+    print()
+    dd = report['dedupe']
+    print(f"Dedupe ({dd['tracks']} tracks, {dd['duplicates']} duplicates by ID or ISRC)")
+    print(f"  scan+remove: {dd['seconds'] * 1000:8.0f} ms  {dd['requests']} requests")
+    print(f"  peak memory: {dd['streaming_peak_bytes'] / 1024:8.0f} KiB streaming vs. "
+          f"{dd['whole_playlist_peak_bytes'] / 1024:.0f} KiB loading the playlist whole")
+    print()
+    liked = report['liked']
+    print(f"Liked Songs indicator ({liked['tracks']} tracks played)")
+    print(f"  requests:    {liked['requests_per_track']:8.2f} per track change  "
+          f"({liked['extra_requests']} total, {liked['cache']['hits']} cache hits)")
+    print()
+    prefetch = report['prefetch']
+    print(f"Prefetch for upcoming tracks ({prefetch['tracks']} tracks played)")
+    print(f"  ready:       {prefetch['membership_ready']:8.0%} button state, "
+          f"{prefetch['liked_ready']:.0%} heart, known when the track started")
+    print(f"  requests:    {prefetch['requests_per_track']:8.2f} per track change  "
+          f"({prefetch['prefetch']['queue_reads']} queue reads)")
+    print()
+
+    events = report['mpris']
+    if 'skipped' in events:
+        print(f"MPRIS playback events: skipped ({events['skipped']})")
+    else:
+        print(f"MPRIS playback events ({events['changes']} track changes, then {events['idle_seconds']:.0f}s paused)")
+        print(f"  latency:     {events['mean_latency_seconds'] * 1000:8.2f} ms mean, "
+              f"{events['max_latency_seconds'] * 1000:.2f} ms worst")
+        print(f"  requests:    {events['web_requests']:8} to the Web API")
+    print()
+    http = report['http_cache']
+    print("ETag response cache (re-reading an unchanged catalog and playlist)")
+    for name in ('cached', 'uncached'):
+        row = http[name]
+        print(f"  {name + ':':<12} {row['seconds'] * 1000:8.0f} ms  {row['bytes'] / 1024:.0f} KiB over "
+              f"{row['requests']} requests ({row['not_modified']} not modified)")
+    print()
+    daemon = report['daemon']
+    print("Headless daemon (one connection, sequential commands)")
+    print(f"  where:       {daemon['where_per_second']:8.0f} commands/s  "
+          f"{daemon['where_requests_per_command']:.1f} requests each")
+    print(f"  in:          {daemon['in_per_second']:8.0f} commands/s  "
+          f"{daemon['in_requests_per_command']:.1f} requests each")
+    print()
+    multi = report['multi_account']
+    print(f"Multi-account polling ({multi['accounts']} accounts, budget {multi['budget_rate']:.0f} requests/s)")
+    print(f"  throughput:  {multi['requests_per_second']:8.1f} requests/s  "
+          f"({multi['rate_limited']} 429s, {multi['shed']} polls shed, rate ended at {multi['final_rate']:.1f}/s)")
+    print(f"  fairness:    {multi['min_requests_per_account']}-{multi['max_requests_per_account']} requests per account")
+    print(f"  memory:      {multi['bytes_per_account'] / 1024:8.0f} KiB per account")
+    print()
+    monitor = report['monitor']
+    print("Monitor polling (one virtual hour, paused for 15 minutes)")
+    print(f"  adaptive:       {monitor['adaptive_requests_per_hour']:>6} requests/hour")
+    print(f"  fixed 2s poll:  {monitor['fixed_interval_requests_per_hour']:>6} requests/hour")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app against a local fake Spotify API.")
+    parser.add_argument('--latency', type=float, default=0.03, help="injected seconds per response")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--playlists', type=int, default=500, help="catalog size for the cold start benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 8000],
+                        help="playlist sizes for the membership benchmark")
+    parser.add_argument('--index-playlists', type=int, default=300, help="playlists for the reverse index benchmark")
+    parser.add_argument('--index-tracks', type=int, default=500, help="tracks per playlist for the reverse index benchmark")
+    parser.add_argument('--catalog-playlists', type=int, default=2500, help="playlists for the catalog search benchmark")
+    parser.add_argument('--bulk-tracks', type=int, default=500, help="album size for the bulk add benchmark")
+    parser.add_argument('--bulk-existing', type=int, default=100,
+                        help="tracks already in the target playlist for the bulk add benchmark")
+    parser.add_argument('--dedupe-tracks', type=int, default=10000, help="playlist size for the dedupe benchmark")
+    parser.add_argument('--liked-tracks', type=int, default=60, help="track changes for the Liked Songs benchmark")
+    parser.add_argument('--prefetch-tracks', type=int, default=60, help="track changes for the prefetch benchmark")
+    parser.add_argument('--mpris-changes', type=int, default=50, help="track changes for the MPRIS benchmark")
+    parser.add_argument('--mpris-idle-seconds', type=float, default=2.0, help="paused time for the MPRIS benchmark")
+    parser.add_argument('--daemon-commands', type=int, default=200, help="commands per daemon throughput run")
+    parser.add_argument('--accounts', type=int, default=25, help="accounts for the multi-account benchmark")
+    parser.add_argument('--budget-rate', type=float, default=30.0, help="shared requests/s budget for the multi-account benchmark")
+    parser.add_argument('--account-rate-limit', type=float, default=0.02,
+                        help="fraction of multi-account requests answered with 429")
+    parser.add_argument('--multi-seconds', type=float, default=5.0, help="how long to run the multi-account benchmark")
+    parser.add_argument('--repeat', type=int, default=20, help="cached membership checks to average")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = {
+            'cold_start': bench_cold_start(args, workdir),
+            'imports': bench_imports(args),
+            'membership': bench_membership(args, workdir),
+            'reverse_index': bench_reverse_index(args),
+            'catalog': bench_catalog(args),
+            'bulk_add': bench_bulk_add(args, workdir),
+            'dedupe': bench_dedupe(args),
+            'liked': bench_liked(args, workdir),
+            'prefetch': bench_prefetch(args, workdir),
+            'mpris': bench_mpris(args, workdir),
+            'http_cache': bench_http_cache(args),
+            'daemon': bench_daemon(args, workdir),
+            'multi_account': bench_multi_account(args, workdir),
+            'monitor': bench_monitor(args),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
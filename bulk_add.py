@@ -0,0 +1,89 @@
+"""
+Bulk adds: push the recently played tracks, the current queue or the current
+album into a playlist in a handful of requests.
+Candidates are de-duplicated against the playlist's current contents (one
+paginated pass, or none when the membership index is up to date) and queued on
+the durable MutationQueue, which writes them in chunks of 100 per request in
+order with any other add/remove clicks for the same playlist.
+"""
+from collections import namedtuple
+
+from pagination import fetch_all_pages
+
+SOURCES = ('recent', 'queue', 'album')
+
+# Track counts: sent to Spotify, already in the playlist, refused by Spotify, still queued
+BulkAddResult = namedtuple('BulkAddResult', 'added skipped failed queued')
+
+
+def recently_played_ids(sp, limit=50):
+    """Track IDs from the listening history, most recent first (Spotify keeps only the last 50)."""
+    track_ids = []
+    before = None
+    while len(track_ids) < limit:
+        page = sp.current_user_recently_played(limit=min(50, limit - len(track_ids)), before=before)
+        track_ids.extend(item['track']['id'] for item in page['items']
+                         if item.get('track') and item['track'].get('id'))
+        before = (page.get('cursors') or {}).get('before')
+        if not page.get('next') or not before:
+            break
+    return track_ids
+
+
+def queue_ids(sp):
+    """Track IDs in the user's play queue (episodes are skipped)."""
+    queue = sp.queue() or {}
+    return [item['id'] for item in queue.get('queue') or []
+            if item and item.get('type', 'track') == 'track' and item.get('id')]
+
+
+def album_ids(sp, album_id=None):
+    """Track IDs of an album, by default the one the current track is from."""
+    if album_id is None:
+        playback = sp.current_playback()
+        item = playback and playback.get('item')
+        if not item or not item.get('album'):
+            raise ValueError("Nothing is playing")
+        album_id = item['album']['id']
+    items = fetch_all_pages(lambda offset: sp.album_tracks(album_id, limit=50, offset=offset), page_size=50)
+    return [track['id'] for track in items if track and track.get('id')]
+
+
+def collect(sp, source):
+    """Return candidate track IDs for 'recent', 'queue' or 'album'."""
+    if source == 'recent':
+        return recently_played_ids(sp)
+    if source == 'queue':
+        return queue_ids(sp)
+    if source == 'album':
+        return album_ids(sp)
+    raise ValueError(f"Unknown source {source!r}; expected one of {', '.join(SOURCES)}")
+
+
+def new_tracks(track_ids, existing, pending_action=None):
+    """
+    Return the track_ids (in order, without repeats) that won't be in the playlist
+    once queued changes are sent: not in existing, or with a remove queued.
+    pending_action(track_id) gives the queued 'add'/'remove' for a track, or None.
+    """
+    new = []
+    seen = set()
+    for track_id in track_ids:
+        if track_id in seen:
+            continue
+        seen.add(track_id)
+        pending = pending_action(track_id) if pending_action else None
+        if pending == 'remove' or (pending is None and track_id not in existing):
+            new.append(track_id)
+    return new
+
+
+def bulk_add(sp, membership, mutations, playlist_id, track_ids):
+    """
+    Queue adds of the track_ids that aren't in the playlist yet on mutations (a MutationQueue).
+    Returns (queued track IDs, number skipped); mutations.wait() follows them to Spotify.
+    """
+    existing = membership.track_ids(sp, playlist_id)
+    new = new_tracks(track_ids, existing, lambda track_id: mutations.pending_action(playlist_id, track_id))
+    mutations.enqueue_many(playlist_id, new, 'add')
+    return new, len(track_ids) - len(new)
@@ -0,0 +1,107 @@
+"""
+Local SQLite cache of the playlist catalog and membership data.
+Lets the app paint from the last known state on startup and revalidate in the background.
+Also holds the durable queue of playlist mutations that haven't reached Spotify yet.
+"""
+import sqlite3
+import threading
+
+CACHE_FILE = "cache.db"
+
+
+class CacheStore:
+    """Thread-safe wrapper around the on-disk cache database."""
+
+    def __init__(self, path=CACHE_FILE):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # WAL keeps commits cheap enough to run on the Tk thread
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS playlists (
+                    position INTEGER NOT NULL,
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS membership (
+                    playlist_id TEXT PRIMARY KEY,
+                    snapshot_id TEXT NOT NULL,
+                    track_ids TEXT NOT NULL
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mutations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    playlist_id TEXT NOT NULL,
+                    track_id TEXT NOT NULL,
+                    action TEXT NOT NULL
+                )""")
+
+    def load_playlists(self):
+        """Return the cached catalog as an ordered list of (name, id) tuples."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, id FROM playlists ORDER BY position").fetchall()
+        return [(name, pid) for name, pid in rows]
+
+    def save_playlists(self, playlists):
+        """Replace the cached catalog."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM playlists")
+            self._conn.executemany(
+                "INSERT INTO playlists (position, id, name) VALUES (?, ?, ?)",
+                [(position, pid, name) for position, (name, pid) in enumerate(playlists)]
+            )
+
+    def load_membership(self):
+        """Return {playlist_id: (snapshot_id, set of track IDs)} for every cached playlist."""
+        with self._lock:
+            rows = self._conn.execute("SELECT playlist_id, snapshot_id, track_ids FROM membership").fetchall()
+        return {pid: (snapshot_id, set(filter(None, track_ids.split(',')))) for pid, snapshot_id, track_ids in rows}
+
+    def save_membership(self, playlist_id, snapshot_id, track_ids):
+        """Persist the membership of one playlist."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO membership (playlist_id, snapshot_id, track_ids) VALUES (?, ?, ?)",
+                (playlist_id, snapshot_id, ','.join(track_ids))
+            )
+
+    def delete_membership(self, playlist_id):
+        """Forget the membership of one playlist."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM membership WHERE playlist_id = ?", (playlist_id,))
+
+    def add_mutation(self, playlist_id, track_id, action, locked_ids=()):
+        """
+        Queue an 'add' or 'remove' of a track.
+        A pending opposite action for the same track cancels out, unless that row is in
+        locked_ids because it's already being sent; a pending identical action is kept.
+        Returns the (id, action) of the latest pending row for the track, or None.
+        """
+        query = "SELECT id, action FROM mutations WHERE playlist_id = ? AND track_id = ? ORDER BY id DESC LIMIT 1"
+        with self._lock, self._conn:
+            row = self._conn.execute(query, (playlist_id, track_id)).fetchone()
+            if row and row[1] == action:
+                return row
+            if row and row[0] not in locked_ids:
+                self._conn.execute("DELETE FROM mutations WHERE id = ?", (row[0],))
+            else:
+                self._conn.execute(
+                    "INSERT INTO mutations (playlist_id, track_id, action) VALUES (?, ?, ?)",
+                    (playlist_id, track_id, action)
+                )
+            return self._conn.execute(query, (playlist_id, track_id)).fetchone()
+
+    def load_mutations(self):
+        """Return pending mutations as (id, playlist_id, track_id, action) tuples, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, playlist_id, track_id, action FROM mutations ORDER BY id"
+            ).fetchall()
+
+    def delete_mutations(self, mutation_ids):
+        """Forget mutations that have been applied (or permanently rejected)."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM mutations WHERE id = ?", [(i,) for i in mutation_ids])
@@ -0,0 +1,185 @@
+"""
+The user's playlist catalog, indexed by ID and by name.
+Playlists are identified by ID everywhere (names aren't unique), refreshes are
+applied as diffs, and search does prefix/word/substring/fuzzy matching fast enough
+to run on every keystroke with thousands of playlists.
+"""
+import threading
+
+# Match tiers, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+
+def _fold(text):
+    return ' '.join(text.casefold().split())
+
+
+def _fuzzy_gaps(query, name):
+    """Return how many characters are skipped matching query as a subsequence of name, or None."""
+    gaps = 0
+    position = 0
+    for char in query:
+        found = name.find(char, position)
+        if found < 0:
+            return None
+        gaps += found - position
+        position = found + 1
+    return gaps
+
+
+def _rank(query, name):
+    """Return a sort key for how well name matches query, or None if it doesn't."""
+    if name == query:
+        return (EXACT, 0)
+    if name.startswith(query):
+        return (PREFIX, len(name))
+    index = name.find(query)
+    if index > 0:
+        if name[index - 1] in ' -_(/&':
+            return (WORD_PREFIX, index)
+        return (SUBSTRING, index)
+    gaps = _fuzzy_gaps(query, name)
+    if gaps is not None:
+        return (FUZZY, gaps)
+    return None
+
+
+class PlaylistCatalog:
+    """Ordered playlists with ID and name lookups and type-ahead search."""
+
+    def __init__(self, playlists=()):
+        self._lock = threading.Lock()
+        self._order = []  # playlist IDs in Spotify's order
+        self._names = {}  # playlist_id -> name
+        self._folded = {}  # playlist_id -> casefolded name for matching
+        self._by_name = {}  # name -> [playlist IDs with that name]
+        self._last_search = (None, None)  # (folded query, matching IDs) to narrow from
+        self.update(playlists)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._order)
+
+    def __contains__(self, playlist_id):
+        with self._lock:
+            return playlist_id in self._names
+
+    def ids(self):
+        """Return every playlist ID in catalog order."""
+        with self._lock:
+            return list(self._order)
+
+    def items(self):
+        """Return the catalog as an ordered list of (name, id) tuples."""
+        with self._lock:
+            return [(self._names[pid], pid) for pid in self._order]
+
+    def name(self, playlist_id):
+        """Return the name of a playlist, or None if it isn't in the catalog."""
+        with self._lock:
+            return self._names.get(playlist_id)
+
+    def ids_named(self, name):
+        """Return the IDs of every playlist called name, in catalog order."""
+        with self._lock:
+            return list(self._by_name.get(name, ()))
+
+    def label(self, playlist_id):
+        """Display name, disambiguated with a short ID when several playlists share it."""
+        with self._lock:
+            name = self._names.get(playlist_id)
+            if name is None:
+                return None
+            if len(self._by_name[name]) > 1:
+                return f"{name} ({playlist_id[:6]})"
+            return name
+
+    def resolve(self, query):
+        """
+        Return the playlist ID for an ID, an exact name or the best search match.
+        Raises ValueError when nothing matches or an exact name is ambiguous.
+        """
+        if query in self:
+            return query
+        named = self.ids_named(query)
+        if len(named) > 1:
+            raise ValueError(f"Several playlists are called {query!r}: {', '.join(named)}")
+        if named:
+            return named[0]
+        matches = self.search(query, limit=1)
+        if not matches:
+            raise ValueError(f"No playlist matches {query!r}")
+        return matches[0]
+
+    def update(self, playlists):
+        """
+        Replace the catalog with an ordered list of (name, id) tuples.
+        Returns a dict of the 'added', 'removed' and 'renamed' IDs and whether the order
+        'moved'; all empty/False when nothing changed.
+        """
+        playlists = list(playlists)
+        new_names = {pid: name for name, pid in playlists}
+        with self._lock:
+            added = [pid for pid in new_names if pid not in self._names]
+            removed = [pid for pid in self._order if pid not in new_names]
+            renamed = [pid for pid, name in new_names.items()
+                       if pid in self._names and self._names[pid] != name]
+            new_order = [pid for _, pid in playlists]
+            kept_order = [pid for pid in self._order if pid in new_names]
+            moved = kept_order != [pid for pid in new_order if pid in self._names]
+
+            if added or removed or renamed or moved:
+                for pid in removed:
+                    self._forget(pid)
+                for pid in renamed:
+                    self._forget(pid)
+                for pid in added + renamed:
+                    name = new_names[pid]
+                    self._names[pid] = name
+                    self._folded[pid] = _fold(name)
+                    self._by_name.setdefault(name, []).append(pid)
+                self._order = new_order
+                positions = {pid: i for i, pid in enumerate(new_order)}
+                for ids in self._by_name.values():
+                    ids.sort(key=positions.__getitem__)
+                self._last_search = (None, None)
+
+        return {'added': added, 'removed': removed, 'renamed': renamed, 'moved': moved}
+
+    def _forget(self, playlist_id):
+        name = self._names.pop(playlist_id)
+        del self._folded[playlist_id]
+        ids = self._by_name[name]
+        ids.remove(playlist_id)
+        if not ids:
+            del self._by_name[name]
+
+    def search(self, query, limit=None):
+        """
+        Return playlist IDs matching query, best first: exact name, name prefix,
+        word prefix, substring, then fuzzy (letters in order, fewest gaps first).
+        Ties keep catalog order. An empty query returns the whole catalog.
+        """
+        folded = _fold(query)
+        with self._lock:
+            if not folded:
+                return list(self._order[:limit] if limit else self._order)
+
+            # Every tier matches a subset of what a shorter query matched, so typing
+            # another character only has to re-rank the previous matches
+            last_query, last_ids = self._last_search
+            if last_query and folded.startswith(last_query):
+                candidates = last_ids
+            else:
+                candidates = self._order
+
+            ranked = []
+            for position, pid in enumerate(candidates):
+                rank = _rank(folded, self._folded[pid])
+                if rank is not None:
+                    ranked.append((rank, position, pid))
+            # Keep the narrowed candidates in catalog order so ties sort the same either way
+            self._last_search = (folded, [pid for _, _, pid in ranked])
+            ranked.sort()
+        matches = [pid for _, _, pid in ranked]
+        return matches[:limit] if limit else matches
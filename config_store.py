@@ -0,0 +1,133 @@
+"""
+config.json access without importing spotipy, so the UI can start before the
+Spotify client is loaded. spotify_auth re-exports these for existing callers.
+"""
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+
+CONFIG_FILE = "config.json"
+
+
+def write_json_atomic(path, data, indent=None):
+    """Write JSON to path via a temp file + rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ConfigStore:
+    """
+    In-memory view of config.json.
+    Reads are served from memory (re-checking the file's mtime at most once per
+    check_interval to pick up external edits); writes are coalesced, debounced
+    and written atomically via a temp file + rename.
+    """
+
+    def __init__(self, path=CONFIG_FILE, save_delay=0.5, check_interval=1.0):
+        self.path = path
+        self.save_delay = save_delay
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._config = {}
+        self._mtime = None
+        self._last_check = 0.0
+        self._dirty = False
+        self._timer = None
+        self._reload()
+
+    def _reload(self):
+        """Re-read the file from disk."""
+        self._last_check = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r') as f:
+                self._config = json.load(f)
+        except FileNotFoundError:
+            mtime = None
+            self._config = {}
+        except ValueError as e:
+            # Caught mid-edit or hand-edited into invalid JSON: keep the last good config,
+            # and leave _mtime alone so the next check reads the file again
+            print(f"Error reading {self.path}: {e}")
+            return
+        self._mtime = mtime
+
+    def _check_external_edit(self):
+        """Reload if the file changed on disk since we last read or wrote it."""
+        now = time.monotonic()
+        if self._dirty or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            self._reload()
+
+    def load(self):
+        """Return a copy of the current configuration."""
+        with self._lock:
+            self._check_external_edit()
+            return copy.deepcopy(self._config)
+
+    def save(self, config):
+        """Replace the configuration; the file is written after save_delay seconds."""
+        with self._lock:
+            self._config = copy.deepcopy(config)
+            self._dirty = True
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now, atomically."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            write_json_atomic(self.path, self._config, indent=2)
+            self._dirty = False
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+
+_config_store = ConfigStore()
+atexit.register(_config_store.flush)
+
+def load_credentials():
+    """Load Spotify API credentials from config file."""
+    config = _config_store.load()
+    return config.get('client_id', ''), config.get('client_secret', '')
+
+def save_credentials(client_id, client_secret):
+    """Save Spotify API credentials to config file."""
+    config = _config_store.load()
+    config['client_id'] = client_id
+    config['client_secret'] = client_secret
+    _config_store.save(config)
+    _config_store.flush()
+
+def load_config():
+    """Load full configuration."""
+    return _config_store.load()
+
+def save_config(config):
+    """Save full configuration (written to disk shortly after, atomically)."""
+    _config_store.save(config)
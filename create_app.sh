@@ -23,9 +23,7 @@ mkdir -p "$RESOURCES_DIR"
 
 # Copy Python files and dependencies
 echo "Copying application files..."
-cp "$SCRIPT_DIR/main.py" "$RESOURCES_DIR/"
-cp "$SCRIPT_DIR/spotify_auth.py" "$RESOURCES_DIR/"
-cp "$SCRIPT_DIR/setup_auth.py" "$RESOURCES_DIR/"
+cp "$SCRIPT_DIR"/*.py "$RESOURCES_DIR/"
 cp "$SCRIPT_DIR/requirements.txt" "$RESOURCES_DIR/"
 
 # Copy config and cache if they exist
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Headless mode: runs the PlaylistEngine as a background service without Tk,
+and a tiny CLI that talks to it over a local Unix socket.
+
+Start the service, then send it commands (e.g. from hotkeys or scripts):
+  python daemon.py serve
+  python daemon.py add "Road Trip"          # add the current track to Road Trip
+  python daemon.py add current track to Road Trip
+  python daemon.py in "Road Trip"           # is the current track in Road Trip?
+  python daemon.py where                    # every playlist holding the current track
+  python daemon.py next
+  python daemon.py add-album "Road Trip"    # also add-recent, add-queue
+  python daemon.py dedupe "Road Trip"       # remove repeated tracks
+
+Without a playlist, add/remove/in use the playlist selected in the app.
+The protocol is one text command per line in, one JSON object per line out.
+"""
+import argparse
+import json
+import os
+import shlex
+import socket
+import socketserver
+import sys
+
+SOCKET_FILE = "playlister.sock"
+CLIENT_TIMEOUT = 30
+BULK_ADD_WAIT = 20.0  # Seconds add-recent/-queue/-album wait for Spotify; must stay below CLIENT_TIMEOUT
+
+
+class PlaylistDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves engine commands on a Unix socket."""
+
+    daemon_threads = True
+
+    def __init__(self, engine, path=SOCKET_FILE):
+        if os.path.exists(path):
+            os.unlink(path)  # Left over from a previous run
+        super().__init__(path, _Handler)
+        self.engine = engine
+        self.path = path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def execute(self, line):
+        """Run one command line and return its result; raises ValueError for bad commands."""
+        words = shlex.split(line)
+        if not words:
+            raise ValueError("Empty command")
+        command, args = words[0].lower(), words[1:]
+        if command == 'is':
+            command = 'in'
+        if command in ('add', 'remove', 'in'):
+            args = _strip_current(args)
+        handler = getattr(self, f"cmd_{command.replace('-', '_')}", None)
+        if handler is None:
+            raise ValueError(f"Unknown command {command!r}")
+        return handler(' '.join(args))
+
+    def _current(self):
+        """
+        Return (track_id, label) of the current track after a fresh poll, so a track
+        that changed since the last one isn't acted on (no wait while MPRIS reports playback).
+        """
+        engine = self.engine
+        engine.refresh_playback()
+        track_id, label = engine.current()
+        if track_id is None:
+            raise ValueError("No track playing")
+        return track_id, label
+
+    def _playlist(self, query):
+        if query:
+            return self.engine.resolve_playlist(query)
+        from config_store import load_config
+        playlist_id = load_config().get('selected_playlist_id')
+        if playlist_id not in self.engine.catalog:
+            raise ValueError("No playlist given and none selected in the app")
+        return playlist_id
+
+    def cmd_ping(self, args):
+        return 'pong'
+
+    def cmd_current(self, args):
+        track_id, label = self._current()
+        return {'track_id': track_id, 'track': label, 'is_playing': self.engine.is_playing,
+                'liked': self.engine.liked.lookup(self.engine.sp, [track_id])[track_id]}
+
+    def cmd_add(self, args):
+        return self._set_membership(args, True)
+
+    def cmd_remove(self, args):
+        return self._set_membership(args, False)
+
+    def _set_membership(self, args, in_playlist):
+        playlist_id = self._playlist(args)
+        track_id, label = self._current()
+        self.engine.set_membership(playlist_id, track_id, in_playlist)
+        return {'track': label, 'playlist': self.engine.catalog.name(playlist_id),
+                'action': 'add' if in_playlist else 'remove'}
+
+    def cmd_add_recent(self, args):
+        return self._bulk_add('recent', args)
+
+    def cmd_add_queue(self, args):
+        return self._bulk_add('queue', args)
+
+    def cmd_add_album(self, args):
+        return self._bulk_add('album', args)
+
+    def _bulk_add(self, source, args):
+        playlist_id = self._playlist(args)
+        # Answer before the client gives up; tracks still queued (e.g. offline) are sent later
+        result = self.engine.bulk_add(source, playlist_id, timeout=BULK_ADD_WAIT)
+        return dict(result._asdict(), playlist=self.engine.catalog.name(playlist_id))
+
+    def cmd_dedupe(self, args):
+        playlist_id = self._playlist(args)
+        duplicates = self.engine.remove_duplicates(playlist_id)
+        return {'playlist': self.engine.catalog.name(playlist_id), 'removed': len(duplicates)}
+
+    def cmd_in(self, args):
+        playlist_id = self._playlist(args)
+        track_id, _ = self._current()
+        return self.engine.contains(playlist_id, track_id)
+
+    def cmd_where(self, args):
+        track_id, _ = self._current()
+        return [self.engine.catalog.name(pid) for pid in self.engine.playlists_containing(track_id)]
+
+    def cmd_playlists(self, args):
+        return [{'id': pid, 'name': self.engine.catalog.name(pid)} for pid in self.engine.catalog.search(args)]
+
+    def cmd_refresh(self, args):
+        self.engine.load_playlists()
+        return 'refreshing'
+
+    def cmd_play(self, args):
+        return self._playback('play')
+
+    def cmd_pause(self, args):
+        return self._playback('pause')
+
+    def cmd_toggle(self, args):
+        return self._playback('pause' if self.engine.is_playing else 'play')
+
+    def cmd_next(self, args):
+        return self._playback('next')
+
+    def cmd_previous(self, args):
+        return self._playback('previous')
+
+    def _playback(self, command):
+        self.engine.playback(command)
+        return command
+
+    def cmd_stats(self, args):
+        return self.engine.stats()
+
+
+def _strip_current(args):
+    """Drop the phrase in "add current track to X" / "is current in X", leaving the playlist."""
+    lowered = [word.lower() for word in args]
+    if lowered[:1] != ['current']:
+        return args
+    skip = 1
+    if lowered[skip:skip + 1] == ['track']:
+        skip += 1
+    if lowered[skip:skip + 1] and lowered[skip] in ('to', 'from', 'in'):
+        skip += 1
+    return args[skip:]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Several commands may share one connection, one per line
+        for raw in self.rfile:
+            line = raw.decode('utf-8').strip()
+            if not line:
+                continue
+            try:
+                reply = {'ok': True, 'result': self.server.execute(line)}
+            except ValueError as e:
+                reply = {'ok': False, 'error': str(e)}
+            except Exception as e:
+                print(f"Error running {line!r}: {e}")
+                reply = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DaemonClient:
+    """Persistent connection to a running daemon."""
+
+    def __init__(self, path=SOCKET_FILE, timeout=CLIENT_TIMEOUT):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._file = self._socket.makefile('rwb')
+
+    def call(self, line):
+        """Send one command line and return the decoded reply dict."""
+        self._file.write(line.encode('utf-8') + b'\n')
+        self._file.flush()
+        reply = self._file.readline()
+        if not reply:
+            raise ConnectionError("Daemon closed the connection")
+        return json.loads(reply)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+def serve(path):
+    """Run the engine headless until interrupted."""
+    from cache_store import CacheStore
+    from config_store import load_config
+    from engine import PlaylistEngine
+
+    engine = PlaylistEngine(cache=CacheStore(), on_error=lambda message, e: print(f"Error: {message}: {e}"),
+                            playback_source=load_config().get('playback_source', 'auto'))
+    engine.load_cached()
+    engine.start()
+    server = PlaylistDaemon(engine, path)
+    print(f"Listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless playlist adder service and command line client.")
+    parser.add_argument('--socket', default=SOCKET_FILE, help="path of the daemon's Unix socket")
+    parser.add_argument('command', nargs='+',
+                        help="'serve', or a command for the running daemon: add, remove, in, where, "
+                             "add-recent, add-queue, add-album, dedupe, current, playlists, play, pause, toggle, next, previous, refresh, stats, ping")
+    args = parser.parse_args()
+
+    if args.command == ['serve']:
+        serve(args.socket)
+        return
+
+    try:
+        client = DaemonClient(args.socket)
+    except OSError as e:
+        print(f"Error connecting to daemon at {args.socket} (is 'python daemon.py serve' running?): {e}")
+        sys.exit(2)
+    try:
+        reply = client.call(' '.join(shlex.quote(word) for word in args.command))
+    finally:
+        client.close()
+
+    if not reply['ok']:
+        print(f"Error: {reply['error']}")
+        sys.exit(1)
+    result = reply['result']
+    print(result if isinstance(result, str) else json.dumps(result, indent=2))
+    # Let scripts branch on "in": exit status 0 when the track is in the playlist
+    if result is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Streaming duplicate finder and playlist mirror.
+Playlists are read one page at a time with only the fields needed (ID, URI and
+ISRC), so memory grows with the number of distinct tracks seen, never with page
+payloads. Duplicates are matched by track ID and, optionally, by ISRC (the same
+recording released under several IDs). Fixes are applied with position-aware
+removals against the snapshot that was scanned, 100 positions per request.
+
+  python dedupe.py dedupe "Road Trip"                  # list duplicates
+  python dedupe.py dedupe "Road Trip" --apply          # ...and remove them
+  python dedupe.py diff "Road Trip" "Road Trip (car)"
+  python dedupe.py mirror "Road Trip" "Road Trip (car)" --delete --apply
+"""
+import argparse
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from mutation_queue import BATCH_SIZE
+
+PAGE_SIZE = 100
+FIELDS = 'total,items(track(id,uri,is_local))'
+FIELDS_WITH_ISRC = 'total,items(track(id,uri,is_local,external_ids(isrc)))'
+
+Track = namedtuple('Track', 'position id uri isrc')
+# reason is 'id' (same track again) or 'isrc' (same recording under another ID)
+Duplicate = namedtuple('Duplicate', 'playlist_id position id uri reason first_playlist_id first_position')
+
+
+def iter_tracks(sp, playlist_id, isrc=True, page_size=PAGE_SIZE):
+    """
+    Yield a Track for every track in a playlist, in order.
+    The next page is requested while the current one is consumed, so at most two
+    pages are held at a time. Local files and episodes are skipped (positions still count them).
+    """
+    fields = FIELDS_WITH_ISRC if isrc else FIELDS
+
+    def fetch(offset):
+        return sp.playlist_items(playlist_id, fields=fields, limit=page_size, offset=offset,
+                                 additional_types=('track',))
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedupe-read-ahead") as pool:
+        page = fetch(0)
+        offset = 0
+        while True:
+            next_offset = offset + page_size
+            ahead = pool.submit(fetch, next_offset) if next_offset < (page.get('total') or 0) else None
+            for i, item in enumerate(page['items']):
+                track = item.get('track')
+                if not track or track.get('is_local') or not track.get('id'):
+                    continue
+                yield Track(offset + i, track['id'], track['uri'],
+                            (track.get('external_ids') or {}).get('isrc') if isrc else None)
+            if ahead is None:
+                return
+            page = ahead.result()
+            offset = next_offset
+
+
+def find_duplicates(sp, playlist_ids, isrc=True, across=False):
+    """
+    Yield a Duplicate for every repeated track, keeping the first occurrence.
+    With across=True a track counts as a duplicate when an earlier playlist in
+    playlist_ids already has it; otherwise each playlist is checked on its own.
+    """
+    seen = {}  # track ID or ISRC -> (playlist index, position) of the first occurrence
+    for index, playlist_id in enumerate(playlist_ids):
+        if not across:
+            seen = {}
+        for track in iter_tracks(sp, playlist_id, isrc):
+            first = seen.get(track.id)
+            reason = 'id'
+            if first is None and track.isrc:
+                first = seen.get(track.isrc)
+                reason = 'isrc'
+            if first is None:
+                seen[track.id] = (index, track.position)
+                if track.isrc:
+                    seen.setdefault(track.isrc, (index, track.position))
+                continue
+            yield Duplicate(playlist_id, track.position, track.id, track.uri, reason,
+                            playlist_ids[first[0]], first[1])
+
+
+def remove_positions(sp, playlist_id, positions, snapshot_id, progress=None):
+    """
+    Remove the tracks at positions, given as (position, uri) pairs relative to snapshot_id.
+    Batches go from the end of the playlist backwards, so each batch's positions
+    are unaffected by the ones already removed. Returns the final snapshot_id.
+    """
+    positions = sorted(positions, reverse=True)
+    for start in range(0, len(positions), BATCH_SIZE):
+        items = OrderedDict()
+        for position, uri in positions[start:start + BATCH_SIZE]:
+            items.setdefault(uri, []).append(position)
+        result = sp.playlist_remove_specific_occurrences_of_items(
+            playlist_id, [{'uri': uri, 'positions': p} for uri, p in items.items()], snapshot_id)
+        snapshot_id = result['snapshot_id']
+        if progress:
+            progress(min(start + BATCH_SIZE, len(positions)), len(positions))
+    return snapshot_id
+
+
+def dedupe(sp, playlist_id, isrc=True, apply=False, membership=None, progress=None):
+    """
+    Find (and with apply=True remove) duplicates in one playlist.
+    Returns the list of Duplicates; removals are checked against the scanned snapshot,
+    so Spotify rejects them if the playlist changed during the scan.
+    """
+    scanned_snapshot_id = sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+    duplicates = list(find_duplicates(sp, [playlist_id], isrc))
+    if apply and duplicates:
+        snapshot_id = remove_positions(sp, playlist_id, [(d.position, d.uri) for d in duplicates],
+                                       scanned_snapshot_id, progress)
+        if membership:
+            # An ID dropped as an ISRC duplicate is gone entirely: its first occurrence was one
+            first_seen = set()
+            gone = []
+            for d in duplicates:
+                if d.id not in first_seen:
+                    first_seen.add(d.id)
+                    if d.reason == 'isrc':
+                        gone.append(d.id)
+            membership.remove(playlist_id, gone, snapshot_id, scanned_snapshot_id)
+    return duplicates
+
+
+class PlaylistDiff:
+    """
+    What differs between a source and a target playlist, matched by ID or ISRC.
+    missing: URIs in the source but not the target; extra: (position, uri) pairs
+    in the target but not the source, relative to target_snapshot_id.
+    """
+
+    def __init__(self, missing, extra, target_snapshot_id):
+        self.missing = missing
+        self.extra = extra
+        self.target_snapshot_id = target_snapshot_id
+
+    def __bool__(self):
+        return bool(self.missing or self.extra)
+
+
+def diff(sp, source_id, target_id, isrc=True):
+    """Stream both playlists once and return a PlaylistDiff (only the source's keys are held)."""
+    target_snapshot_id = sp.playlist(target_id, fields='snapshot_id')['snapshot_id']
+    uris = []  # One per distinct source track
+    keys = {}  # track ID or ISRC -> index into uris
+    for track in iter_tracks(sp, source_id, isrc):
+        index = keys.get(track.id)
+        if index is None and track.isrc:
+            index = keys.get(track.isrc)
+        if index is None:
+            index = len(uris)
+            uris.append(track.uri)
+        keys[track.id] = index
+        if track.isrc:
+            keys.setdefault(track.isrc, index)
+
+    matched = bytearray(len(uris))
+    extra_positions = array('I')
+    extra_uris = []
+    for track in iter_tracks(sp, target_id, isrc):
+        index = keys.get(track.id)
+        if index is None and track.isrc:
+            index = keys.get(track.isrc)
+        if index is None:
+            extra_positions.append(track.position)
+            extra_uris.append(track.uri)
+        else:
+            matched[index] = 1
+
+    missing = [uri for uri, found in zip(uris, matched) if not found]
+    return PlaylistDiff(missing, list(zip(extra_positions, extra_uris)), target_snapshot_id)
+
+
+def mirror(sp, source_id, target_id, isrc=True, delete=False, apply=False, membership=None, progress=None):
+    """
+    Make target hold every track of source: add what's missing and, with delete=True,
+    remove what source doesn't have. Returns the PlaylistDiff; changes only with apply=True.
+    """
+    changes = diff(sp, source_id, target_id, isrc)
+    if not apply:
+        return changes
+
+    snapshot_id = changes.target_snapshot_id
+    # Removals first: their positions refer to the scanned snapshot, and adds append after them
+    if delete and changes.extra:
+        base_snapshot_id = snapshot_id
+        snapshot_id = remove_positions(sp, target_id, changes.extra, snapshot_id, progress)
+        if membership:
+            membership.remove(target_id, [uri.split(':')[-1] for _, uri in changes.extra],
+                              snapshot_id, base_snapshot_id)
+    for start in range(0, len(changes.missing), BATCH_SIZE):
+        chunk = changes.missing[start:start + BATCH_SIZE]
+        base_snapshot_id = snapshot_id
+        snapshot_id = sp.playlist_add_items(target_id, chunk)['snapshot_id']
+        if membership:
+            membership.add(target_id, [uri.split(':')[-1] for uri in chunk], snapshot_id, base_snapshot_id)
+        if progress:
+            progress(start + len(chunk), len(changes.missing))
+    return changes
+
+
+def _load_catalog(sp):
+    from catalog import PlaylistCatalog
+    from pagination import fetch_all_pages
+
+    items = fetch_all_pages(lambda offset: sp.current_user_playlists(limit=50, offset=offset), page_size=50)
+    return PlaylistCatalog((p['name'], p['id']) for p in items)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Find duplicate tracks, and diff or mirror playlists.")
+    # Shared by every command, so they go after the command name as documented above
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--no-isrc', dest='isrc', action='store_false',
+                        help="match by track ID only, not by recording (ISRC)")
+    common.add_argument('--apply', action='store_true', help="make the changes (default: only report them)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    dedupe_parser = commands.add_parser('dedupe', parents=[common], help="find duplicates in one or more playlists")
+    dedupe_parser.add_argument('playlists', nargs='+')
+    dedupe_parser.add_argument('--across', action='store_true',
+                               help="also count tracks already in an earlier playlist as duplicates (report only)")
+    for name, help_text in (('diff', "compare two playlists"), ('mirror', "copy SOURCE's tracks into TARGET")):
+        sub = commands.add_parser(name, parents=[common], help=help_text)
+        sub.add_argument('source')
+        sub.add_argument('target')
+        if name == 'mirror':
+            sub.add_argument('--delete', action='store_true', help="also remove tracks SOURCE doesn't have")
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    from spotify_auth import get_spotify_client
+    sp = get_spotify_client()
+    catalog = _load_catalog(sp)
+    try:
+        if args.command == 'dedupe':
+            playlist_ids = [catalog.resolve(query) for query in args.playlists]
+        else:
+            source_id, target_id = catalog.resolve(args.source), catalog.resolve(args.target)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == 'dedupe' and args.across:
+        for d in find_duplicates(sp, playlist_ids, args.isrc, across=True):
+            print(f"{catalog.name(d.playlist_id)} #{d.position + 1}: {d.uri} "
+                  f"(same {d.reason} as {catalog.name(d.first_playlist_id)} #{d.first_position + 1})")
+    elif args.command == 'dedupe':
+        for playlist_id in playlist_ids:
+            duplicates = dedupe(sp, playlist_id, args.isrc, args.apply)
+            for d in duplicates:
+                print(f"#{d.position + 1}: {d.uri} (same {d.reason} as #{d.first_position + 1})")
+            verb = "Removed" if args.apply else "Found"
+            print(f"{verb} {len(duplicates)} duplicates in {catalog.name(playlist_id)}")
+    else:
+        changes = (mirror(sp, source_id, target_id, args.isrc, args.delete, args.apply)
+                   if args.command == 'mirror' else diff(sp, source_id, target_id, args.isrc))
+        for uri in changes.missing:
+            print(f"+ {uri}")
+        for position, uri in changes.extra:
+            print(f"- #{position + 1}: {uri}")
+        print(f"{len(changes.missing)} missing from {catalog.name(target_id)}, "
+              f"{len(changes.extra)} not in {catalog.name(source_id)}")
+
+
+if __name__ == "__main__":
+    main()
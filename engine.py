@@ -0,0 +1,527 @@
+"""
+UI-free core of the app: playback monitoring, the playlist catalog, membership
+checks, Liked Songs state, prefetch for upcoming tracks, playback commands and
+queued playlist changes.
+The Tk window (main.py) and the headless daemon (daemon.py) are thin front ends
+over a PlaylistEngine; nothing here imports tkinter.
+
+Playback state comes from the local desktop client over MPRIS (mpris.py) when it
+is available, and from polling the Web API otherwise.
+
+Callbacks run on background threads. Front ends that need their own thread
+(e.g. Tk) should hand them over themselves, e.g. with root.after.
+"""
+import threading
+
+from instrumentation import startup
+from membership import MembershipIndex
+from cache_store import CacheStore
+from catalog import PlaylistCatalog
+from scheduler import PollScheduler, retry_after
+from pagination import fetch_all_pages
+from work_queue import WorkQueue
+from mutation_queue import MutationQueue
+from bulk_add import BulkAddResult, bulk_add, collect
+from liked import BATCH_SIZE as LIKED_BATCH_SIZE, LikedCache
+from prefetch import UpcomingTracks
+import dedupe
+
+PLAYBACK_COMMANDS = ('play', 'pause', 'next', 'previous')
+PLAYBACK_SOURCES = ('auto', 'mpris', 'web')  # 'auto' uses MPRIS when it's available
+SYNC_RETRY_DELAY = 30.0  # Seconds before resuming an index sync cut short by a network or server error
+BULK_ADD_WAIT = 20.0  # Seconds to follow a bulk add to Spotify before reporting the rest as queued
+
+
+def track_label(track):
+    """Return 'Name - Artist, Artist' for a track object."""
+    artists = ', '.join(artist['name'] for artist in track['artists'])
+    return f"{track['name']} - {artists}"
+
+
+class PlaylistEngine:
+    """Spotify state and operations shared by every front end."""
+
+    def __init__(self, sp=None, cache=None, on_track_changed=None, on_play_state=None,
+                 on_playlists=None, on_index_updated=None, on_mutation_failed=None, on_error=None,
+                 on_liked=None, playback_source='auto', mpris_bus='SESSION'):
+        self.sp = sp
+        # The apps pass CacheStore() for the on-disk cache; anything else (scripts, benchmarks) stays in memory
+        self.cache = cache or CacheStore(':memory:')
+        self.membership = MembershipIndex(self.cache, load=False)  # Loaded in start()
+        self.catalog = PlaylistCatalog()
+        self.liked = LikedCache()
+        self.upcoming = UpcomingTracks()
+        self.scheduler = PollScheduler()
+        self.work_queue = WorkQueue()
+        self.index_queue = WorkQueue("spotify-index")
+        self.command_queue = WorkQueue("spotify-commands")
+        self.mutations = None
+        self.mpris = None
+        self.playback_source = playback_source
+        self.mpris_bus = mpris_bus
+        self.running = False
+        self._start_lock = threading.Lock()
+        self._playlists_requested = False
+        self.indexing = False  # True while a sync is rescanning playlists
+        self._latest_snapshots = None  # The catalog listing the index should match
+
+        # Both the monitor and the MPRIS listener report playback; changes are applied and announced in order
+        self._playback_lock = threading.Lock()
+        self.current_track_id = None
+        self.current_track = None
+        self.is_playing = None
+        self._polled = threading.Condition()
+        self._polls_started = 0
+        self._polls_done = 0
+        self.selected_playlist_id = None  # Set by the front end; kept indexed ahead of track changes
+        self.changes_ready = 0  # Track changes whose membership was known locally when they happened
+
+        self.on_track_changed = on_track_changed  # (track_id, label); both None when nothing plays
+        self.on_play_state = on_play_state  # (is_playing)
+        self.on_playlists = on_playlists  # (diff) after the catalog changed
+        self.on_index_updated = on_index_updated  # () after membership was rescanned
+        self.on_mutation_failed = on_mutation_failed  # (playlist_id, track_ids, action, error)
+        self.on_error = on_error  # (message, error) for failures a user should see
+        self.on_liked = on_liked  # (track_id, liked) for the current track; only looked up when set
+
+        self._monitor_thread = None
+
+    def load_cached(self):
+        """Fill the catalog from the on-disk cache; returns the diff (no requests)."""
+        return self.catalog.update(self.cache.load_playlists())
+
+    def start(self, monitor=True, load_playlists=True):
+        """
+        Connect to Spotify, start flushing queued changes and start monitoring.
+        Blocks while spotipy is imported and the client is built, so front ends that
+        paint first should call this from a background thread. With load_playlists=False
+        the catalog is only refreshed once load_playlists() is called.
+        """
+        startup.mark('connecting')
+        if self.sp is None:
+            # Imported here rather than at the top: spotipy takes a few hundred ms to import
+            from spotify_auth import get_spotify_client
+            startup.mark('spotipy imported')
+            self.sp = get_spotify_client()
+            startup.mark('authenticated')
+        self.membership.load()
+        self.mutations = MutationQueue(self.cache, self.sp, self.membership,
+                                       on_failed=self._mutation_failed)
+        self.running = True
+        with self._start_lock:
+            load_playlists = load_playlists or self._playlists_requested
+            self._playlists_requested = False
+        if load_playlists:
+            self.load_playlists()
+        if monitor:
+            self._start_mpris()
+            self._monitor_thread = threading.Thread(target=self.monitor_current_track,
+                                                    name="spotify-monitor", daemon=True)
+            self._monitor_thread.start()
+
+    def stop(self):
+        self.running = False
+        self.scheduler.wake()
+        with self._polled:
+            self._polled.notify_all()
+        self.work_queue.stop()
+        self.index_queue.stop()
+        self.command_queue.stop()
+        if self.mutations:
+            self.mutations.stop()
+        if self.mpris:
+            self.mpris.stop()
+
+    def _emit(self, callback, *args):
+        if callback:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in {getattr(callback, '__name__', 'callback')}: {e}")
+
+    # Playlists
+
+    def load_playlists(self):
+        """Refresh the user's playlists from Spotify in the background (once connected, if not yet)."""
+        with self._start_lock:
+            if self.mutations is None:
+                self._playlists_requested = True
+                return
+        self.work_queue.submit('playlists', self.fetch_playlists)
+
+    def fetch_playlists(self):
+        """Fetch all playlists, update the catalog and cache, then resync the membership index."""
+        try:
+            # Fetch all playlists (remaining pages are fetched in parallel)
+            items = fetch_all_pages(
+                lambda offset: self.sp.current_user_playlists(limit=50, offset=offset),
+                page_size=50
+            )
+            playlists = [(p['name'], p['id']) for p in items]
+
+            startup.mark('playlists fetched')
+            self.cache.save_playlists(playlists)
+            diff = self.catalog.update(playlists)
+            self._emit(self.on_playlists, diff)
+
+            # Rescan playlists whose snapshot changed, so we know every playlist holding a track
+            snapshots = [(p['id'], p['snapshot_id']) for p in items]
+            self._latest_snapshots = snapshots
+            self.index_queue.submit('sync', self.sync_membership, snapshots)
+
+        except Exception as e:
+            self._emit(self.on_error, "Failed to load playlists", e)
+
+    def sync_membership(self, snapshots):
+        """Bring the membership index in line with the catalog's snapshot_ids."""
+        self.indexing = True
+        try:
+            self.membership.sync(self.sp, snapshots, should_stop=lambda: not self.running)
+        except Exception as e:
+            # Playlists rescanned so far are kept, so resuming only fetches the rest
+            wait = retry_after(e) or SYNC_RETRY_DELAY
+            print(f"Error indexing playlists (will resume in {wait:.0f}s): {e}")
+            timer = threading.Timer(wait, self._resume_sync, (snapshots,))
+            timer.daemon = True
+            timer.start()
+        finally:
+            self.indexing = False
+            # Also when nothing changed: the front end may be showing that indexing is in progress
+            self._emit(self.on_index_updated)
+
+    def _resume_sync(self, snapshots):
+        # A newer listing has its own sync queued already
+        if self.running and snapshots is self._latest_snapshots:
+            self.index_queue.submit('sync', self.sync_membership, snapshots)
+
+    def index_complete(self):
+        """True once every playlist in the catalog is indexed, so a track missing from the index is in none."""
+        playlist_ids = self.catalog.ids()
+        return bool(playlist_ids) and all(self.membership.snapshot_id(pid) for pid in playlist_ids)
+
+    def resolve_playlist(self, query):
+        """Return the playlist ID for an ID, name or search (see PlaylistCatalog.resolve)."""
+        return self.catalog.resolve(query)
+
+    # Playback
+
+    def _start_mpris(self):
+        """Follow the desktop client over MPRIS if allowed and possible; otherwise we keep polling."""
+        if self.playback_source == 'web':
+            return
+        try:
+            from mpris import MprisSource
+            source = MprisSource(on_track_changed=self._apply_track, on_play_state=self._apply_play_state,
+                                 on_active=self._mpris_active, bus=self.mpris_bus)
+            source.start()
+        except Exception as e:
+            # No jeepney or no session bus: expected off Linux, so only worth a word when asked for
+            if self.playback_source == 'mpris':
+                print(f"Error connecting to MPRIS, polling the Web API instead: {e}")
+            return
+        self.mpris = source
+
+    def _mpris_active(self, active):
+        # Let the monitor thread stop polling, or resume right away when the client quits
+        if active:
+            startup.mark('mpris connected')
+        self.scheduler.wake(burst=0)
+
+    def monitor_current_track(self):
+        """Poll the current track and playback state on the adaptive schedule, unless MPRIS reports them."""
+        while self.running:
+            if self.mpris and self.mpris.active:
+                # The desktop client pushes every change; sleep until it quits or we stop
+                self.scheduler.sleep(None)
+                continue
+            with self._polled:
+                self._polls_started += 1
+            try:
+                delay = self.poll_playback()
+            except Exception as e:
+                print(f"Error monitoring track: {e}")
+                delay = self.scheduler.on_error(e)
+            with self._polled:
+                self._polls_done += 1
+                self._polled.notify_all()
+
+            # Sleep until the track is about to end, or until one of our commands wakes us
+            self.scheduler.sleep(delay)
+
+    def poll_playback(self):
+        """Fetch the playback state once, report changes, and return the delay before the next poll."""
+        current = self.sp.current_playback()
+        startup.mark('first playback poll')
+        delay = self.scheduler.next_delay(current)
+
+        if current and current['item']:
+            self._apply_track(current['item']['id'], track_label(current['item']))
+            self._apply_play_state(current['is_playing'])
+        else:
+            self._apply_track(None, None)
+        return delay
+
+    def current(self):
+        """Return (track_id, label) of the current track as one consistent pair."""
+        with self._playback_lock:
+            return self.current_track_id, self.current_track
+
+    def refresh_playback(self, timeout=5.0):
+        """
+        Bring the current track up to date before answering about it: wake the monitor
+        and wait (up to timeout) for a poll that started after this call. Returns right
+        away while MPRIS reports playback; without a monitor thread, polls here.
+        """
+        if self.mpris and self.mpris.active:
+            return
+        if not (self._monitor_thread and self._monitor_thread.is_alive()):
+            self.poll_playback()
+            return
+        with self._polled:
+            # A poll already in flight may have read the old state; wait for the next one
+            target = self._polls_started + 1
+            self.scheduler.wake()
+            self._polled.wait_for(lambda: self._polls_done >= target or not self.running, timeout)
+
+    def _apply_track(self, track_id, label):
+        """Report a track change from either source; None when nothing is playing."""
+        with self._playback_lock:
+            if track_id == self.current_track_id:
+                return
+            self.current_track_id = track_id
+            self.current_track = label
+            if track_id and self.selected_playlist_id and \
+                    self.known_membership(self.selected_playlist_id, track_id) is not None:
+                self.changes_ready += 1
+            # Announced under the lock, so a racing report can't overtake this one
+            self._emit(self.on_track_changed, track_id, label)
+            if track_id:
+                liked_reported = self.check_liked(track_id)
+                self.work_queue.submit('prefetch', self.prefetch_upcoming, track_id, not liked_reported)
+
+    def _apply_play_state(self, is_playing):
+        with self._playback_lock:
+            if is_playing != self.is_playing:
+                self.is_playing = is_playing
+                self._emit(self.on_play_state, is_playing)
+
+    def playback(self, command):
+        """
+        Run 'play', 'pause', 'next' or 'previous': through the desktop client over MPRIS
+        when it's connected, otherwise through the Web API followed by a quick poll.
+        """
+        if command not in PLAYBACK_COMMANDS:
+            raise ValueError(f"Unknown playback command {command!r}")
+        if self.mpris and self.mpris.active:
+            self.mpris.command(command)
+            return
+        {
+            'play': self.sp.start_playback,
+            'pause': self.sp.pause_playback,
+            'next': self.sp.next_track,
+            'previous': self.sp.previous_track,
+        }[command]()
+        self.scheduler.wake()
+
+    def send_command(self, key, fn, *args, on_error=None, on_done=None):
+        """Run fn(*args) on the command worker; on_error/on_done are called on that worker afterwards."""
+        def run():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error running {fn.__name__}: {e}")
+                if on_error:
+                    on_error()
+            finally:
+                if on_done:
+                    on_done()
+
+        self.command_queue.submit(key, run)
+
+    # Liked Songs
+
+    def check_liked(self, track_id):
+        """
+        Report whether track_id is in Liked Songs via on_liked if it's cached; returns
+        False when it isn't, and prefetch_upcoming() should look it up and report it.
+        """
+        if not self.on_liked:
+            return True
+        liked = self.liked.get(track_id)
+        if liked is None:
+            return False
+        self._emit(self.on_liked, track_id, liked)
+        return True
+
+    # Upcoming tracks
+
+    def prefetch_upcoming(self, track_id, report_liked=True):
+        """
+        Make the state of the tracks queued after track_id known locally, so their
+        track changes need no requests: their Liked Songs state (one request for
+        whatever isn't cached) and the selected playlist's index (built once on the
+        index queue, then kept current by the membership checks). The queue is re-read only when our
+        copy runs low, so apart from building a missing index this costs at most
+        two requests, and usually none.
+        """
+        try:
+            upcoming = self.upcoming.advance(self.sp, track_id)
+        except Exception as e:
+            print(f"Error fetching the queue: {e}")
+            upcoming = []
+
+        if self.on_liked:
+            # The current track first: it's the one on screen; 50 IDs fit in one request
+            ids = [track_id] + upcoming
+            try:
+                states = self.liked.lookup(self.sp, ids[:LIKED_BATCH_SIZE])
+            except Exception as e:
+                print(f"Error checking Liked Songs: {e}")
+            else:
+                if report_liked and track_id == self.current_track_id:
+                    self._emit(self.on_liked, track_id, states[track_id])
+
+        playlist_id = self.selected_playlist_id
+        if playlist_id and upcoming and self.membership.snapshot_id(playlist_id) is None:
+            # A big playlist takes a while to scan; keep it off the queue that answers clicks
+            self.index_queue.submit(('prefetch', playlist_id), self._index_playlist, playlist_id)
+
+    def _index_playlist(self, playlist_id):
+        if self.membership.snapshot_id(playlist_id) is not None:
+            return  # Indexed meanwhile, e.g. by a membership check or the sync
+        try:
+            self.membership.track_ids(self.sp, playlist_id)
+        except Exception as e:
+            print(f"Error indexing playlist {playlist_id}: {e}")
+            return
+        self._emit(self.on_index_updated)
+
+    # Membership
+
+    def known_membership(self, playlist_id, track_id):
+        """Membership from local state only: queued changes first, then the index; None if unknown."""
+        pending = self.mutations.pending_action(playlist_id, track_id) if self.mutations else None
+        if pending:
+            return pending == 'add'
+        return self.membership.has(playlist_id, track_id)
+
+    def contains(self, playlist_id, track_id):
+        """Check membership against Spotify's current snapshot (blocking), honoring queued changes."""
+        pending = self.mutations.pending_action(playlist_id, track_id) if self.mutations else None
+        if pending:
+            return pending == 'add'
+        return self.membership.contains(self.sp, playlist_id, track_id)
+
+    def check_membership(self, track_id, playlist_id, callback):
+        """Queue a membership check, superseding any stale one; calls callback(track_id, playlist_id, in_playlist)."""
+        self.work_queue.submit('membership', self._fetch_membership, track_id, playlist_id, callback)
+
+    def cancel_membership_check(self):
+        self.work_queue.cancel('membership')
+
+    def _fetch_membership(self, track_id, playlist_id, callback):
+        try:
+            # Rescans only when the snapshot changed
+            in_playlist = self.contains(playlist_id, track_id)
+        except Exception as e:
+            print(f"Error checking track in playlist: {e}")
+            return
+        self._emit(callback, track_id, playlist_id, in_playlist)
+
+    def set_membership(self, playlist_id, track_id, in_playlist):
+        """Durably queue adding (or removing) a track; it reaches Spotify in the background."""
+        self.mutations.enqueue(playlist_id, track_id, 'add' if in_playlist else 'remove')
+
+    def playlists_containing(self, track_id):
+        """IDs of every playlist holding track_id, in catalog order, including queued changes (no requests)."""
+        containing = set(self.membership.playlists_containing(track_id))
+        if self.mutations:
+            for playlist_id, action in self.mutations.pending_for_track(track_id).items():
+                if action == 'add':
+                    containing.add(playlist_id)
+                else:
+                    containing.discard(playlist_id)
+        return [pid for pid in self.catalog.ids() if pid in containing]
+
+    def bulk_add(self, source, playlist_id, on_progress=None, timeout=BULK_ADD_WAIT):
+        """
+        Add every track from 'recent', 'queue' or 'album' that isn't in the playlist yet,
+        through the mutation queue, and wait up to timeout seconds for them to be sent
+        (blocking). Returns a BulkAddResult; tracks still queued are sent later.
+        """
+        track_ids, skipped = self._queue_bulk_add(source, playlist_id)
+        return self._follow_bulk_add(playlist_id, track_ids, skipped, on_progress, timeout)
+
+    def _queue_bulk_add(self, source, playlist_id):
+        return bulk_add(self.sp, self.membership, self.mutations, playlist_id, collect(self.sp, source))
+
+    def _follow_bulk_add(self, playlist_id, track_ids, skipped, on_progress, timeout):
+        rejected, pending = self.mutations.wait(playlist_id, track_ids, on_progress, timeout)
+        return BulkAddResult(len(track_ids) - len(rejected) - len(pending), skipped, len(rejected), len(pending))
+
+    def submit_bulk_add(self, source, playlist_id, on_progress=None, on_done=None, timeout=BULK_ADD_WAIT):
+        """Run bulk_add in the background; on_done(result, error) gets a BulkAddResult or the exception."""
+        def run():
+            try:
+                track_ids, skipped = self._queue_bulk_add(source, playlist_id)
+            except Exception as e:
+                print(f"Error adding {source} tracks: {e}")
+                self._emit(on_done, None, e)
+                return
+
+            # The queue sends them; follow it on a thread of our own so membership checks aren't held up
+            def follow():
+                result = self._follow_bulk_add(playlist_id, track_ids, skipped, on_progress, timeout)
+                self._emit(on_done, result, None)
+
+            threading.Thread(target=follow, name="bulk-add-progress", daemon=True).start()
+
+        self.work_queue.submit(('bulk', source, playlist_id), run)
+
+    def remove_duplicates(self, playlist_id, apply=True, on_progress=None):
+        """Find (and remove) repeated tracks, matched by ID or ISRC; returns the Duplicates (blocking)."""
+        return dedupe.dedupe(self.sp, playlist_id, apply=apply, membership=self.membership, progress=on_progress)
+
+    def submit_remove_duplicates(self, playlist_id, on_progress=None, on_done=None):
+        """Run remove_duplicates in the background; on_done(result, error) gets the Duplicates or the exception."""
+        self._submit_job(('dedupe', playlist_id), "removing duplicates",
+                         on_done, self.remove_duplicates, playlist_id, True, on_progress)
+
+    def _submit_job(self, key, description, on_done, fn, *args):
+        """
+        Run a long playlist job on the index queue, reporting on_done(result, error).
+        It pages through whole playlists, so it mustn't hold up membership checks on the work queue.
+        """
+        def run():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                print(f"Error {description}: {e}")
+                self._emit(on_done, None, e)
+                return
+            self._emit(on_done, result, None)
+
+        self.index_queue.submit(key, run)
+
+    def _mutation_failed(self, playlist_id, track_ids, action, error):
+        self._emit(self.on_mutation_failed, playlist_id, track_ids, action, error)
+
+    def http_cache_stats(self):
+        """ETag cache counters from the client's HTTP session, or None without one."""
+        cache = getattr(getattr(self.sp, '_session', None), 'cache', None)
+        return cache.stats() if cache else None
+
+    def stats(self):
+        """Counters from every component, for status output."""
+        return {
+            'playlists': len(self.catalog),
+            'index': self.membership.stats(),
+            'liked': self.liked.stats(),
+            'prefetch': dict(self.upcoming.stats(), ready=self.changes_ready),
+            'http_cache': self.http_cache_stats(),
+            'monitor': self.scheduler.stats(),
+            'playback_source': 'mpris' if self.mpris and self.mpris.active else 'web',
+            'mpris_events': self.mpris.events if self.mpris else 0,
+            'mutation_requests': self.mutations.requests if self.mutations else 0,
+            'mutations_flushed': self.mutations.flushed if self.mutations else 0,
+        }
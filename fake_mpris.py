@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Spotify desktop client's MPRIS interface, on a private
+D-Bus session bus. Answers Properties.Get/GetAll and the Play/Pause/Next/Previous
+methods, and emits PropertiesChanged like the real client. Track IDs match
+fake_spotify.py, so both fakes can describe the same library. Used by benchmark.py;
+needs jeepney and dbus-daemon.
+
+Run standalone with:
+  python fake_mpris.py     # prints a bus address to use as DBUS_SESSION_BUS_ADDRESS
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from fake_spotify import _track_id
+from mpris import BUS_NAME, OBJECT_PATH, PLAYER_INTERFACE, PROPERTIES_INTERFACE
+
+
+@contextmanager
+def private_session_bus():
+    """Start a throwaway dbus-daemon and yield its address."""
+    if not shutil.which('dbus-daemon'):
+        raise OSError("dbus-daemon is not installed")
+    with tempfile.TemporaryDirectory() as workdir:
+        address = f"unix:path={os.path.join(workdir, 'bus')}"
+        process = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--print-address', f'--address={address}'],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            process.stdout.readline()  # Printed once the bus is listening
+            yield address
+        finally:
+            process.terminate()
+            process.wait()
+
+
+class FakeMprisPlayer:
+    """A fake Spotify client that owns the MPRIS bus name and plays a numbered queue."""
+
+    def __init__(self, address, bus_name=BUS_NAME, track_duration_ms=210000):
+        from jeepney import DBusAddress
+        from jeepney.io.blocking import open_dbus_connection
+
+        self.bus_name = bus_name
+        self.track_duration_ms = track_duration_ms
+        self.position = 0
+        self.is_playing = True
+        self.commands = []
+        self.changed_at = None  # perf_counter() of the last PropertiesChanged signal
+
+        self._emitter = DBusAddress(OBJECT_PATH, interface=PROPERTIES_INTERFACE)
+        self._connection = open_dbus_connection(address)
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._request_name()
+        self._thread = threading.Thread(target=self._serve, name="fake-mpris", daemon=True)
+        self._thread.start()
+
+    def _request_name(self):
+        from jeepney import message_bus
+        from jeepney.io.blocking import Proxy
+
+        Proxy(message_bus, self._connection).RequestName(self.bus_name, 0x4)  # DO_NOT_QUEUE
+
+    def track_id(self):
+        return _track_id(self.position)
+
+    def metadata(self):
+        track_id = self.track_id()
+        return {
+            'mpris:trackid': ('o', f"/com/spotify/track/{track_id}"),
+            'mpris:length': ('t', self.track_duration_ms * 1000),
+            'xesam:title': ('s', f"Track {track_id[-6:]}"),
+            'xesam:artist': ('as', ['Fake Artist']),
+        }
+
+    def properties(self):
+        return {
+            'PlaybackStatus': ('s', 'Playing' if self.is_playing else 'Paused'),
+            'Metadata': ('a{sv}', self.metadata()),
+            'CanGoNext': ('b', True),
+            'CanGoPrevious': ('b', True),
+            'CanPlay': ('b', True),
+            'CanPause': ('b', True),
+        }
+
+    # Player actions: each emits PropertiesChanged like the real client
+
+    def next(self):
+        self.skip(1)
+
+    def previous(self):
+        self.skip(-1)
+
+    def skip(self, step):
+        self.position = max(self.position + step, 0)
+        self._changed({'Metadata': ('a{sv}', self.metadata())})
+
+    def set_playing(self, is_playing):
+        self.is_playing = is_playing
+        self._changed({'PlaybackStatus': ('s', 'Playing' if is_playing else 'Paused')})
+
+    def _changed(self, changed):
+        from jeepney import new_signal
+
+        message = new_signal(self._emitter, 'PropertiesChanged', 'sa{sv}as', (PLAYER_INTERFACE, changed, []))
+        with self._lock:
+            self.changed_at = time.perf_counter()
+            self._connection.send(message)
+
+    def quit(self):
+        """Leave the bus, as when the desktop client is closed."""
+        self._stopped = True
+        self._connection.close()
+
+    # Incoming method calls
+
+    def _serve(self):
+        from jeepney import HeaderFields, MessageType
+
+        while not self._stopped:
+            try:
+                message = self._connection.receive()
+            except Exception:
+                return
+            if message.header.message_type != MessageType.method_call:
+                continue
+            fields = message.header.fields
+            try:
+                reply = self._dispatch(fields.get(HeaderFields.interface), fields.get(HeaderFields.member),
+                                       message)
+            except KeyError:
+                from jeepney import new_error
+                reply = new_error(message, 'org.freedesktop.DBus.Error.UnknownMethod')
+            if reply is not None:
+                with self._lock:
+                    self._connection.send(reply)
+
+    def _dispatch(self, interface, member, message):
+        from jeepney import new_method_return
+
+        if interface == PROPERTIES_INTERFACE and member == 'GetAll':
+            return new_method_return(message, 'a{sv}', (self.properties(),))
+        if interface == PROPERTIES_INTERFACE and member == 'Get':
+            return new_method_return(message, 'v', (self.properties()[message.body[1]],))
+        if interface == PLAYER_INTERFACE and member in ('Play', 'Pause', 'PlayPause', 'Next', 'Previous'):
+            self.commands.append(member)
+            reply = new_method_return(message)
+            if member == 'Next':
+                self.position += 1
+            elif member == 'Previous':
+                self.position = max(self.position - 1, 0)
+            else:
+                self.is_playing = member == 'Play' or (member == 'PlayPause' and not self.is_playing)
+            # The real client answers first, then announces the change
+            with self._lock:
+                self._connection.send(reply)
+            if member in ('Next', 'Previous'):
+                self._changed({'Metadata': ('a{sv}', self.metadata())})
+            else:
+                self._changed({'PlaybackStatus': ('s', 'Playing' if self.is_playing else 'Paused')})
+            return None
+        raise KeyError(member)
+
+
+def main():
+    with private_session_bus() as address:
+        player = FakeMprisPlayer(address)
+        print(f"Fake MPRIS player on {address}")
+        print("Press Enter to skip to the next track, Ctrl+C to quit")
+        try:
+            while True:
+                input()
+                player.next()
+                print(f"Now playing {player.track_id()}")
+        except (KeyboardInterrupt, EOFError):
+            pass
+        finally:
+            player.quit()
+
+
+if __name__ == "__main__":
+    main()
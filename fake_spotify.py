@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the Spotify Web API this app uses.
+Serves me/playlists, playlists/{id}, playlists/{id}/tracks (and /items, including
+position-aware removals), me/player,
+the player commands, the queue, recently played, albums/{id}/tracks and the
+saved-tracks contains check from
+in-memory state, with configurable playlist sizes, injected latency and injected
+429s. GET responses carry an ETag and honour If-None-Match with a bodyless 304. Used by benchmark.py; needs no network.
+
+Run standalone with:
+  python fake_spotify.py --port 8901 --playlists 200 --tracks 8000
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _track_id(n):
+    """Deterministic 22-character base62-ish track ID."""
+    return f"fake{n:018d}"
+
+
+class FakeSpotifyState:
+    """In-memory library, playback and request counters behind the fake server."""
+
+    def __init__(self, playlists=50, tracks_per_playlist=500, big_playlist_tracks=None,
+                 track_duration_ms=210000, album_tracks=12, latency=0.0, jitter=0.0,
+                 rate_limit_ratio=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.track_duration_ms = track_duration_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.bytes_sent = 0
+        self.requests_by_endpoint = {}
+        self.not_modified = 0  # Requests answered with 304 Not Modified
+
+        # Library: playlist_id -> {'name', 'snapshot', 'tracks': [track IDs]}
+        self.playlists = {}
+        self.playlist_order = []
+        for p in range(playlists):
+            size = big_playlist_tracks if (p == 0 and big_playlist_tracks) else tracks_per_playlist
+            start = p * 37  # Overlapping ranges so tracks appear in several playlists
+            self.add_playlist(f"pl{p:020d}", f"Playlist {p}", [_track_id(start + i) for i in range(size)])
+
+        # Every track belongs to one album; it overlaps the start of the first playlist
+        self.album_id = "fakealbum0000000000000"
+        self.album = [_track_id(i * 3) for i in range(album_tracks)]
+
+        # Tracks get an ISRC derived from their ID; alias two IDs to one recording here
+        self.isrcs = {}
+
+        # Liked Songs: every fourth track
+        self.saved = {_track_id(i) for i in range(0, 10000, 4)}
+
+        # Playback: a virtual clock so benchmarks can fast-forward time
+        self.clock = 0.0
+        self.queue = [_track_id(i) for i in range(1000)]
+        self.position = 0
+        self.is_playing = True
+        self.track_started = 0.0
+        self.paused_progress = 0
+
+    def add_playlist(self, playlist_id, name, track_ids):
+        with self._lock:
+            self.playlists[playlist_id] = {'name': name, 'snapshot': 1, 'tracks': list(track_ids)}
+            self.playlist_order.append(playlist_id)
+
+    def advance(self, seconds):
+        """Move the virtual playback clock forward, rolling over to the next track as songs end."""
+        with self._lock:
+            self.clock += seconds
+            self._roll_tracks()
+
+    def _roll_tracks(self):
+        if not self.is_playing:
+            return
+        duration = self.track_duration_ms / 1000.0
+        while self.clock - self.track_started >= duration:
+            self.track_started += duration
+            self.position = (self.position + 1) % len(self.queue)
+
+    def _progress_ms(self):
+        if not self.is_playing:
+            return self.paused_progress
+        return int((self.clock - self.track_started) * 1000)
+
+    def snapshot_id(self, playlist_id):
+        return f"{playlist_id}-{self.playlists[playlist_id]['snapshot']}"
+
+    def count(self, endpoint, nbytes):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += nbytes
+            self.requests_by_endpoint[endpoint] = self.requests_by_endpoint.get(endpoint, 0) + 1
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def should_rate_limit(self):
+        with self._lock:
+            if self.rate_limit_ratio and self._random.random() < self.rate_limit_ratio:
+                self.rate_limited += 1
+                return True
+        return False
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.rate_limited = 0
+            self.bytes_sent = 0
+            self.requests_by_endpoint = {}
+            self.not_modified = 0
+
+    # Endpoint implementations: each returns (status, body)
+
+    def me(self):
+        return 200, {'id': 'fake-user', 'display_name': 'Fake User'}
+
+    def me_playlists(self, query):
+        limit = int(query.get('limit', 50))
+        offset = int(query.get('offset', 0))
+        with self._lock:
+            ids = self.playlist_order[offset:offset + limit]
+            items = [{'id': pid, 'name': self.playlists[pid]['name'],
+                      'snapshot_id': self.snapshot_id(pid),
+                      'tracks': {'total': len(self.playlists[pid]['tracks'])}} for pid in ids]
+            total = len(self.playlist_order)
+        return 200, self._page(items, total, offset, limit, 'me/playlists')
+
+    def playlist(self, playlist_id):
+        with self._lock:
+            if playlist_id not in self.playlists:
+                return 404, {'error': {'status': 404, 'message': 'Not found'}}
+            p = self.playlists[playlist_id]
+            return 200, {'id': playlist_id, 'name': p['name'], 'snapshot_id': self.snapshot_id(playlist_id)}
+
+    def playlist_items(self, playlist_id, query):
+        limit = int(query.get('limit', 100))
+        offset = int(query.get('offset', 0))
+        with self._lock:
+            if playlist_id not in self.playlists:
+                return 404, {'error': {'status': 404, 'message': 'Not found'}}
+            tracks = self.playlists[playlist_id]['tracks']
+            items = [{'track': {'id': tid, 'uri': f"spotify:track:{tid}", 'is_local': False,
+                                'external_ids': {'isrc': self.isrc(tid)}}}
+                     for tid in tracks[offset:offset + limit]]
+            total = len(tracks)
+        return 200, self._page(items, total, offset, limit, f"playlists/{playlist_id}/tracks")
+
+    def playlist_add(self, playlist_id, body):
+        uris = body if isinstance(body, list) else body.get('uris', [])
+        with self._lock:
+            p = self.playlists[playlist_id]
+            p['tracks'].extend(uri.split(':')[-1] for uri in uris)
+            p['snapshot'] += 1
+            return 201, {'snapshot_id': self.snapshot_id(playlist_id)}
+
+    def playlist_remove(self, playlist_id, body):
+        entries = body.get('items') or body.get('tracks') or []
+        with self._lock:
+            p = self.playlists[playlist_id]
+            if body.get('snapshot_id') not in (None, self.snapshot_id(playlist_id)):
+                # Positions are relative to the given snapshot; we only keep the latest one
+                return 400, {'error': {'status': 400, 'message': 'Stale snapshot_id'}}
+            positions = set()
+            for entry in entries:
+                tid = entry['uri'].split(':')[-1]
+                for position in entry.get('positions', ()):
+                    if position >= len(p['tracks']) or p['tracks'][position] != tid:
+                        return 400, {'error': {'status': 400, 'message': f"No {tid} at position {position}"}}
+                    positions.add(position)
+            remove = {entry['uri'].split(':')[-1] for entry in entries if 'positions' not in entry}
+            p['tracks'] = [tid for i, tid in enumerate(p['tracks']) if i not in positions and tid not in remove]
+            p['snapshot'] += 1
+            return 200, {'snapshot_id': self.snapshot_id(playlist_id)}
+
+    def isrc(self, tid):
+        return self.isrcs.get(tid) or f"QZFAK{tid[-7:]}"
+
+    def _track(self, tid):
+        return {'id': tid, 'name': f"Track {tid[-6:]}", 'duration_ms': self.track_duration_ms,
+                'artists': [{'name': 'Fake Artist'}], 'uri': f"spotify:track:{tid}", 'type': 'track',
+                'album': {'id': self.album_id, 'name': 'Fake Album'}}
+
+    def player(self):
+        with self._lock:
+            self._roll_tracks()
+            return 200, {
+                'is_playing': self.is_playing,
+                'progress_ms': self._progress_ms(),
+                'item': self._track(self.queue[self.position]),
+            }
+
+    def player_queue(self):
+        with self._lock:
+            self._roll_tracks()
+            upcoming = [self.queue[(self.position + i) % len(self.queue)] for i in range(1, 21)]
+            return 200, {'currently_playing': self._track(self.queue[self.position]),
+                         'queue': [self._track(tid) for tid in upcoming]}
+
+    def recently_played(self, query):
+        limit = int(query.get('limit', 20))
+        with self._lock:
+            self._roll_tracks()
+            # Spotify only keeps the last 50 plays
+            played = [self.queue[(self.position - i) % len(self.queue)] for i in range(1, min(limit, 50) + 1)]
+            return 200, {'items': [{'track': self._track(tid)} for tid in played], 'next': None,
+                         'cursors': None, 'limit': limit}
+
+    def album_items(self, album_id, query):
+        limit = int(query.get('limit', 50))
+        offset = int(query.get('offset', 0))
+        if album_id != self.album_id:
+            return 404, {'error': {'status': 404, 'message': 'Not found'}}
+        items = [{'id': tid, 'uri': f"spotify:track:{tid}", 'name': f"Track {tid[-6:]}"}
+                 for tid in self.album[offset:offset + limit]]
+        return 200, self._page(items, len(self.album), offset, limit, f"albums/{album_id}/tracks")
+
+    def saved_contains(self, query):
+        ids = [uri.split(':')[-1] for uri in (query.get('uris') or query.get('ids') or '').split(',') if uri]
+        if len(ids) > 50:
+            return 400, {'error': {'status': 400, 'message': 'Too many ids requested'}}
+        with self._lock:
+            return 200, [tid in self.saved for tid in ids]
+
+    def player_command(self, command):
+        with self._lock:
+            self._roll_tracks()
+            if command == 'pause' and self.is_playing:
+                self.paused_progress = self._progress_ms()
+                self.is_playing = False
+            elif command == 'play' and not self.is_playing:
+                self.track_started = self.clock - self.paused_progress / 1000.0
+                self.is_playing = True
+            elif command in ('next', 'previous'):
+                step = 1 if command == 'next' else -1
+                self.position = (self.position + step) % len(self.queue)
+                self.track_started = self.clock
+                self.paused_progress = 0
+        return 204, None
+
+    @staticmethod
+    def _page(items, total, offset, limit, path):
+        next_offset = offset + limit
+        return {
+            'items': items, 'total': total, 'offset': offset, 'limit': limit,
+            'next': f"http://fake/v1/{path}?offset={next_offset}&limit={limit}" if next_offset < total else None,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        state = self.server.state
+        url = urlparse(self.path)
+        path = url.path[len('/v1/'):] if url.path.startswith('/v1/') else url.path.lstrip('/')
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+
+        delay = state.latency + (random.uniform(0, state.jitter) if state.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if state.should_rate_limit():
+            self._respond(path, 429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                          {'Retry-After': str(state.retry_after)})
+            return
+
+        status, payload = self._route(state, method, path, query, body)
+        self._respond(path, status, payload, conditional=method == 'GET')
+
+    def _route(self, state, method, path, query, body):
+        if method == 'GET' and path == 'me':
+            return state.me()
+        if method == 'GET' and path == 'me/playlists':
+            return state.me_playlists(query)
+        if method == 'GET' and path == 'me/player':
+            return state.player()
+        if method == 'GET' and path == 'me/player/queue':
+            return state.player_queue()
+        if method == 'GET' and path == 'me/player/recently-played':
+            return state.recently_played(query)
+        if method == 'GET' and path in ('me/library/contains', 'me/tracks/contains'):
+            return state.saved_contains(query)
+        match = re.fullmatch(r'albums/([^/]+)/tracks/?', path)
+        if match and method == 'GET':
+            return state.album_items(match.group(1), query)
+        match = re.fullmatch(r'me/player/(play|pause|next|previous)', path)
+        if match and method in ('PUT', 'POST'):
+            return state.player_command(match.group(1))
+        match = re.fullmatch(r'playlists/([^/]+)/(?:tracks|items)', path)
+        if match:
+            if method == 'GET':
+                return state.playlist_items(match.group(1), query)
+            if method == 'POST':
+                return state.playlist_add(match.group(1), body)
+            if method == 'DELETE':
+                return state.playlist_remove(match.group(1), body)
+        match = re.fullmatch(r'playlists/([^/]+)', path)
+        if match and method == 'GET':
+            return state.playlist(match.group(1))
+        return 404, {'error': {'status': 404, 'message': f"Unknown endpoint {method} {path}"}}
+
+    def _respond(self, path, status, payload, headers=None, conditional=False):
+        data = json.dumps(payload).encode() if payload is not None else b''
+        if conditional and status == 200:
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get('If-None-Match') == etag:
+                status, data = 304, b''
+                self.server.state.count_not_modified()
+        self.server.state.count(path, len(data))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """Threaded HTTP server wrapping a FakeSpotifyState; use as a context manager."""
+
+    daemon_threads = True
+
+    def __init__(self, state=None, port=0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.state = state or FakeSpotifyState()
+        self._thread = None
+
+    @property
+    def prefix(self):
+        """API prefix to point a spotipy client at (sp.prefix = server.prefix)."""
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def fake_client(server, session=None):
+    """Return a spotipy client that talks to the fake server instead of api.spotify.com."""
+    import spotipy
+    from spotify_auth import build_session
+
+    sp = spotipy.Spotify(auth='fake-token', requests_session=session or build_session())
+    sp.prefix = server.prefix
+    return sp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Spotify Web API server.")
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--playlists', type=int, default=50)
+    parser.add_argument('--tracks', type=int, default=500, help="tracks per playlist")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    state = FakeSpotifyState(playlists=args.playlists, tracks_per_playlist=args.tracks,
+                             latency=args.latency, rate_limit_ratio=args.rate_limit)
+    server = FakeSpotifyServer(state, port=args.port)
+    print(f"Fake Spotify API listening on {server.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Per-endpoint request instrumentation.
+Every HTTP request made through the shared session (see spotify_auth.TunedSession)
+is recorded here: count, status, latency histogram, bytes, urllib3 retries and
+rate-limit headers. Click-to-feedback latency of the window's buttons is kept
+alongside, in ClickLatency. Both can be exported as Prometheus text or JSON.
+Startup milestones are recorded by StartupProfile (see main.py --profile-startup).
+"""
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+METRICS_PROM_FILE = "metrics.prom"
+METRICS_JSON_FILE = "metrics.json"
+
+# Latency histogram bucket upper bounds, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FRAME_BUDGET = 1 / 60  # Click feedback should land within one frame
+
+_ID_SEGMENT = re.compile(r'^[0-9A-Za-z]{22}$')
+
+
+def endpoint_name(method, url):
+    """Normalize a request to 'METHOD path', with Spotify IDs replaced by {id}."""
+    path = urlparse(url).path
+    if path.startswith('/v1/'):
+        path = path[len('/v1/'):]
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.strip('/').split('/')]
+    return f"{method} {'/'.join(segments)}"
+
+
+class _EndpointStats:
+    __slots__ = ('count', 'errors', 'rate_limited', 'retries', 'bytes', 'seconds', 'buckets',
+                 'statuses', 'last_retry_after')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.statuses = {}
+        self.last_retry_after = None
+
+    def percentile(self, fraction):
+        """Estimate a latency percentile from the histogram (upper bucket bound)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), self.buckets):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class RequestMetrics:
+    """Thread-safe collection of per-endpoint request statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, method, url, seconds, status=None, nbytes=0, retries=0, retry_after=None):
+        """Record one finished request; status is None when no response arrived."""
+        name = endpoint_name(method, url)
+        bucket = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        with self._lock:
+            stats = self._endpoints.get(name)
+            if stats is None:
+                stats = self._endpoints[name] = _EndpointStats()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.buckets[bucket] += 1
+            stats.bytes += nbytes
+            stats.retries += retries
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status is None or status >= 400:
+                stats.errors += 1
+            if status == 429:
+                stats.rate_limited += 1
+            if retry_after is not None:
+                stats.last_retry_after = retry_after
+
+    def record_response(self, method, url, seconds, response):
+        """Record a requests.Response, pulling size, retries and rate-limit headers from it."""
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', ()) or ()
+        # Prefer the on-the-wire size (compressed) when the server sent it
+        nbytes = int(response.headers.get('Content-Length') or len(response.content or b''))
+        self.record(method, url, seconds, status=response.status_code,
+                    nbytes=nbytes, retries=len(retries),
+                    retry_after=response.headers.get('Retry-After'))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def summary(self):
+        """Return {endpoint: {...}} with counts, bytes, retries and latency percentiles."""
+        with self._lock:
+            return {
+                name: {
+                    'count': s.count,
+                    'errors': s.errors,
+                    'rate_limited': s.rate_limited,
+                    'retries': s.retries,
+                    'bytes': s.bytes,
+                    'mean_seconds': s.seconds / s.count if s.count else 0.0,
+                    'p50_seconds': s.percentile(0.5),
+                    'p95_seconds': s.percentile(0.95),
+                    'statuses': {str(k): v for k, v in s.statuses.items()},
+                    'last_retry_after': s.last_retry_after,
+                    'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], s.buckets)),
+                }
+                for name, s in sorted(self._endpoints.items())
+            }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self):
+        """Render metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP spotify_request_duration_seconds Spotify Web API request latency.',
+            '# TYPE spotify_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for name, s in endpoints:
+                label = _label(name)
+                cumulative = 0
+                for bound, n in zip([str(b) for b in BUCKETS] + ['+Inf'], s.buckets):
+                    cumulative += n
+                    lines.append(f'spotify_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'spotify_request_duration_seconds_sum{{{label}}} {s.seconds:.6f}')
+                lines.append(f'spotify_request_duration_seconds_count{{{label}}} {s.count}')
+            for metric, attr, help_text in (
+                ('spotify_request_errors_total', 'errors', 'Requests that failed or returned >= 400.'),
+                ('spotify_request_rate_limited_total', 'rate_limited', 'Requests answered with 429.'),
+                ('spotify_request_retries_total', 'retries', 'Retries performed by the HTTP adapter.'),
+                ('spotify_response_bytes_total', 'bytes', 'Response body bytes received.'),
+            ):
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for name, s in endpoints:
+                    lines.append(f'{metric}{{{_label(name)}}} {getattr(s, attr)}')
+        return '\n'.join(lines) + '\n'
+
+
+
+def _label(name):
+    method, _, path = name.partition(' ')
+    return f'method="{method}",endpoint="{path}"'
+
+
+class ClickLatency:
+    """Thread-safe time from each kind of click to its visible feedback."""
+
+    def __init__(self, budget=FRAME_BUDGET):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._clicks = {}  # name -> [count, total seconds, worst seconds, over budget]
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._clicks.setdefault(name, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            if seconds > self.budget:
+                stats[3] += 1
+
+    def summary(self):
+        """Return {click: {...}} with counts, mean and worst latency, and how many missed the frame budget."""
+        with self._lock:
+            return {
+                name: {'count': count, 'mean_seconds': total / count, 'worst_seconds': worst, 'slow': slow}
+                for name, (count, total, worst, slow) in sorted(self._clicks.items())
+            }
+
+    def to_prometheus(self):
+        lines = [
+            '# HELP ui_click_feedback_seconds Time from a click to its visible feedback.',
+            '# TYPE ui_click_feedback_seconds summary',
+        ]
+        clicks = self.summary()
+        for name, s in clicks.items():
+            lines.append(f'ui_click_feedback_seconds_sum{{click="{name}"}} {s["mean_seconds"] * s["count"]:.6f}')
+            lines.append(f'ui_click_feedback_seconds_count{{click="{name}"}} {s["count"]}')
+        lines.append('# HELP ui_click_slow_total Clicks whose feedback took longer than one frame.')
+        lines.append('# TYPE ui_click_slow_total counter')
+        for name, s in clicks.items():
+            lines.append(f'ui_click_slow_total{{click="{name}"}} {s["slow"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def export(prom_path=METRICS_PROM_FILE, json_path=METRICS_JSON_FILE):
+    """Write request and click metrics to disk in both formats."""
+    with open(prom_path, 'w') as f:
+        f.write(metrics.to_prometheus() + clicks.to_prometheus())
+    with open(json_path, 'w') as f:
+        json.dump({'requests': metrics.summary(), 'clicks': clicks.summary()}, f, indent=2)
+
+
+class StartupProfile:
+    """
+    Time from launch to each startup milestone (imports done, first paint,
+    spotipy imported, authenticated, first data...). Each milestone is recorded
+    once; when enabled, milestones are printed as they happen.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._marks = {}
+
+    def begin(self, started=None, enabled=False):
+        """Measure from started (a time.perf_counter() value), defaulting to now."""
+        self.started = time.perf_counter() if started is None else started
+        self.enabled = enabled
+
+    def mark(self, name):
+        """Record that the milestone name was reached, unless it already was."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            if name in self._marks:
+                return
+            self._marks[name] = elapsed
+        if self.enabled:
+            print(f"[startup] {name:<20} {elapsed * 1000:8.1f} ms")
+
+    def elapsed(self, name):
+        """Seconds from launch to a milestone, or None if it wasn't reached."""
+        with self._lock:
+            return self._marks.get(name)
+
+    def between(self, start, end):
+        """Seconds between two milestones, or None if either wasn't reached."""
+        with self._lock:
+            if start in self._marks and end in self._marks:
+                return self._marks[end] - self._marks[start]
+        return None
+
+    def summary(self):
+        """Return {milestone: ms since launch} in the order they were reached."""
+        with self._lock:
+            return {name: seconds * 1000 for name, seconds in self._marks.items()}
+
+
+# Shared by every session built in spotify_auth
+metrics = RequestMetrics()
+
+# Click feedback latency of the window (main.py)
+clicks = ClickLatency()
+
+# Startup milestones for the current process
+startup = StartupProfile()
@@ -0,0 +1,80 @@
+"""
+Liked Songs state for the heart indicator.
+Looked up with the batched saved-tracks "contains" endpoint (up to 50 tracks per
+request) instead of paging through the library, and cached with a TTL so the
+current track's state is usually known before it starts playing.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+BATCH_SIZE = 50  # Max tracks per saved-tracks contains request
+TTL = 600.0  # Seconds before a cached answer is checked again (likes can change on other devices)
+MAX_ENTRIES = 5000
+
+
+class LikedCache:
+    """Track ID -> liked, with expiry and least-recently-used eviction."""
+
+    def __init__(self, ttl=TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # track_id -> (liked, expires_at)
+
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def get(self, track_id):
+        """Return True/False from the cache, or None if unknown or expired (no requests)."""
+        with self._lock:
+            entry = self._entries.get(track_id)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(track_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, track_id, liked):
+        """Record a known state, e.g. after liking a track ourselves."""
+        self._store({track_id: liked})
+
+    def _store(self, states):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for track_id, liked in states.items():
+                self._entries[track_id] = (liked, expires_at)
+                self._entries.move_to_end(track_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, sp, track_ids):
+        """
+        Return {track_id: liked} for track_ids, requesting only the ones not cached,
+        50 per request.
+        """
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with self._lock:
+            for track_id in dict.fromkeys(track_ids):
+                entry = self._entries.get(track_id)
+                if entry is None or entry[1] < now:
+                    missing.append(track_id)
+                else:
+                    result[track_id] = entry[0]
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            self.requests += 1
+            states = dict(zip(batch, sp.current_user_saved_tracks_contains(batch)))
+            self._store(states)
+            result.update(states)
+        return result
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses, 'requests': self.requests}
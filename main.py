@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
+import time
+LAUNCHED = time.perf_counter()  # Baseline for --profile-startup, before anything else is imported
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+import argparse
 import threading
-import time
-from spotify_auth import get_spotify_client, load_config, save_config, save_credentials
+from config_store import load_config, save_config, save_credentials
+import instrumentation
+from instrumentation import clicks, metrics, startup
+from cache_store import CacheStore
+from engine import PlaylistEngine
+from playlist_picker import PlaylistPicker
 import sys
 
+PLAYLIST_REFRESH_DELAY_MS = 3000  # Revalidate cached playlists once startup has settled
+
 class SpotifyPlaylistAdder:
-    def __init__(self, root):
+    def __init__(self, root, profile_startup=False):
         self.root = root
         self.root.title("")
-        self.root.geometry("320x260")
+        self.root.geometry("320x275")
         self.root.attributes('-topmost', True)  # Always on top
         self.root.resizable(False, False)
 
@@ -41,27 +50,48 @@ class SpotifyPlaylistAdder:
         self.offset_x = 0
         self.offset_y = 0
 
-        self.sp = None
         self.current_track = None
         self.current_track_id = None
-        self.playlists = []
-        self.running = True
+        self.selected_id = None
         self.last_added_track = None
         self.track_in_playlist = False
+        self.is_playing = False
+        self.pending_play_state = None
+        self.debug_overlay = None
+        self.profile_startup = profile_startup
+        self.playlists_requested = False
+        self.connect_failed = False
+
+        # All Spotify logic lives in the engine; its callbacks are handed to the Tk thread
+        self.engine = PlaylistEngine(
+            cache=CacheStore(),
+            on_track_changed=self.on_tk(self.on_track_changed),
+            on_play_state=self.on_tk(self.update_play_pause),
+            on_playlists=self.on_tk(self.apply_playlists),
+            on_index_updated=self.on_tk(self.update_in_playlists),
+            on_mutation_failed=self.on_tk(self.on_mutation_failed),
+            on_error=self.on_tk(self.show_error),
+            on_liked=self.on_tk(self.update_liked),
+            playback_source=load_config().get('playback_source', 'auto'),
+        )
+        self.catalog = self.engine.catalog
+        self.membership_result = self.on_tk(self.apply_membership)
 
         # Create UI first
         self.create_widgets()
 
-        # Initialize Spotify client (after UI is created)
+        # Paint from saved state now; connect to Spotify once the window is on screen
         self.init_spotify()
-
-        # Start background thread for track monitoring
-        self.monitor_thread = threading.Thread(target=self.monitor_current_track, daemon=True)
-        self.monitor_thread.start()
+        startup.mark('window built')
+        self.root.after_idle(self.on_first_paint)
 
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+    def on_tk(self, fn):
+        """Wrap fn so calling it from any thread runs it on the Tk thread."""
+        return lambda *args: self.root.after(0, fn, *args)
+
     def start_move(self, event):
         """Start dragging the window."""
         self.offset_x = event.x
@@ -74,7 +104,7 @@ class SpotifyPlaylistAdder:
         self.root.geometry(f'+{x}+{y}')
 
     def init_spotify(self):
-        """Initialize Spotify client with credentials."""
+        """Check credentials and paint the cached catalog (no network, no spotipy import)."""
         config = load_config()
 
         if not config.get('client_id') or not config.get('client_secret'):
@@ -84,14 +114,60 @@ class SpotifyPlaylistAdder:
                                "  python setup_auth.py")
             sys.exit(1)
 
+        # Paint the last known catalog immediately; it's revalidated later
+        diff = self.engine.load_cached()
+        if len(self.catalog):
+            self.apply_playlists(diff)
+        else:
+            self.playlist_var.set("Loading playlists...")
+
+    def on_first_paint(self):
+        """Runs once the window has been drawn: start connecting, and schedule the playlist refresh."""
+        startup.mark('first paint')
+        # Without a cached catalog there's nothing to pick from, so fetch playlists right away
+        load_now = not len(self.catalog)
+        self.playlists_requested = load_now
+        threading.Thread(target=self.connect, args=(load_now,), name="spotify-connect", daemon=True).start()
+        if not load_now:
+            self.root.after(PLAYLIST_REFRESH_DELAY_MS, self.request_playlists)
+        if self.profile_startup:
+            self.root.after(100, self.report_startup)
+
+    def connect(self, load_playlists):
+        """Background thread: import spotipy, authenticate and start the engine."""
         try:
-            self.sp = get_spotify_client()
-            self.load_playlists()
+            self.engine.start(load_playlists=load_playlists)
         except Exception as e:
-            messagebox.showerror("Authentication Error",
-                               f"Failed to authenticate with Spotify:\n{str(e)}\n\n"
-                               "Try running: python setup_auth.py")
-            sys.exit(1)
+            self.connect_failed = True
+            self.root.after(0, self.on_connect_failed, e)
+
+    def on_connect_failed(self, error):
+        messagebox.showerror("Authentication Error",
+                           f"Failed to authenticate with Spotify:\n{str(error)}\n\n"
+                           "Try running: python setup_auth.py")
+        sys.exit(1)
+
+    def request_playlists(self):
+        """Refresh playlists the first time they're needed (picker opened or startup settled)."""
+        if not self.playlists_requested:
+            self.playlists_requested = True
+            self.load_playlists()
+
+    def report_startup(self):
+        """With --profile-startup, print a summary once the first playback data has arrived."""
+        if startup.elapsed('first playback poll') is None and not self.connect_failed:
+            self.root.after(100, self.report_startup)
+            return
+
+        def ms(seconds):
+            return "n/a" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+        print("Startup profile:")
+        print(f"  imports:          {ms(startup.elapsed('imports'))}")
+        print(f"  first paint:      {ms(startup.elapsed('first paint'))}")
+        print(f"  spotipy import:   {ms(startup.between('connecting', 'spotipy imported'))}")
+        print(f"  authentication:   {ms(startup.between('spotipy imported', 'authenticated'))}")
+        print(f"  first data:       {ms(startup.elapsed('first playback poll'))}")
 
 
     def create_widgets(self):
@@ -108,12 +184,29 @@ class SpotifyPlaylistAdder:
         close_btn.bind('<Enter>', lambda e: close_btn.config(fg=self.fg_color))
         close_btn.bind('<Leave>', lambda e: close_btn.config(fg=self.secondary_fg))
 
+        # Liked Songs indicator, filled in once the state is known
+        self.liked_label = tk.Label(main_frame, text="", font=('SF Pro Display', 12),
+                                    fg=self.secondary_fg, bg=self.bg_color)
+        self.liked_label.place(x=255, y=-1)
+
         # Track info (large, prominent)
         self.track_label = tk.Label(main_frame, text="No track playing",
                                     font=('SF Pro Display', 11), fg=self.fg_color,
                                     bg=self.bg_color, wraplength=280, justify=tk.LEFT,
                                     anchor='w')
-        self.track_label.pack(fill=tk.X, pady=(15, 10))
+        self.track_label.pack(fill=tk.X, pady=(15, 2))
+
+        # Every playlist that already has the current track
+        self.in_playlists_label = tk.Label(main_frame, text="",
+                                           font=('SF Pro Display', 9), fg=self.secondary_fg,
+                                           bg=self.bg_color, wraplength=280, justify=tk.LEFT,
+                                           anchor='w')
+        self.in_playlists_label.pack(fill=tk.X, pady=(0, 8))
+
+        # Request metrics overlay: right-click the track name or press Ctrl+D
+        self.track_label.bind('<Button-2>', self.toggle_debug_overlay)
+        self.track_label.bind('<Button-3>', self.toggle_debug_overlay)
+        self.root.bind('<Control-d>', self.toggle_debug_overlay)
 
         # Playback controls (back, play/pause, next) - centered
         controls_container = tk.Frame(main_frame, bg=self.bg_color)
@@ -156,12 +249,12 @@ class SpotifyPlaylistAdder:
         self.playlist_var = tk.StringVar()
 
         # Dropdown button that triggers menu (with border)
-        dropdown_container = tk.Frame(main_frame, bg=self.secondary_fg, height=38)
-        dropdown_container.pack(fill=tk.X, pady=(0, 12))
-        dropdown_container.pack_propagate(False)
+        self.dropdown_container = tk.Frame(main_frame, bg=self.secondary_fg, height=38)
+        self.dropdown_container.pack(fill=tk.X, pady=(0, 12))
+        self.dropdown_container.pack_propagate(False)
 
         # Inner frame for actual content (creates border effect)
-        inner_dropdown = tk.Frame(dropdown_container, bg=self.hover_color)
+        inner_dropdown = tk.Frame(self.dropdown_container, bg=self.hover_color)
         inner_dropdown.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
 
         self.playlist_button = tk.Label(inner_dropdown,
@@ -183,19 +276,16 @@ class SpotifyPlaylistAdder:
                               cursor='hand2')
         arrow_label.pack(side=tk.RIGHT)
 
-        # Create menu for playlist selection
-        self.playlist_menu = tk.Menu(self.root, tearoff=0,
-                                    bg='#1a1a1a',
-                                    fg=self.fg_color,
-                                    activebackground=self.accent_color,
-                                    activeforeground='#ffffff',
-                                    bd=0,
-                                    relief='flat',
-                                    font=('SF Pro Display', 10))
+        # Searchable picker for playlist selection
+        self.picker = PlaylistPicker(self.root, self.catalog, self.select_playlist,
+                                     bg='#1a1a1a',
+                                     fg=self.fg_color,
+                                     accent=self.accent_color,
+                                     secondary_fg=self.secondary_fg)
 
-        # Bind click to show menu
-        self.playlist_button.bind('<Button-1>', self.show_playlist_menu)
-        arrow_label.bind('<Button-1>', self.show_playlist_menu)
+        # Bind click to show picker
+        self.playlist_button.bind('<Button-1>', self.show_playlist_picker)
+        arrow_label.bind('<Button-1>', self.show_playlist_picker)
 
         # Add button (prominent, Spotify green) - using Label for full color control
         button_container = tk.Frame(main_frame, bg=self.accent_color, height=44)
@@ -216,106 +306,132 @@ class SpotifyPlaylistAdder:
 
         # Also bind to container for full clickable area
         button_container.bind('<Button-1>', lambda e: self.add_to_playlist())
+
+        # Right-click for bulk adds (Button-2 is the right button on macOS)
+        self.bulk_menu = tk.Menu(self.root, tearoff=0, bg=self.bg_color, fg=self.fg_color,
+                                 activebackground=self.accent_color, activeforeground='#ffffff')
+        self.bulk_menu.add_command(label="Add recently played", command=lambda: self.bulk_add('recent'))
+        self.bulk_menu.add_command(label="Add queue", command=lambda: self.bulk_add('queue'))
+        self.bulk_menu.add_command(label="Add current album", command=lambda: self.bulk_add('album'))
+        self.bulk_menu.add_separator()
+        self.bulk_menu.add_command(label="Remove duplicates", command=self.remove_duplicates)
+        for widget in (self.add_button, button_container):
+            widget.bind('<Button-2>', self.show_bulk_menu)
+            widget.bind('<Button-3>', self.show_bulk_menu)
         button_container.bind('<Enter>', lambda e: [self.add_button.config(bg='#1ed760'), button_container.config(bg='#1ed760')])
         button_container.bind('<Leave>', lambda e: [self.add_button.config(bg=self.accent_color), button_container.config(bg=self.accent_color)])
 
         # Refresh button (minimal, bottom right)
         refresh_btn = tk.Label(main_frame, text="↻", font=('SF Pro Display', 14),
                               fg=self.secondary_fg, bg=self.bg_color, cursor='hand2')
-        refresh_btn.place(x=280, y=175)
+        refresh_btn.place(x=280, y=190)
         refresh_btn.bind('<Button-1>', lambda e: self.load_playlists())
         refresh_btn.bind('<Enter>', lambda e: refresh_btn.config(fg=self.fg_color))
         refresh_btn.bind('<Leave>', lambda e: refresh_btn.config(fg=self.secondary_fg))
 
-    def show_playlist_menu(self, event):
-        """Show the playlist selection menu."""
-        try:
-            self.playlist_menu.tk_popup(event.x_root, event.y_root)
-        finally:
-            self.playlist_menu.grab_release()
-
-    def select_playlist(self, playlist_name):
-        """Handle playlist selection from menu."""
-        self.playlist_var.set(playlist_name)
+    def show_playlist_picker(self, event):
+        """Open (or close) the searchable playlist picker under the dropdown."""
+        self.request_playlists()
+        container = self.dropdown_container
+        self.picker.open(container.winfo_rootx(),
+                         container.winfo_rooty() + container.winfo_height(),
+                         container.winfo_width(),
+                         self.selected_playlist_id())
+
+    def select_playlist(self, playlist_id):
+        """Handle playlist selection from the picker."""
+        self.selected_id = playlist_id
+        self.engine.selected_playlist_id = playlist_id
+        self.playlist_var.set(self.catalog.label(playlist_id))
         config = load_config()
-        config['selected_playlist'] = playlist_name
+        config['selected_playlist_id'] = playlist_id
+        config['selected_playlist'] = self.catalog.name(playlist_id)
         save_config(config)
         # Check if current track is in the newly selected playlist
-        threading.Thread(target=self.check_track_in_playlist, daemon=True).start()
+        self.check_track_in_playlist()
 
     def load_playlists(self):
-        """Load user's playlists from Spotify."""
-        try:
-            # Fetch all playlists (paginate through results)
-            self.playlists = []
-            results = self.sp.current_user_playlists(limit=50)
-            self.playlists.extend([(p['name'], p['id']) for p in results['items']])
-
-            # Continue fetching if there are more playlists
-            while results['next']:
-                results = self.sp.next(results)
-                self.playlists.extend([(p['name'], p['id']) for p in results['items']])
-
-            # Clear and rebuild menu
-            self.playlist_menu.delete(0, tk.END)
-
-            playlist_names = [name for name, _ in self.playlists]
-
-            # Add playlists to menu
-            for name in playlist_names:
-                self.playlist_menu.add_command(
-                    label=name,
-                    command=lambda n=name: self.select_playlist(n)
-                )
-
-            # Load saved playlist selection
-            config = load_config()
-            saved_playlist = config.get('selected_playlist')
-
-            if saved_playlist and saved_playlist in playlist_names:
-                self.playlist_var.set(saved_playlist)
-            elif playlist_names:
-                self.playlist_var.set(playlist_names[0])
-            else:
-                self.playlist_var.set("No playlists found")
+        """Refresh the user's playlists from Spotify in the background."""
+        self.engine.load_playlists()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load playlists:\n{str(e)}")
-
-    def monitor_current_track(self):
-        """Background thread to monitor currently playing track and playback state."""
-        while self.running:
-            try:
-                current = self.sp.current_playback()
-
-                if current and current['item']:
-                    track = current['item']
-                    track_id = track['id']
-                    track_name = track['name']
-                    artists = ', '.join([artist['name'] for artist in track['artists']])
-                    is_playing = current['is_playing']
-
-                    if track_id != self.current_track_id:
-                        self.current_track_id = track_id
-                        self.current_track = f"{track_name} - {artists}"
-                        self.root.after(0, self.update_track_label)
-                        # Check if new track is in playlist
-                        threading.Thread(target=self.check_track_in_playlist, daemon=True).start()
-
-                    # Update play/pause button icon
-                    expected_icon = "⏸" if is_playing else "▶"
-                    if self.play_pause_btn['text'] != expected_icon:
-                        self.root.after(0, lambda: self.play_pause_btn.config(text=expected_icon))
-                else:
-                    if self.current_track_id is not None:
-                        self.current_track_id = None
-                        self.current_track = None
-                        self.root.after(0, self.update_track_label)
-
-            except Exception as e:
-                print(f"Error monitoring track: {e}")
-
-            time.sleep(2)  # Poll every 2 seconds
+    def show_error(self, message, error):
+        """Report a background failure the user should know about."""
+        messagebox.showerror("Error", f"{message}:\n{str(error)}")
+
+    def apply_playlists(self, diff):
+        """Reflect a catalog change (from PlaylistCatalog.update) in the UI; nothing to do if it's empty."""
+        if self.selected_id and not any(diff.values()):
+            return
+        self.picker.refresh()
+
+        # Keep the current selection (by ID, so renames and duplicate names are fine),
+        # else fall back to the saved one
+        config = load_config()
+        saved_id = config.get('selected_playlist_id')
+        saved_names = self.catalog.ids_named(config.get('selected_playlist'))
+        selected = self.selected_id
+
+        if selected in self.catalog:
+            pass
+        elif saved_id in self.catalog:
+            self.selected_id = saved_id
+        elif saved_names:
+            self.selected_id = saved_names[0]
+        elif len(self.catalog):
+            self.selected_id = self.catalog.ids()[0]
+        else:
+            self.selected_id = None
+        self.engine.selected_playlist_id = self.selected_id
+
+        if self.selected_id:
+            self.playlist_var.set(self.catalog.label(self.selected_id))
+        else:
+            self.playlist_var.set("No playlists found")
+
+        if self.selected_id != selected:
+            self.check_track_in_playlist()
+        else:
+            self.update_in_playlists()
+
+    def on_track_changed(self, track_id, track):
+        """Apply a track change reported by the monitor thread (runs on the Tk thread)."""
+        self.current_track_id = track_id
+        self.current_track = track
+        self.update_track_label()
+        # Both were usually prefetched while the previous track played, so the heart
+        # and the button change in the same frame as the title
+        liked = self.engine.liked.get(track_id) if track_id else None
+        if liked is None:
+            self.liked_label.config(text="")  # Until on_liked reports the new track's state
+        else:
+            self.update_liked(track_id, liked)
+
+        # Use the local index right away if it already covers the selected playlist
+        playlist_id = self.selected_playlist_id()
+        known = self.engine.known_membership(playlist_id, track_id) if track_id and playlist_id else None
+        if known is not None:
+            self.apply_membership(track_id, playlist_id, known)
+        else:
+            self.update_in_playlists()
+
+        # Check if new track is in playlist (confirms the snapshot is still current)
+        self.check_track_in_playlist()
+
+    def update_liked(self, track_id, liked):
+        """Show whether the current track is in Liked Songs."""
+        if track_id != self.current_track_id:
+            return
+        if liked:
+            self.liked_label.config(text="♥", fg=self.accent_color)
+        else:
+            self.liked_label.config(text="♡", fg=self.secondary_fg)
+
+    def update_play_pause(self, is_playing):
+        """Update the play/pause button icon (ignored while our own play/pause command is in flight)."""
+        if self.pending_play_state is not None:
+            return
+        self.is_playing = is_playing
+        self.play_pause_btn.config(text="⏸" if is_playing else "▶")
 
     def update_track_label(self):
         """Update the track label in the UI."""
@@ -332,43 +448,99 @@ class SpotifyPlaylistAdder:
             self.root.after(1500, self.update_button_state)
             return
 
-        playlist_name = self.playlist_var.get()
-        if not playlist_name or playlist_name == "No playlists found":
+        playlist_id = self.selected_playlist_id()
+        if not playlist_id:
             # Show inline feedback instead of popup
             self.add_button.config(text="Select playlist first", bg='#8b0000')
             self.root.after(1500, self.update_button_state)
             return
 
-        # Find playlist ID
-        playlist_id = None
-        for name, pid in self.playlists:
-            if name == playlist_name:
-                playlist_id = pid
-                break
+        # Update the UI optimistically; the change is queued durably and sent in the background
+        started = time.perf_counter()
+        self.track_in_playlist = not self.track_in_playlist
+        self.engine.set_membership(playlist_id, self.current_track_id, self.track_in_playlist)
+        if self.track_in_playlist:
+            self.add_button.config(text="✓ Added", bg='#1ed760')
+        else:
+            self.add_button.config(text="✓ Removed", bg='#ff6b6b')
+        self.root.after(1200, self.update_button_state)
+        self.record_click_latency('add_to_playlist', started)
+
+    def show_bulk_menu(self, event):
+        """Offer adding the recent tracks, the queue or the current album to the selected playlist."""
+        self.bulk_menu.tk_popup(event.x_root, event.y_root)
 
+    def bulk_add(self, source):
+        """Add every new track from source to the selected playlist, showing progress on the button."""
+        playlist_id = self.selected_playlist_id()
         if not playlist_id:
-            self.add_button.config(text="Playlist not found", bg='#8b0000')
+            self.add_button.config(text="Select playlist first", bg='#8b0000')
             self.root.after(1500, self.update_button_state)
             return
 
-        try:
-            if self.track_in_playlist:
-                # Remove from playlist
-                self.sp.playlist_remove_all_occurrences_of_items(playlist_id, [self.current_track_id])
-                self.track_in_playlist = False
-                self.add_button.config(text="✓ Removed", bg='#ff6b6b')
-                self.root.after(1200, self.update_button_state)
-            else:
-                # Add to playlist
-                self.sp.playlist_add_items(playlist_id, [self.current_track_id])
-                self.track_in_playlist = True
-                self.add_button.config(text="✓ Added", bg='#1ed760')
-                self.root.after(1200, self.update_button_state)
+        self.add_button.config(text="Collecting tracks…", bg=self.accent_color)
+        self.engine.submit_bulk_add(source, playlist_id,
+                                    on_progress=self.on_tk(self.show_bulk_progress),
+                                    on_done=self.on_tk(self.bulk_add_done))
 
-        except Exception as e:
-            print(f"Error modifying playlist: {e}")
+    def show_bulk_progress(self, done, total):
+        self.add_button.config(text=f"Adding {done}/{total}…")
+
+    def bulk_add_done(self, result, error):
+        if error:
             self.add_button.config(text="Error", bg='#8b0000')
+        elif result.failed and not result.added and not result.queued:
+            self.add_button.config(text=f"Spotify refused {result.failed} tracks", bg='#8b0000')
+        else:
+            text = f"✓ Added {result.added} · {result.skipped} already in"
+            if result.queued:
+                text += f" · {result.queued} queued"
+            if result.failed:
+                text += f" · {result.failed} refused"
+            self.add_button.config(text=text, bg='#1ed760')
+        self.root.after(2000, self.update_button_state)
+        # The current track may have been one of them
+        self.check_track_in_playlist()
+
+    def remove_duplicates(self):
+        """Remove repeated tracks (same ID or same recording) from the selected playlist."""
+        playlist_id = self.selected_playlist_id()
+        if not playlist_id:
+            self.add_button.config(text="Select playlist first", bg='#8b0000')
             self.root.after(1500, self.update_button_state)
+            return
+
+        self.add_button.config(text="Scanning for duplicates…", bg=self.accent_color)
+        self.engine.submit_remove_duplicates(
+            playlist_id,
+            on_progress=self.on_tk(lambda done, total: self.add_button.config(text=f"Removing {done}/{total}…")),
+            on_done=self.on_tk(self.remove_duplicates_done))
+
+    def remove_duplicates_done(self, duplicates, error):
+        if error:
+            self.add_button.config(text="Error", bg='#8b0000')
+        elif duplicates:
+            self.add_button.config(text=f"✓ Removed {len(duplicates)} duplicates", bg='#1ed760')
+        else:
+            self.add_button.config(text="✓ No duplicates", bg='#1ed760')
+        self.root.after(2000, self.update_button_state)
+
+    def on_mutation_failed(self, playlist_id, track_ids, action, error):
+        """Undo an optimistic add/remove that Spotify permanently rejected."""
+        if self.current_track_id in track_ids and playlist_id == self.selected_playlist_id():
+            self.track_in_playlist = action == 'remove'
+        self.add_button.config(text="Error", bg='#8b0000')
+        self.root.after(1500, self.update_button_state)
+
+    def send_command(self, key, fn, *args, on_error=None, on_done=None):
+        """Run a Spotify command in the background; on_error/on_done run on the Tk thread afterwards."""
+        self.engine.send_command(key, fn, *args,
+                                 on_error=on_error and self.on_tk(on_error),
+                                 on_done=on_done and self.on_tk(on_done))
+
+    def record_click_latency(self, name, started):
+        """Record how long a click took to produce visible feedback."""
+        clicks.record(name, time.perf_counter() - started)
 
     def update_button_state(self):
         """Update the add/remove button based on current track status in playlist."""
@@ -376,77 +548,170 @@ class SpotifyPlaylistAdder:
             self.add_button.config(text="Remove from Playlist", bg='#ff6b6b')
         else:
             self.add_button.config(text="Add to Playlist", bg=self.accent_color)
+        self.update_in_playlists()
 
-    def check_track_in_playlist(self):
-        """Check if current track is in the selected playlist."""
+    def update_in_playlists(self):
+        """Show every playlist that has the current track, from the local index (no requests)."""
         if not self.current_track_id:
+            self.in_playlists_label.config(text="")
             return
 
-        playlist_name = self.playlist_var.get()
-        if not playlist_name or playlist_name == "No playlists found":
-            return
+        containing = self.engine.playlists_containing(self.current_track_id)
+        # The selected playlist reflects our optimistic add/remove state
+        selected_id = self.selected_playlist_id()
+        if selected_id in containing and not self.track_in_playlist:
+            containing.remove(selected_id)
+        elif selected_id and selected_id not in containing and self.track_in_playlist:
+            containing.insert(0, selected_id)
+
+        names = [self.catalog.name(pid) for pid in containing]
+        if not names:
+            # Only claim that once every playlist is indexed: the rest might still have it
+            if self.engine.index_complete():
+                self.in_playlists_label.config(text="Not in any of your playlists")
+            else:
+                self.in_playlists_label.config(text="Indexing playlists…" if self.engine.indexing else "")
+        elif len(names) > 4:
+            self.in_playlists_label.config(text=f"In: {', '.join(names[:4])} +{len(names) - 4} more")
+        else:
+            self.in_playlists_label.config(text=f"In: {', '.join(names)}")
 
-        # Find playlist ID
-        playlist_id = None
-        for name, pid in self.playlists:
-            if name == playlist_name:
-                playlist_id = pid
-                break
+    def selected_playlist_id(self):
+        """Return the ID of the playlist selected in the dropdown, or None."""
+        return self.selected_id if self.selected_id in self.catalog else None
 
-        if not playlist_id:
+    def check_track_in_playlist(self):
+        """Queue a membership check for the current track, superseding any stale one."""
+        if not self.current_track_id:
+            self.engine.cancel_membership_check()
             return
 
-        try:
-            # Check if track is in playlist
-            results = self.sp.playlist_items(playlist_id, fields='items.track.id', limit=100)
-            track_ids = [item['track']['id'] for item in results['items'] if item['track']]
-
-            # Handle pagination if playlist has more than 100 tracks
-            while results['next']:
-                results = self.sp.next(results)
-                track_ids.extend([item['track']['id'] for item in results['items'] if item['track']])
+        playlist_id = self.selected_playlist_id()
+        if not playlist_id:
+            return
 
-            self.track_in_playlist = self.current_track_id in track_ids
-            self.update_button_state()
+        self.engine.check_membership(self.current_track_id, playlist_id, self.membership_result)
 
-        except Exception as e:
-            print(f"Error checking track in playlist: {e}")
+    def apply_membership(self, track_id, playlist_id, in_playlist):
+        """Update the button with a membership result, unless the track or playlist has changed since."""
+        if track_id != self.current_track_id or playlist_id != self.selected_playlist_id():
+            return
+        pending = self.engine.mutations.pending_action(playlist_id, track_id)
+        if pending:
+            # Our own queued add/remove is newer than what Spotify reported
+            in_playlist = pending == 'add'
+        self.track_in_playlist = in_playlist
+        self.update_button_state()
 
     def toggle_play_pause(self):
-        """Toggle play/pause on Spotify."""
-        try:
-            playback = self.sp.current_playback()
-            if playback and playback['is_playing']:
-                self.sp.pause_playback()
-                self.play_pause_btn.config(text="▶")
-            else:
-                self.sp.start_playback()
-                self.play_pause_btn.config(text="⏸")
-        except Exception as e:
-            print(f"Error toggling playback: {e}")
+        """Toggle play/pause on Spotify, using the playback state the monitor already knows."""
+        started = time.perf_counter()
+        was_playing = self.is_playing
+        target = not was_playing
+        self.is_playing = target
+        self.pending_play_state = target
+        self.play_pause_btn.config(text="⏸" if target else "▶")
+
+        # Both only act while this click is still the latest; a newer click owns the state
+        def rollback():
+            if self.pending_play_state == target:
+                self.pending_play_state = None
+                self.is_playing = was_playing
+                self.play_pause_btn.config(text="⏸" if was_playing else "▶")
+
+        def done():
+            if self.pending_play_state == target:
+                self.pending_play_state = None
+
+        self.send_command('play_pause', self.engine.playback, 'play' if target else 'pause',
+                          on_error=rollback, on_done=done)
+        self.record_click_latency('toggle_play_pause', started)
 
     def previous_track(self):
         """Skip to previous track."""
-        try:
-            self.sp.previous_track()
-        except Exception as e:
-            print(f"Error going to previous track: {e}")
+        started = time.perf_counter()
+        self.send_command(None, self.engine.playback, 'previous')
+        self.record_click_latency('previous_track', started)
 
     def next_track(self):
         """Skip to next track."""
+        started = time.perf_counter()
+        self.send_command(None, self.engine.playback, 'next')
+        self.record_click_latency('next_track', started)
+
+    def toggle_debug_overlay(self, event=None):
+        """Show or hide the live request metrics overlay."""
+        if self.debug_overlay:
+            self.debug_overlay.destroy()
+            self.debug_overlay = None
+            return
+
+        self.debug_overlay = tk.Toplevel(self.root, bg=self.bg_color)
+        self.debug_overlay.attributes('-topmost', True)
+        self.debug_overlay.title("Spotify requests")
+
+        self.debug_label = tk.Label(self.debug_overlay, font=('Menlo', 9), fg=self.fg_color,
+                                    bg=self.bg_color, justify=tk.LEFT, anchor='nw')
+        self.debug_label.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 4))
+
+        export_btn = tk.Label(self.debug_overlay, text="Export metrics", font=('SF Pro Display', 10),
+                              fg=self.secondary_fg, bg=self.bg_color, cursor='hand2')
+        export_btn.pack(anchor='e', padx=10, pady=(0, 8))
+        export_btn.bind('<Button-1>', lambda e: self.export_metrics(export_btn))
+
+        self.debug_overlay.protocol("WM_DELETE_WINDOW", self.toggle_debug_overlay)
+        self.refresh_debug_overlay()
+
+    def refresh_debug_overlay(self):
+        """Redraw the metrics overlay once a second while it's open."""
+        if not self.debug_overlay:
+            return
+
+        lines = [f"{'endpoint':<34}{'n':>5}{'p50':>7}{'p95':>7}{'err':>5}{'429':>5}{'rty':>5}{'KiB':>7}"]
+        for name, s in metrics.summary().items():
+            lines.append(f"{name[:33]:<34}{s['count']:>5}{s['p50_seconds'] * 1000:>6.0f}m"
+                         f"{s['p95_seconds'] * 1000:>6.0f}m{s['errors']:>5}{s['rate_limited']:>5}"
+                         f"{s['retries']:>5}{s['bytes'] / 1024:>7.0f}")
+        stats = self.engine.scheduler.stats()
+        lines.append("")
+        lines.append(f"monitor: {stats['polls']} polls, {stats['requests_per_hour']:.0f}/h "
+                     f"(fixed 2s: {stats['fixed_interval_requests_per_hour']:.0f}/h)")
+        cache = self.engine.http_cache_stats()
+        if cache:
+            lines.append(f"etag cache: {cache['hits']} not modified, {cache['misses']} full, "
+                         f"{cache['bytes_saved'] / 1024:.0f} KiB saved")
+        for name, s in clicks.summary().items():
+            lines.append(f"click {name}: {s['count']}x, mean {s['mean_seconds'] * 1000:.1f}ms, "
+                         f"worst {s['worst_seconds'] * 1000:.1f}ms, {s['slow']} over a frame")
+        self.debug_label.config(text='\n'.join(lines))
+        self.root.after(1000, self.refresh_debug_overlay)
+
+    def export_metrics(self, button):
+        """Write metrics.prom and metrics.json next to config.json."""
         try:
-            self.sp.next_track()
-        except Exception as e:
-            print(f"Error going to next track: {e}")
+            instrumentation.export()
+            button.config(text="✓ Exported")
+        except OSError as e:
+            print(f"Error exporting metrics: {e}")
+            button.config(text="Error")
+        self.root.after(1500, lambda: button.winfo_exists() and button.config(text="Export metrics"))
 
     def on_close(self):
         """Handle window close event."""
-        self.running = False
+        self.picker.close()
+        self.engine.stop()
         self.root.destroy()
 
 def main():
+    parser = argparse.ArgumentParser(description="Floating window for adding the current Spotify track to a playlist.")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print import, first paint, auth and first data times")
+    args = parser.parse_args()
+
+    startup.begin(LAUNCHED, enabled=args.profile_startup)
+    startup.mark('imports')
     root = tk.Tk()
-    app = SpotifyPlaylistAdder(root)
+    app = SpotifyPlaylistAdder(root, profile_startup=args.profile_startup)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+"""
+Track membership index across the user's playlists.
+Keeps the track IDs of each playlist, tagged with the playlist's snapshot_id,
+so checking the current track doesn't require paging through the whole playlist,
+and so every playlist containing a track can be found without any request.
+
+Storage is compact: track IDs are interned to integers once, and each playlist
+holds a sorted array('I') of them (4 bytes per entry). Looking up which playlists
+contain a track is a binary search per playlist.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+from pagination import MAX_WORKERS, fetch_all_pages
+
+SYNC_PLAYLISTS_AT_ONCE = 4  # x fetch_all_pages workers each; keep within the HTTP pool size
+
+
+class _Interner:
+    """Maps track ID strings to small integers and back."""
+
+    def __init__(self):
+        self._ids = {}
+        self._strings = []
+
+    def intern(self, track_id):
+        number = self._ids.get(track_id)
+        if number is None:
+            number = self._ids[track_id] = len(self._strings)
+            self._strings.append(track_id)
+        return number
+
+    def lookup(self, track_id):
+        """Return the integer for track_id, or None if it was never seen."""
+        return self._ids.get(track_id)
+
+    def string(self, number):
+        return self._strings[number]
+
+    def __len__(self):
+        return len(self._strings)
+
+
+def _contains(numbers, number):
+    index = bisect_left(numbers, number)
+    return index < len(numbers) and numbers[index] == number
+
+
+class MembershipIndex:
+    """Cache of playlist_id -> (snapshot_id, sorted track numbers), optionally persisted to a CacheStore."""
+
+    def __init__(self, store=None, load=True):
+        self._store = store
+        self._interner = _Interner()
+        self._entries = {}
+        self._lock = threading.Lock()
+        if store and load:
+            self.load()
+
+    def load(self):
+        """Read the persisted index from the store (can be slow for big libraries; call off the UI thread)."""
+        loaded = self._store.load_membership()
+        with self._lock:
+            for playlist_id, (snapshot_id, track_ids) in loaded.items():
+                # Anything stored since we were created is newer than the disk copy
+                if playlist_id not in self._entries:
+                    self._entries[playlist_id] = (snapshot_id, self._pack(track_ids))
+
+    def _pack(self, track_ids):
+        """Intern track IDs into a sorted, de-duplicated array."""
+        return array('I', sorted({self._interner.intern(tid) for tid in track_ids if tid}))
+
+    def _unpack(self, numbers):
+        return [self._interner.string(n) for n in numbers]
+
+    def _persist(self, playlist_id):
+        """Write one entry through to the on-disk cache, if any."""
+        if not self._store:
+            return
+        entry = self._entries.get(playlist_id)
+        if entry:
+            self._store.save_membership(playlist_id, entry[0], self._unpack(entry[1]))
+        else:
+            self._store.delete_membership(playlist_id)
+
+    def __len__(self):
+        """Number of indexed playlists."""
+        with self._lock:
+            return len(self._entries)
+
+    def snapshot_id(self, playlist_id):
+        """Return the snapshot_id the cached membership was built from, or None."""
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+        return entry[0] if entry else None
+
+    def store(self, playlist_id, snapshot_id, track_ids):
+        """Replace the cached membership for a playlist."""
+        with self._lock:
+            self._entries[playlist_id] = (snapshot_id, self._pack(track_ids))
+            self._persist(playlist_id)
+
+    def add(self, playlist_id, track_ids, snapshot_id, base_snapshot_id):
+        """Record tracks added by us; see _apply_write for how the snapshot moves."""
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+            if entry:
+                numbers = set(entry[1])
+                numbers.update(self._interner.intern(tid) for tid in track_ids)
+                self._apply_write(playlist_id, entry, array('I', sorted(numbers)), snapshot_id, base_snapshot_id)
+
+    def remove(self, playlist_id, track_ids, snapshot_id, base_snapshot_id):
+        """Record tracks removed by us; see _apply_write for how the snapshot moves."""
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+            if entry:
+                removed = {self._interner.lookup(tid) for tid in track_ids}
+                numbers = array('I', (n for n in entry[1] if n not in removed))
+                self._apply_write(playlist_id, entry, numbers, snapshot_id, base_snapshot_id)
+
+    def _apply_write(self, playlist_id, entry, numbers, snapshot_id, base_snapshot_id):
+        """
+        Store the entry after our own write, which turned base_snapshot_id into snapshot_id.
+        The entry only moves to snapshot_id if it was built from base_snapshot_id. Otherwise
+        someone else changed the playlist too: our change is kept, but so is the old
+        snapshot, so the next snapshot-checked lookup rescans. Call with the lock held.
+        """
+        if entry[0] == base_snapshot_id:
+            entry = (snapshot_id, numbers)
+        else:
+            entry = (entry[0], numbers)
+        self._entries[playlist_id] = entry
+        self._persist(playlist_id)
+
+    def invalidate(self, playlist_id):
+        """Drop the cached membership for a playlist."""
+        with self._lock:
+            self._entries.pop(playlist_id, None)
+            self._persist(playlist_id)
+
+    def has(self, playlist_id, track_id, snapshot_id=None):
+        """
+        Look up membership locally. Returns None if the playlist isn't indexed
+        (or, when snapshot_id is given, if the index is from another snapshot).
+        """
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+            if not entry or (snapshot_id is not None and entry[0] != snapshot_id):
+                return None
+            number = self._interner.lookup(track_id)
+            return number is not None and _contains(entry[1], number)
+
+    def playlists_containing(self, track_id):
+        """Return the IDs of every indexed playlist that contains track_id."""
+        with self._lock:
+            number = self._interner.lookup(track_id)
+            if number is None:
+                return []
+            return [pid for pid, (_, numbers) in self._entries.items() if _contains(numbers, number)]
+
+    def contains(self, sp, playlist_id, track_id):
+        """
+        Check whether track_id is in the playlist.
+        Costs one snapshot_id request, plus a full scan only when the snapshot changed.
+        """
+        snapshot_id = sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+        found = self.has(playlist_id, track_id, snapshot_id)
+        if found is None:
+            track_ids = fetch_playlist_track_ids(sp, playlist_id)
+            self.store(playlist_id, snapshot_id, track_ids)
+            found = track_id in track_ids
+        return found
+
+    def track_ids(self, sp, playlist_id):
+        """
+        Return the set of track IDs currently in the playlist.
+        Costs one snapshot_id request, plus one paginated pass only when the snapshot changed.
+        """
+        snapshot_id = sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+        with self._lock:
+            entry = self._entries.get(playlist_id)
+            if entry and entry[0] == snapshot_id:
+                return set(self._unpack(entry[1]))
+        track_ids = fetch_playlist_track_ids(sp, playlist_id)
+        self.store(playlist_id, snapshot_id, track_ids)
+        return track_ids
+
+    def sync(self, sp, playlists, should_stop=None):
+        """
+        Bring the index up to date with a catalog listing of (playlist_id, snapshot_id) pairs.
+        Only playlists whose snapshot changed are rescanned; playlists no longer listed are dropped.
+        Returns the IDs of playlists that were rescanned or dropped.
+        """
+        listed = dict(playlists)
+        changed = []
+        with self._lock:
+            stale = [pid for pid in self._entries if pid not in listed]
+        for playlist_id in stale:
+            self.invalidate(playlist_id)
+            changed.append(playlist_id)
+
+        def rescan(item):
+            playlist_id, snapshot_id = item
+            if should_stop and should_stop():
+                return None
+            try:
+                track_ids = fetch_playlist_track_ids(sp, playlist_id,
+                                                     max_workers=SYNC_PLAYLISTS_AT_ONCE)
+            except Exception as e:
+                status = getattr(e, 'http_status', None)
+                if status is None or status == 429 or status >= 500:
+                    raise
+                # e.g. a playlist we can no longer read; skip it
+                print(f"Error indexing playlist {playlist_id}: {e}")
+                return None
+            self.store(playlist_id, snapshot_id, track_ids)
+            return playlist_id
+
+        outdated = [(pid, snap) for pid, snap in playlists if self.snapshot_id(pid) != snap]
+        with ThreadPoolExecutor(max_workers=SYNC_PLAYLISTS_AT_ONCE) as pool:
+            changed.extend(pid for pid in pool.map(rescan, outdated) if pid)
+        return changed
+
+    def stats(self):
+        """Return entry counts and the size of the array storage in bytes."""
+        with self._lock:
+            entries = sum(len(numbers) for _, numbers in self._entries.values())
+            return {
+                'playlists': len(self._entries),
+                'entries': entries,
+                'unique_tracks': len(self._interner),
+                'array_bytes': entries * array('I').itemsize,
+            }
+
+
+def fetch_playlist_track_ids(sp, playlist_id, max_workers=MAX_WORKERS):
+    """Fetch every page of a playlist in parallel and return the set of its track IDs."""
+    items = fetch_all_pages(
+        lambda offset: sp.playlist_items(playlist_id, fields='items.track.id,total',
+                                         limit=100, offset=offset),
+        page_size=100,
+        max_workers=max_workers
+    )
+    return {item['track']['id'] for item in items if item['track'] and item['track']['id']}
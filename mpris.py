@@ -0,0 +1,169 @@
+"""
+Playback events from the local Spotify desktop client over MPRIS (Linux, D-Bus).
+The client publishes track changes and play/pause as PropertiesChanged signals,
+so following them costs no Web API requests and no polling delay. Playback
+commands go back to the client over the same connection.
+
+Needs the optional jeepney package and a D-Bus session bus; without them, or
+while the desktop client isn't running, the engine polls the Web API instead.
+"""
+import queue
+import threading
+
+BUS_NAME = 'org.mpris.MediaPlayer2.spotify'
+OBJECT_PATH = '/org/mpris/MediaPlayer2'
+PLAYER_INTERFACE = 'org.mpris.MediaPlayer2.Player'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+COMMANDS = {'play': 'Play', 'pause': 'Pause', 'next': 'Next', 'previous': 'Previous'}
+CALL_TIMEOUT = 2.0
+
+
+def available():
+    """Return True if jeepney (the D-Bus client library) is installed."""
+    try:
+        import jeepney  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def track_from_metadata(metadata):
+    """Return (track_id, label) from an MPRIS Metadata dict, or (None, None) for ads and empty players."""
+    def value(key):
+        entry = metadata.get(key)
+        return entry[1] if isinstance(entry, tuple) else entry
+
+    # '/com/spotify/track/<id>' on current clients, 'spotify:track:<id>' on older ones
+    trackid = value('mpris:trackid') or ''
+    parts = trackid.replace(':', '/').strip('/').split('/')
+    if len(parts) < 2 or parts[-2] != 'track':
+        return None, None
+    artists = ', '.join(value('xesam:artist') or [])
+    title = value('xesam:title') or ''
+    return parts[-1], f"{title} - {artists}"
+
+
+class MprisSource:
+    """
+    Follows one MPRIS player on a background thread.
+    on_track_changed(track_id, label) and on_play_state(is_playing) fire as the
+    player reports changes; on_active(active) fires when the player appears or quits.
+    """
+
+    def __init__(self, on_track_changed=None, on_play_state=None, on_active=None,
+                 bus='SESSION', bus_name=BUS_NAME):
+        self.on_track_changed = on_track_changed
+        self.on_play_state = on_play_state
+        self.on_active = on_active
+        self.bus = bus
+        self.bus_name = bus_name
+
+        self.active = False
+        self.events = 0
+        self._connection = None
+        self._router = None
+        self._messages = queue.Queue(maxsize=256)
+        self._filters = []
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Connect to the bus and start following the player.
+        Raises ImportError without jeepney, or OSError/KeyError when there is no session bus.
+        """
+        from jeepney import DBusAddress, MatchRule, message_bus
+        from jeepney.io.threading import DBusRouter, Proxy, open_dbus_connection
+
+        self._connection = open_dbus_connection(self.bus)
+        self._router = DBusRouter(self._connection)
+        self._bus = Proxy(message_bus, self._router, timeout=CALL_TIMEOUT)
+        self._player = DBusAddress(OBJECT_PATH, bus_name=self.bus_name, interface=PLAYER_INTERFACE)
+
+        owner_changed = MatchRule(type='signal', interface='org.freedesktop.DBus', member='NameOwnerChanged')
+        owner_changed.add_arg_condition(0, self.bus_name)
+        properties_changed = MatchRule(type='signal', interface=PROPERTIES_INTERFACE,
+                                       member='PropertiesChanged', path=OBJECT_PATH)
+        properties_changed.add_arg_condition(0, PLAYER_INTERFACE)
+        # Signals carry the player's unique name, so the bus filters by sender and we don't
+        self._filters = [self._router.filter(rule, queue=self._messages)
+                         for rule in (owner_changed, properties_changed)]
+        self._bus.AddMatch(owner_changed)
+        self._bus.AddMatch(MatchRule(type='signal', sender=self.bus_name, interface=PROPERTIES_INTERFACE,
+                                     member='PropertiesChanged', path=OBJECT_PATH))
+
+        # Pick up a running player before returning, so the caller knows whether to poll
+        try:
+            if self._bus.NameHasOwner(self.bus_name)[0]:
+                self._activate()
+        except Exception as e:
+            print(f"Error reading MPRIS player state: {e}")
+
+        self._thread = threading.Thread(target=self._run, name="mpris-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        for handle in self._filters:
+            handle.close()
+        if self._router:
+            self._router.close()
+            self._connection.close()
+
+    def command(self, name):
+        """Send 'play', 'pause', 'next' or 'previous' to the player."""
+        from jeepney import new_method_call
+        self._call(new_method_call(self._player, COMMANDS[name]))
+
+    def _call(self, message):
+        """Send a method call and return the reply body; raises DBusErrorResponse on errors."""
+        from jeepney.wrappers import unwrap_msg
+        return unwrap_msg(self._router.send_and_get_reply(message, timeout=CALL_TIMEOUT))
+
+    def _player_properties(self):
+        from jeepney import Properties
+        return self._call(Properties(self._player).get_all())[0]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                message = self._messages.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._handle(message)
+            except Exception as e:
+                print(f"Error handling MPRIS event: {e}")
+
+    def _handle(self, message):
+        from jeepney import HeaderFields
+
+        if message.header.fields.get(HeaderFields.member) == 'NameOwnerChanged':
+            _, old_owner, new_owner = message.body
+            if new_owner:
+                self._activate()
+            elif self.active:
+                self.active = False
+                if self.on_active:
+                    self.on_active(False)
+            return
+
+        if not self.active:
+            return
+        _, changed, _ = message.body
+        self.events += 1
+        self._apply(changed)
+
+    def _activate(self):
+        """The player appeared: report its current state, then that events are flowing."""
+        self._apply(self._player_properties())
+        self.active = True
+        if self.on_active:
+            self.on_active(True)
+
+    def _apply(self, properties):
+        if 'Metadata' in properties and self.on_track_changed:
+            track_id, label = track_from_metadata(properties['Metadata'][1])
+            self.on_track_changed(track_id, label)
+        if 'PlaybackStatus' in properties and self.on_play_state:
+            self.on_play_state(properties['PlaybackStatus'][1] == 'Playing')
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Polls several Spotify accounts from one process on a single asyncio loop.
+Each account has its own client and TokenManager (see spotify_auth) and its own
+PollScheduler; all of them draw from one RateBudget, which hands out requests
+round-robin so every account gets a fair share, halves the rate and pauses
+everyone on a 429, and sheds polls rather than queueing them while throttled.
+spotipy calls run on a small shared thread pool and share one HTTP session,
+so an extra account costs a few objects rather than a process and a Tk root.
+
+Accounts are listed in config.json:
+  "accounts": [{"name": "shop-1", "token_cache": ".spotify_cache-shop-1"}, ...]
+(client_id/client_secret may be set per account; otherwise the app's are used).
+
+  python multi_account.py --authorize shop-2   # sign in one more account
+  python multi_account.py                      # poll every account
+"""
+import argparse
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config_store import load_config, save_config
+from engine import track_label
+from scheduler import PollScheduler, retry_after
+
+BUDGET_DEFAULTS = {
+    'rate': 10.0,            # Requests per second across all accounts
+    'min_rate': 0.5,
+    'recovery': 0.05,        # Added back to the rate after each successful request
+    'burst': 5,
+    'max_queue_delay': 5.0,  # Shed polls when the backlog would take longer than this
+    'workers': 8,            # Threads running spotipy calls
+}
+
+SHED = object()  # Returned by MultiAccountEngine.call() when a sheddable request was dropped
+
+
+class RateBudget:
+    """
+    Request budget shared by every account (Spotify rate-limits per app, not per user).
+    Waiting requests are granted round-robin across accounts, so a busy account
+    can't starve a quiet one. The rate adapts AIMD-style: halved on each 429,
+    with a pause for Retry-After, then raised a little after every success.
+    """
+
+    def __init__(self, rate=10.0, min_rate=0.5, recovery=0.05, burst=5, max_queue_delay=5.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.burst = burst
+        self.max_queue_delay = max_queue_delay
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = OrderedDict()  # account -> deque of futures, in round-robin order
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+
+        self.granted = {}
+        self.shed = {}
+        self.rate_limited = 0
+
+    def pause_remaining(self):
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+    def backlog(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, account, shed=False):
+        """
+        Wait for a request slot for account.
+        With shed=True (routine polls), returns False instead of queueing while the
+        budget is paused after a 429 or the backlog is already too long.
+        """
+        if shed and (self.pause_remaining() or self.backlog() > self.rate * self.max_queue_delay):
+            self.shed[account] = self.shed.get(account, 0) + 1
+            return False
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(account, deque()).append(future)
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            waiters = self._waiters.get(account)
+            if waiters and future in waiters:
+                waiters.remove(future)
+            raise
+        self.granted[account] = self.granted.get(account, 0) + 1
+        return True
+
+    def on_success(self):
+        self.rate = min(self.rate + self.recovery, self.max_rate)
+
+    def on_rate_limited(self, delay):
+        """A 429 came back: back off for everyone."""
+        self.rate_limited += 1
+        self.rate = max(self.rate / 2, self.min_rate)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._tokens = 0.0
+
+    def _next_waiter(self):
+        """Pop the next pending future, rotating through accounts."""
+        while self._waiters:
+            account, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(account)
+            else:
+                del self._waiters[account]
+            if not future.done():
+                return future
+        return None
+
+    async def _dispatch(self):
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            pause = self.pause_remaining()
+            if pause:
+                await asyncio.sleep(pause)
+                self._updated = time.monotonic()
+                continue
+
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+
+            future = self._next_waiter()
+            if future:
+                self._tokens -= 1
+                future.set_result(None)
+
+    def close(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'rate_limited': self.rate_limited,
+            'granted': dict(self.granted),
+            'shed': dict(self.shed),
+        }
+
+
+class Account:
+    """One Spotify account's client, poll schedule and last known playback state."""
+
+    def __init__(self, name, sp, scheduler=None):
+        self.name = name
+        self.sp = sp
+        self.scheduler = scheduler or PollScheduler()
+        self.current_track_id = None
+        self.current_track = None
+        self.is_playing = None
+        self.errors = 0
+        self._wake = None
+        self._task = None
+
+    def wake(self):
+        """Poll this account right away, e.g. after a playback command."""
+        self.scheduler.wake()
+        if self._wake:
+            self._wake.set()
+
+
+class MultiAccountEngine:
+    """Runs every account's monitor as a task on one event loop, sharing a RateBudget."""
+
+    def __init__(self, budget_options=None, on_track_changed=None, on_play_state=None):
+        options = dict(BUDGET_DEFAULTS)
+        options.update(budget_options or {})
+        self.budget_options = options
+        self.budget = None  # Created on the loop in run()
+        self.accounts = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix="spotify-accounts")
+        self.running = False
+
+        self.on_track_changed = on_track_changed  # (account_name, track_id, label)
+        self.on_play_state = on_play_state  # (account_name, is_playing)
+
+    def add_account(self, name, sp, scheduler=None):
+        """Add an account; if the engine is already running, it starts polling right away."""
+        account = Account(name, sp, scheduler)
+        self.accounts[name] = account
+        if self.running:
+            account._task = asyncio.get_running_loop().create_task(self._monitor(account))
+        return account
+
+    async def call(self, account, fn, *args, shed=False):
+        """
+        Run a spotipy call for account within the shared budget.
+        Returns SHED without calling fn when shed=True and the budget is shedding load.
+        """
+        if not await self.budget.acquire(account.name, shed=shed):
+            return SHED
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, fn, *args)
+        except Exception as e:
+            delay = retry_after(e)
+            if delay is not None:
+                self.budget.on_rate_limited(delay)
+            raise
+        self.budget.on_success()
+        return result
+
+    async def playback(self, name, command):
+        """Run 'play', 'pause', 'next' or 'previous' for one account (never shed)."""
+        account = self.accounts[name]
+        fn = {
+            'play': account.sp.start_playback,
+            'pause': account.sp.pause_playback,
+            'next': account.sp.next_track,
+            'previous': account.sp.previous_track,
+        }[command]
+        await self.call(account, fn)
+        account.wake()
+
+    async def _monitor(self, account):
+        account._wake = asyncio.Event()
+        while self.running:
+            try:
+                current = await self.call(account, account.sp.current_playback, shed=True)
+                if current is SHED:
+                    # Dropped while throttled: try again once the pause or backlog has cleared
+                    delay = max(self.budget.pause_remaining() + account.scheduler.settle,
+                                account.scheduler.idle_interval)
+                else:
+                    delay = account.scheduler.next_delay(current)
+                    self._apply(account, current)
+            except Exception as e:
+                account.errors += 1
+                print(f"Error monitoring {account.name}: {e}")
+                delay = account.scheduler.on_error(e)
+
+            try:
+                await asyncio.wait_for(account._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            account._wake.clear()
+
+    def _apply(self, account, current):
+        if current and current['item']:
+            track = current['item']
+            if track['id'] != account.current_track_id:
+                account.current_track_id = track['id']
+                account.current_track = track_label(track)
+                if self.on_track_changed:
+                    self.on_track_changed(account.name, account.current_track_id, account.current_track)
+            if current['is_playing'] != account.is_playing:
+                account.is_playing = current['is_playing']
+                if self.on_play_state:
+                    self.on_play_state(account.name, account.is_playing)
+        elif account.current_track_id is not None:
+            account.current_track_id = None
+            account.current_track = None
+            if self.on_track_changed:
+                self.on_track_changed(account.name, None, None)
+
+    async def run(self):
+        """Poll every account until stop() is called."""
+        options = self.budget_options
+        self.budget = RateBudget(options['rate'], options['min_rate'], options['recovery'],
+                                 options['burst'], options['max_queue_delay'])
+        self._stopped = asyncio.Event()
+        self.running = True
+        loop = asyncio.get_running_loop()
+        for account in self.accounts.values():
+            account._task = loop.create_task(self._monitor(account))
+        await self._stopped.wait()
+        for account in self.accounts.values():
+            if account._task:
+                account._task.cancel()
+        await asyncio.gather(*(a._task for a in self.accounts.values() if a._task), return_exceptions=True)
+        self.budget.close()
+
+    def stop(self):
+        """Stop polling (call on the engine's loop)."""
+        self.running = False
+        self._stopped.set()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        """Budget counters plus per-account polls and errors."""
+        stats = self.budget.stats() if self.budget else {}
+        stats['accounts'] = {
+            name: {'polls': account.scheduler.polls, 'errors': account.errors,
+                   'track': account.current_track, 'is_playing': account.is_playing}
+            for name, account in self.accounts.items()
+        }
+        return stats
+
+
+def load_accounts(config=None):
+    """Return the "accounts" list from config.json."""
+    config = config if config is not None else load_config()
+    return config.get('accounts', [])
+
+
+def build_engine(config=None, **callbacks):
+    """Create a MultiAccountEngine with a client per configured account, sharing one HTTP session."""
+    from spotify_auth import build_session, get_spotify_client
+
+    config = config if config is not None else load_config()
+    http = dict(config.get('http', {}))
+    http['retry_rate_limited'] = False  # The shared budget handles 429s for everyone
+    session = build_session(http)
+
+    engine = MultiAccountEngine(config.get('rate_budget'), **callbacks)
+    for entry in load_accounts(config):
+        sp = get_spotify_client(token_cache=entry.get('token_cache', f".spotify_cache-{entry['name']}"),
+                                session=session,
+                                client_id=entry.get('client_id'),
+                                client_secret=entry.get('client_secret'))
+        engine.add_account(entry['name'], sp)
+    return engine
+
+
+def authorize(name):
+    """Sign in one more account (opens a browser) and add it to config.json."""
+    from spotify_auth import get_spotify_client
+
+    token_cache = f".spotify_cache-{name}"
+    user = get_spotify_client(token_cache=token_cache).current_user()
+    config = load_config()
+    accounts = [a for a in config.get('accounts', []) if a['name'] != name]
+    accounts.append({'name': name, 'token_cache': token_cache})
+    config['accounts'] = accounts
+    save_config(config)
+    print(f"✓ Added account {name} ({user.get('display_name') or user['id']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll several Spotify accounts from one process.")
+    parser.add_argument('--authorize', metavar='NAME', help="sign in an account and add it to config.json")
+    args = parser.parse_args()
+
+    if args.authorize:
+        authorize(args.authorize)
+        return
+
+    engine = build_engine(
+        on_track_changed=lambda name, track_id, label: print(f"[{name}] {label or 'No track playing'}"),
+        on_play_state=lambda name, is_playing: print(f"[{name}] {'playing' if is_playing else 'paused'}"),
+    )
+    if not engine.accounts:
+        print("No accounts configured. Add one with: python multi_account.py --authorize NAME")
+        return
+
+    print(f"Polling {len(engine.accounts)} accounts")
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        if engine.budget:
+            print(f"Stats: {engine.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Durable write-ahead queue of playlist mutations.
+Every add/remove click is written to the local cache first, then flushed to
+Spotify in batches of up to 100 tracks per playlist. Pending mutations survive
+restarts and network loss, and an add/remove pair for the same track cancels out.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from scheduler import retry_after
+
+BATCH_SIZE = 100  # Max items per playlist_add_items / remove call
+MAX_REJECTED = 1000  # Recently rejected tracks remembered for wait()
+
+
+def plan_batches(rows):
+    """
+    Group pending (id, playlist_id, track_id, action) rows into batches.
+    Returns a list of (playlist_id, action, [(id, track_id), ...]) in an order that
+    preserves the relative order of mutations touching the same track.
+    """
+    batches = []
+    current = OrderedDict()
+    seen = set()
+    for mutation_id, playlist_id, track_id, action in rows:
+        if (playlist_id, track_id) in seen:
+            # Same track queued twice (e.g. a retry left both an add and a remove): start a new round
+            batches.extend((pid, act, items) for (pid, act), items in current.items())
+            current = OrderedDict()
+            seen = set()
+        seen.add((playlist_id, track_id))
+        current.setdefault((playlist_id, action), []).append((mutation_id, track_id))
+    batches.extend((pid, act, items) for (pid, act), items in current.items())
+
+    chunked = []
+    for playlist_id, action, items in batches:
+        for start in range(0, len(items), BATCH_SIZE):
+            chunked.append((playlist_id, action, items[start:start + BATCH_SIZE]))
+    return chunked
+
+
+class MutationQueue:
+    """Flushes queued playlist mutations to Spotify on a background thread."""
+
+    def __init__(self, store, sp, membership, on_failed=None,
+                 batch_delay=1.0, retry_delay=2.0, max_retry_delay=300.0):
+        self.store = store
+        self.sp = sp
+        self.membership = membership
+        self.on_failed = on_failed  # Called as on_failed(playlist_id, track_ids, action, error)
+        self.batch_delay = batch_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()  # Only stop() cuts a retry backoff short
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # Notified as pending rows are sent or cancelled
+        self._in_flight = set()
+        self._rejected = OrderedDict()  # (playlist_id, track_id) -> None for recently rejected mutations
+        # (playlist_id, track_id) -> (mutation_id, action) of the latest pending row
+        self._pending = {(pid, tid): (mid, action) for mid, pid, tid, action in store.load_mutations()}
+
+        self.requests = 0
+        self.flushed = 0
+
+        self._thread = threading.Thread(target=self._run, name="mutation-flush", daemon=True)
+        self._thread.start()
+        if self._pending:
+            self._wake.set()  # Replay what was left over from the last session
+
+    def enqueue(self, playlist_id, track_id, action):
+        """Durably queue an 'add' or 'remove' of track_id."""
+        self.enqueue_many(playlist_id, [track_id], action)
+
+    def enqueue_many(self, playlist_id, track_ids, action):
+        """Durably queue the same 'add' or 'remove' for several tracks (e.g. a bulk add)."""
+        with self._lock:
+            for track_id in track_ids:
+                self._rejected.pop((playlist_id, track_id), None)
+                latest = self.store.add_mutation(playlist_id, track_id, action, self._in_flight)
+                if latest:
+                    self._pending[(playlist_id, track_id)] = latest
+                else:
+                    self._pending.pop((playlist_id, track_id), None)
+            self._changed.notify_all()
+        self._wake.set()
+
+    def wait(self, playlist_id, track_ids, progress=None, timeout=None):
+        """
+        Block until no mutation of track_ids in the playlist is pending (sent, rejected
+        or cancelled), the queue is stopped, or timeout seconds have passed.
+        progress(done, total) is called as batches land.
+        Returns (rejected, pending): the track IDs Spotify refused, and the ones still queued.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        keys = [(playlist_id, track_id) for track_id in track_ids]
+        reported = None
+        while True:
+            with self._changed:
+                left = sum(1 for key in keys if key in self._pending)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                waiting = left and not self._stopped and (remaining is None or remaining > 0)
+                if left == reported and waiting:
+                    self._changed.wait(remaining)
+                    continue
+                if not waiting:
+                    rejected = [tid for key, tid in zip(keys, track_ids) if key in self._rejected]
+                    pending = [tid for key, tid in zip(keys, track_ids) if key in self._pending]
+            if progress and left != reported:
+                progress(len(keys) - left, len(keys))
+            if not waiting:
+                return rejected, pending
+            reported = left
+
+    def pending_action(self, playlist_id, track_id):
+        """Return 'add' or 'remove' if a mutation for this track hasn't reached Spotify yet, else None."""
+        with self._lock:
+            latest = self._pending.get((playlist_id, track_id))
+        return latest[1] if latest else None
+
+    def pending_for_track(self, track_id):
+        """Return {playlist_id: 'add' or 'remove'} for every unsent mutation of track_id."""
+        with self._lock:
+            return {pid: action for (pid, tid), (_, action) in self._pending.items() if tid == track_id}
+
+    def stop(self):
+        """Stop flushing; anything still queued is sent on the next start."""
+        self._stopped = True
+        self._stop_event.set()
+        self._wake.set()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stopped:
+            self._wake.wait()
+            if self._stopped:
+                return
+            # Give rapid clicks a moment to collapse into one batch
+            time.sleep(self.batch_delay)
+            self._wake.clear()
+
+            try:
+                self._flush()
+                delay = self.retry_delay
+            except Exception as e:
+                wait = retry_after(e)
+                if wait is None:
+                    print(f"Error flushing playlist changes (will retry in {delay:.0f}s): {e}")
+                    wait = delay
+                    delay = min(delay * 2, self.max_retry_delay)
+                # Keep what's queued and try again afterwards; new enqueues don't cut the backoff short
+                self._stop_event.wait(wait)
+                self._wake.set()
+
+    def _flush(self):
+        """Send every queued mutation, grouped per playlist and action, in batches."""
+        with self._lock:
+            rows = self.store.load_mutations()
+            self._in_flight = {row[0] for row in rows}
+        try:
+            snapshots = {}  # playlist_id -> snapshot our next write applies to
+            for playlist_id, action, items in plan_batches(rows):
+                self._send(playlist_id, action, items, snapshots)
+        finally:
+            with self._lock:
+                self._in_flight = set()
+
+    def _send(self, playlist_id, action, items, snapshots):
+        """Apply one batch; transient errors propagate so the whole flush is retried."""
+        track_ids = [track_id for _, track_id in items]
+        try:
+            # The index only moves to our new snapshot if it was current before the write
+            base = snapshots.get(playlist_id)
+            if base is None:
+                base = self.sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+            self.requests += 1
+            if action == 'add':
+                result = self.sp.playlist_add_items(playlist_id, track_ids)
+                self.membership.add(playlist_id, track_ids, result['snapshot_id'], base)
+            else:
+                result = self.sp.playlist_remove_all_occurrences_of_items(playlist_id, track_ids)
+                self.membership.remove(playlist_id, track_ids, result['snapshot_id'], base)
+            snapshots[playlist_id] = result['snapshot_id']
+        except Exception as e:
+            status = getattr(e, 'http_status', None)
+            if status is None or status == 429 or status >= 500:
+                raise
+            # Rejected outright (e.g. not the playlist owner): retrying won't help
+            print(f"Error modifying playlist: {e}")
+            with self._lock:
+                for _, track_id in items:
+                    self._rejected[(playlist_id, track_id)] = None
+                while len(self._rejected) > MAX_REJECTED:
+                    self._rejected.popitem(last=False)
+            self._forget(playlist_id, items)
+            if self.on_failed:
+                self.on_failed(playlist_id, track_ids, action, e)
+            return
+
+        self.flushed += len(track_ids)
+        self._forget(playlist_id, items)
+
+    def _forget(self, playlist_id, items):
+        """Drop rows that are done with, keeping any newer mutation of the same track."""
+        with self._lock:
+            self.store.delete_mutations([mutation_id for mutation_id, _ in items])
+            for mutation_id, track_id in items:
+                latest = self._pending.get((playlist_id, track_id))
+                if latest and latest[0] == mutation_id:
+                    del self._pending[(playlist_id, track_id)]
+                self._in_flight.discard(mutation_id)
+            self._changed.notify_all()
@@ -0,0 +1,63 @@
+"""
+Parallel offset-based pagination.
+The first page of a Spotify paging object carries 'total', so every remaining
+offset is known up front and can be fetched concurrently.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import retry_after
+
+MAX_WORKERS = 8
+
+
+class _RateLimitGate:
+    """Shared pause so that a 429 on one worker holds back all of them."""
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def fetch_all_pages(fetch_page, page_size, max_workers=MAX_WORKERS, max_attempts=5):
+    """
+    Fetch every item of a paged endpoint.
+    fetch_page(offset) must return a paging object with 'items' and 'total'.
+    Pages after the first are fetched through a bounded thread pool and
+    reassembled in order; 429s back off for Retry-After and are retried.
+    """
+    gate = _RateLimitGate()
+
+    def fetch(offset):
+        for attempt in range(max_attempts):
+            gate.wait()
+            try:
+                return fetch_page(offset)
+            except Exception as e:
+                delay = retry_after(e)
+                if delay is None or attempt == max_attempts - 1:
+                    raise
+                gate.pause(delay)
+
+    first = fetch(0)
+    items = list(first['items'])
+    offsets = range(page_size, first.get('total') or 0, page_size)
+
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as pool:
+            # map() yields results in offset order regardless of completion order
+            for page in pool.map(fetch, offsets):
+                items.extend(page['items'])
+
+    return items
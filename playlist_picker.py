@@ -0,0 +1,174 @@
+"""
+Searchable popup for choosing a playlist.
+Type to filter the catalog; only the rows in view exist as widgets, so opening
+and filtering stay instant no matter how many playlists there are.
+"""
+import tkinter as tk
+
+VISIBLE_ROWS = 10
+ROW_HEIGHT = 22
+
+
+class PlaylistPicker:
+    """Popup with a search box and a virtualized result list over a PlaylistCatalog."""
+
+    def __init__(self, root, catalog, on_select, bg, fg, accent, secondary_fg,
+                 font=('SF Pro Display', 10)):
+        self.root = root
+        self.catalog = catalog
+        self.on_select = on_select  # Called with the chosen playlist ID
+        self.bg = bg
+        self.fg = fg
+        self.accent = accent
+        self.secondary_fg = secondary_fg
+        self.font = font
+
+        self.window = None
+        self.results = []  # Matching playlist IDs, best first
+        self.top = 0  # Index of the first visible result
+        self.active = 0  # Index of the highlighted result
+        self.selected_id = None
+
+    def is_open(self):
+        return self.window is not None
+
+    def open(self, x, y, width, selected_id=None):
+        """Show the picker at screen position (x, y), highlighting selected_id."""
+        if self.window:
+            self.close()
+            return
+        self.selected_id = selected_id
+
+        self.window = tk.Toplevel(self.root, bg=self.secondary_fg)
+        self.window.overrideredirect(True)
+        self.window.attributes('-topmost', True)
+        self.window.geometry(f"{width}x{VISIBLE_ROWS * ROW_HEIGHT + 36}+{x}+{y}")
+
+        inner = tk.Frame(self.window, bg=self.bg)
+        inner.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
+
+        self.query_var = tk.StringVar()
+        self.entry = tk.Entry(inner, textvariable=self.query_var, font=self.font,
+                              fg=self.fg, bg='#1a1a1a', insertbackground=self.fg,
+                              relief='flat', highlightthickness=0)
+        self.entry.pack(fill=tk.X, padx=6, pady=6, ipady=3)
+
+        body = tk.Frame(inner, bg=self.bg)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # A fixed pool of row labels; scrolling relabels them instead of creating widgets
+        self.rows = []
+        for i in range(VISIBLE_ROWS):
+            row = tk.Label(body, text="", font=self.font, fg=self.fg, bg=self.bg,
+                           anchor='w', padx=8, cursor='hand2')
+            row.place(x=0, y=i * ROW_HEIGHT, relwidth=1.0, width=-16, height=ROW_HEIGHT)
+            row.bind('<Button-1>', lambda e, i=i: self.choose(self.top + i))
+            row.bind('<Enter>', lambda e, i=i: self.highlight(self.top + i))
+            row.bind('<MouseWheel>', self.on_wheel)
+            row.bind('<Button-4>', lambda e: self.scroll(-1))
+            row.bind('<Button-5>', lambda e: self.scroll(1))
+            self.rows.append(row)
+
+        self.query_var.trace_add('write', lambda *args: self.search())
+        self.entry.bind('<Down>', lambda e: self.move(1))
+        self.entry.bind('<Up>', lambda e: self.move(-1))
+        self.entry.bind('<Next>', lambda e: self.move(VISIBLE_ROWS))
+        self.entry.bind('<Prior>', lambda e: self.move(-VISIBLE_ROWS))
+        self.entry.bind('<Return>', lambda e: self.choose(self.active))
+        self.entry.bind('<Escape>', lambda e: self.close())
+        self.window.bind('<FocusOut>', self.on_focus_out)
+
+        self.search()
+        self.entry.focus_force()
+
+    def close(self):
+        if self.window:
+            self.window.destroy()
+            self.window = None
+
+    def refresh(self):
+        """Re-run the current search after the catalog changed."""
+        if self.window:
+            self.search(keep_active=True)
+
+    def search(self, keep_active=False):
+        """Filter the catalog with the current query and redraw."""
+        active_id = self.results[self.active] if keep_active and self.results else None
+        self.results = self.catalog.search(self.query_var.get())
+
+        target = active_id if active_id in self.results else None
+        if target is None and not self.query_var.get() and self.selected_id in self.results:
+            target = self.selected_id
+        self.active = self.results.index(target) if target else 0
+        self.top = max(0, min(self.active - VISIBLE_ROWS // 2, len(self.results) - VISIBLE_ROWS))
+        self.render()
+
+    def render(self):
+        """Relabel the visible rows for the current scroll position."""
+        for i, row in enumerate(self.rows):
+            index = self.top + i
+            if index < len(self.results):
+                playlist_id = self.results[index]
+                active = index == self.active
+                row.config(text=self.catalog.label(playlist_id) or "",
+                           bg=self.accent if active else self.bg,
+                           fg=self.fg if active or playlist_id != self.selected_id else self.accent)
+            else:
+                row.config(text="No matches" if i == 0 and not self.results else "",
+                           bg=self.bg, fg=self.secondary_fg)
+
+        total = len(self.results)
+        if total > VISIBLE_ROWS:
+            self.scrollbar.set(self.top / total, (self.top + VISIBLE_ROWS) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        self.top = max(0, min(self.top + rows, len(self.results) - VISIBLE_ROWS))
+        self.render()
+
+    def yview(self, action, value, units=None):
+        """Scrollbar callback (the Tk yview protocol)."""
+        if action == 'moveto':
+            self.top = int(float(value) * len(self.results))
+            self.scroll(0)
+        elif action == 'scroll':
+            self.scroll(int(value) * (VISIBLE_ROWS if units == 'pages' else 1))
+
+    def on_wheel(self, event):
+        # macOS reports small deltas, Windows multiples of 120
+        step = event.delta if abs(event.delta) < 120 else event.delta // 120
+        self.scroll(-step)
+
+    def move(self, step):
+        """Move the highlight with the keyboard, scrolling it into view."""
+        if not self.results:
+            return
+        self.active = max(0, min(self.active + step, len(self.results) - 1))
+        if self.active < self.top:
+            self.top = self.active
+        elif self.active >= self.top + VISIBLE_ROWS:
+            self.top = self.active - VISIBLE_ROWS + 1
+        self.render()
+        return 'break'
+
+    def highlight(self, index):
+        if index < len(self.results) and index != self.active:
+            self.active = index
+            self.render()
+
+    def choose(self, index):
+        if index < len(self.results):
+            playlist_id = self.results[index]
+            self.close()
+            self.on_select(playlist_id)
+
+    def on_focus_out(self, event):
+        # Focus moving between our own widgets isn't a reason to close
+        self.root.after(50, self._close_if_unfocused)
+
+    def _close_if_unfocused(self):
+        if self.window and not str(self.root.focus_get() or '').startswith(str(self.window)):
+            self.close()
@@ -0,0 +1,55 @@
+"""
+Queue-aware prefetch for track changes.
+The player queue says which tracks play next, so their Liked Songs state and the
+selected playlist's index can be fetched while the current track plays. When one
+of them starts, the button and heart are answered locally, in the same callback
+as the new title, instead of after a round trip.
+
+The queue is re-read only when our copy of it runs low or the player left it
+(e.g. the user picked another song), so a prefetch usually costs no requests.
+"""
+REFILL_BELOW = 5  # Re-read the queue once fewer predicted tracks than this are left
+
+
+def playing_and_queued_ids(sp):
+    """Track IDs of what's playing now followed by the play queue (episodes are skipped)."""
+    queue = sp.queue() or {}
+    items = [queue.get('currently_playing')] + (queue.get('queue') or [])
+    return [item['id'] for item in items
+            if item and item.get('type', 'track') == 'track' and item.get('id')]
+
+
+class UpcomingTracks:
+    """Our copy of the player queue, advanced as tracks start. Used from one worker thread."""
+
+    def __init__(self, refill_below=REFILL_BELOW):
+        self.refill_below = refill_below
+        self._tracks = []
+
+        self.changes = 0
+        self.predicted = 0  # Changes to a track we had already seen in the queue
+        self.reads = 0  # Queue requests
+
+    def advance(self, sp, track_id):
+        """
+        Move past track_id and return the track IDs expected after it,
+        re-reading the queue (one request) only when needed.
+        """
+        self.changes += 1
+        if track_id in self._tracks:
+            self.predicted += 1
+            # Skips superseded by later ones are fine: everything up to track_id has played
+            self._tracks = self._tracks[self._tracks.index(track_id) + 1:]
+        else:
+            self._tracks = []
+        if len(self._tracks) < self.refill_below:
+            self.reads += 1
+            tracks = playing_and_queued_ids(sp)
+            # Usually track_id is what's playing; if the player already moved on, its track is upcoming too
+            if track_id in tracks:
+                tracks = tracks[tracks.index(track_id) + 1:]
+            self._tracks = tracks
+        return list(self._tracks)
+
+    def stats(self):
+        return {'changes': self.changes, 'predicted': self.predicted, 'queue_reads': self.reads}
@@ -0,0 +1,107 @@
+"""
+Conditional-request cache for GET responses.
+Stores each response's ETag and body per URL (and per access token, since several
+accounts can share one session) and revalidates with If-None-Match. A 304 Not
+Modified carries no body, so an unchanged playlist page costs a round trip but
+almost no bandwidth. Entries are evicted least-recently-used by count and size.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+MAX_BYTES = 16 * 1024 * 1024
+
+
+class ResponseCache:
+    """Thread-safe LRU of (etag, content_type, body) keyed by URL and token."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, exclude=()):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.exclude = tuple(exclude)  # URL path prefixes never worth caching (e.g. me/player)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0  # 304s answered from the cache
+        self.misses = 0  # Full responses (nothing cached, or the data changed)
+        self.evictions = 0
+        self.bytes_saved = 0
+
+    def key(self, method, url, params, headers):
+        """Return the cache key for a request, or None if it shouldn't use the cache."""
+        if method != 'GET' or url.split('/v1/', 1)[-1].startswith(self.exclude):
+            return None
+        query = tuple(sorted((k, str(v)) for k, v in (params or {}).items() if v is not None))
+        token = (headers or {}).get('Authorization') or ''
+        # Hashed so access tokens aren't kept around in memory longer than needed
+        return url, query, hashlib.sha1(token.encode()).hexdigest()
+
+    def etag(self, key):
+        """Return the stored ETag for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def serve(self, key, response):
+        """Turn a 304 response into the cached 200; returns False if the entry was evicted meanwhile."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += len(entry[2])
+        _, content_type, body = entry
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = body
+        response.headers['Content-Type'] = content_type
+        response.headers['Content-Length'] = str(len(body))
+        response.headers.pop('Content-Encoding', None)
+        response.from_cache = True
+        return True
+
+    def store(self, key, response):
+        """
+        Remember a 200 response that came with an ETag. Errors (429, 5xx, 404...)
+        leave any cached entry alone: they say nothing about whether it's still valid.
+        """
+        if response.status_code != 200:
+            return
+        etag = response.headers.get('ETag')
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= len(old[2])
+            if not etag:
+                return
+            body = response.content
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (etag, response.headers.get('Content-Type', 'application/json'), body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'bytes_saved': self.bytes_saved,
+            }
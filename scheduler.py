@@ -0,0 +1,107 @@
+"""
+Adaptive polling scheduler for the current-track monitor.
+Sleeps until the playing track is about to end, backs off while paused or idle,
+wakes immediately after our own playback commands and honors Retry-After on 429s.
+"""
+import threading
+import time
+
+FIXED_INTERVAL = 2.0  # The old fixed polling interval, kept for comparison in stats()
+
+
+def retry_after(error, default=5.0):
+    """Return the Retry-After delay in seconds if error is a 429, else None."""
+    if getattr(error, 'http_status', None) != 429:
+        return None
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        return max(float(headers.get('Retry-After', default)), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class PollScheduler:
+    """Decides how long the monitor thread should sleep between current_playback() calls."""
+
+    def __init__(self, max_playing_interval=5.0, lead=0.5, settle=0.3,
+                 idle_interval=2.0, max_idle_interval=60.0, burst_interval=0.5):
+        self.max_playing_interval = max_playing_interval
+        self.lead = lead
+        self.settle = settle
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+        self.burst_interval = burst_interval
+
+        self._idle_delay = idle_interval
+        self._burst = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+        self.started = time.monotonic()
+        self.polls = 0
+        self.wakeups = 0
+        self.rate_limited = 0
+
+    def next_delay(self, playback):
+        """Return the delay before the next poll, given the latest current_playback() result."""
+        with self._lock:
+            self.polls += 1
+
+            if self._burst:
+                # Right after one of our commands, poll quickly until the player catches up
+                self._burst -= 1
+                return self.burst_interval
+
+            if not playback or not playback.get('item') or not playback.get('is_playing'):
+                # Paused or nothing playing: exponential backoff
+                delay = self._idle_delay
+                self._idle_delay = min(self._idle_delay * 2, self.max_idle_interval)
+                return delay
+
+            self._idle_delay = self.idle_interval
+            duration = playback['item'].get('duration_ms') or 0
+            progress = playback.get('progress_ms') or 0
+            remaining = max(duration - progress, 0) / 1000.0
+
+            if remaining > self.lead:
+                # Wake just before the track ends (but still catch manual skips)
+                return min(remaining - self.lead, self.max_playing_interval)
+            # About to end: wake just after the next track should have started
+            return remaining + self.settle
+
+    def on_error(self, error):
+        """Return the delay after a failed poll, honoring Retry-After on 429s."""
+        delay = retry_after(error)
+        with self._lock:
+            self.polls += 1
+            if delay is not None:
+                self.rate_limited += 1
+                return delay
+            delay = self._idle_delay
+            self._idle_delay = min(self._idle_delay * 2, self.max_idle_interval)
+            return delay
+
+    def wake(self, burst=3):
+        """Poll immediately, e.g. after a next/previous/play command of our own."""
+        with self._lock:
+            self.wakeups += 1
+            self._burst = burst
+            self._idle_delay = self.idle_interval
+        self._wake.set()
+
+    def sleep(self, delay):
+        """Sleep for delay seconds, or until wake() is called."""
+        self._wake.wait(delay)
+        self._wake.clear()
+
+    def stats(self):
+        """Return poll counters and the request rate compared with fixed-interval polling."""
+        with self._lock:
+            hours = max(time.monotonic() - self.started, 1.0) / 3600.0
+            return {
+                'polls': self.polls,
+                'wakeups': self.wakeups,
+                'rate_limited': self.rate_limited,
+                'requests_per_hour': self.polls / hours,
+                'fixed_interval_requests_per_hour': 3600.0 / FIXED_INTERVAL,
+            }
@@ -1,62 +1,253 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
+from spotipy.cache_handler import CacheHandler
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from instrumentation import metrics
+from response_cache import ResponseCache
+from config_store import (CONFIG_FILE, load_config, save_config, load_credentials,
+                          save_credentials, write_json_atomic)
+import atexit
 import json
-import os
+import random
+import threading
+import time
 
-CONFIG_FILE = "config.json"
+TOKEN_CACHE_FILE = ".spotify_cache"
+SCOPE = "user-read-currently-playing user-read-playback-state user-modify-playback-state playlist-read-private playlist-read-collaborative playlist-modify-public playlist-modify-private user-library-read"
 
-def get_spotify_client():
+# Defaults for the shared HTTP session; override any of these under "http" in config.json
+HTTP_DEFAULTS = {
+    'pool_size': 16,        # Pagination workers + monitor + command/work queues
+    'retries': 2,
+    'backoff_factor': 0.3,
+    'backoff_jitter': 0.3,
+    'gzip': True,
+    # Let urllib3 sleep out 429s inside the request. Off: Retry-After can be minutes and would stall the
+    # calling thread; callers back off on SpotifyException 429s themselves (see scheduler.retry_after)
+    'retry_rate_limited': False,
+    'timeout': [3.05, 5],   # (connect, read) seconds
+    'timeouts': {           # Per-endpoint overrides, matched by URL path prefix
+        'me/player': [3.05, 3],
+        'playlists/': [3.05, 10],
+        'me/playlists': [3.05, 10],
+    },
+    'etag_cache_entries': 512,          # Responses kept for If-None-Match revalidation; 0 disables
+    'etag_cache_bytes': 16 * 1024 * 1024,
+    'etag_cache_exclude': ['me/player'],  # Changes on every poll, never worth revalidating
+}
+
+def get_spotify_client(token_cache=TOKEN_CACHE_FILE, session=None, client_id=None, client_secret=None):
     """
     Creates and returns an authenticated Spotify client.
     Handles OAuth flow and token management.
+    Each token_cache is a separate account; several clients may share one session.
     """
-    scope = "user-read-currently-playing user-read-playback-state user-modify-playback-state playlist-read-private playlist-read-collaborative playlist-modify-public playlist-modify-private user-library-read"
-
     # Load credentials from config
-    client_id, client_secret = load_credentials()
+    if not client_id or not client_secret:
+        client_id, client_secret = load_credentials()
 
     if not client_id or not client_secret:
         raise ValueError("Spotify credentials not configured. Please set them in config.json")
 
+    if session is None:
+        session = build_session(load_config().get('http', {}))
+    token_manager = TokenManager(token_cache)
+
     auth_manager = SpotifyOAuth(
         client_id=client_id,
         client_secret=client_secret,
         redirect_uri="http://127.0.0.1:8888/callback",
-        scope=scope,
-        cache_path=".spotify_cache"
+        scope=SCOPE,
+        cache_handler=token_manager,
+        requests_session=session
+    )
+    token_manager.start(auth_manager)
+
+    return spotipy.Spotify(auth_manager=auth_manager, requests_session=session)
+
+class _JitteredRetry(Retry):
+    """
+    Retry with jittered backoff.
+    Only 429s are retried for POST (the request was rejected, so it's safe);
+    other methods are also retried on 502/503/504.
+    """
+
+    def __init__(self, *args, backoff_jitter_seconds=0.0, **kwargs):
+        self.backoff_jitter_seconds = backoff_jitter_seconds
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        kwargs.setdefault('backoff_jitter_seconds', self.backoff_jitter_seconds)
+        return super().new(**kwargs)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.backoff_jitter_seconds)
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == 'POST':
+            return (status_code == 429 and 429 in self.status_forcelist
+                    and self.total is not None and self.total > 0)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class TunedSession(requests.Session):
+    """
+    Keep-alive session that picks the request timeout per endpoint, records request
+    metrics and, with a ResponseCache, revalidates GETs with If-None-Match.
+    """
+
+    def __init__(self, timeout, timeouts, cache=None):
+        super().__init__()
+        self.cache = cache
+        self.default_timeout = tuple(timeout)
+        # Longest prefix first so the most specific override wins
+        self.timeouts = sorted(((prefix, tuple(t)) for prefix, t in timeouts.items()),
+                               key=lambda item: len(item[0]), reverse=True)
+
+    def timeout_for(self, url):
+        """Return the (connect, read) timeout for a request URL."""
+        path = url.split('/v1/', 1)[-1]
+        for prefix, timeout in self.timeouts:
+            if path.startswith(prefix):
+                return timeout
+        return self.default_timeout
+
+    def request(self, method, url, **kwargs):
+        # spotipy always passes its single global timeout; replace it with ours
+        kwargs['timeout'] = self.timeout_for(url)
+        key = self.cache.key(method, url, kwargs.get('params'), kwargs.get('headers')) if self.cache else None
+        etag = self.cache.etag(key) if key else None
+        if etag:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{'If-None-Match': etag})
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except Exception:
+            metrics.record(method, url, time.perf_counter() - started)
+            raise
+        metrics.record_response(method, url, time.perf_counter() - started, response)
+
+        if key:
+            if response.status_code != 304:
+                self.cache.store(key, response)
+            elif not self.cache.serve(key, response):
+                # Evicted while the request was in flight: ask again unconditionally
+                del kwargs['headers']['If-None-Match']
+                return self.request(method, url, **kwargs)
+        return response
+
+
+def build_session(http_config=None):
+    """Build the shared HTTP session from HTTP_DEFAULTS overridden by config.json's "http" section."""
+    options = dict(HTTP_DEFAULTS)
+    options.update(http_config or {})
+
+    cache = None
+    if options['etag_cache_entries']:
+        cache = ResponseCache(options['etag_cache_entries'], options['etag_cache_bytes'],
+                              options['etag_cache_exclude'])
+    session = TunedSession(options['timeout'], options['timeouts'], cache)
+    retry = _JitteredRetry(
+        total=options['retries'],
+        connect=options['retries'],
+        read=False,
+        status=options['retries'],
+        allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+        status_forcelist=(429, 502, 503, 504) if options['retry_rate_limited'] else (502, 503, 504),
+        backoff_factor=options['backoff_factor'],
+        backoff_jitter_seconds=options['backoff_jitter'],
+        respect_retry_after_header=True,
     )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=options['pool_size'],
+                          max_retries=retry, pool_block=False)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    if not options['gzip']:
+        session.headers['Accept-Encoding'] = 'identity'
+
+    return session
+
+
+class TokenManager(CacheHandler):
+    """
+    Keeps the OAuth token in memory and refreshes it in the background before it expires.
+    The token file is read once; new tokens are written back to it on a background thread.
+    """
+
+    def __init__(self, cache_path=TOKEN_CACHE_FILE, refresh_margin=300, max_sleep=60):
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.max_sleep = max_sleep  # Re-check the clock regularly in case the machine slept
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # Held for a whole write, so flush() at exit waits for one in progress
+        self._token = None
+        self._unsaved = False
+        self._auth_manager = None
+        self._started = False
+        try:
+            with open(cache_path, 'r') as f:
+                self._token = json.load(f)
+        except (OSError, ValueError):
+            pass
+        atexit.register(self.flush)
+
+    def get_cached_token(self):
+        with self._cond:
+            return dict(self._token) if self._token else None
+
+    def save_token_to_cache(self, token_info):
+        with self._cond:
+            self._token = dict(token_info)
+            self._unsaved = True
+            self._cond.notify_all()
+        threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self):
+        """Write the current token to disk if it changed; waits for a write already in progress."""
+        with self._write_lock:
+            with self._cond:
+                if not self._unsaved:
+                    return
+                token = self._token
+                # A token saved during the write sets this again and is written next
+                self._unsaved = False
+            try:
+                write_json_atomic(self.cache_path, token)
+            except OSError as e:
+                print(f"Error saving token cache: {e}")
+                with self._cond:
+                    self._unsaved = True
+
+    def start(self, auth_manager):
+        """Start refreshing tokens for auth_manager in the background."""
+        with self._cond:
+            if self._started:
+                return
+            self._auth_manager = auth_manager
+            self._started = True
+        threading.Thread(target=self._refresh_loop, name="token-refresh", daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._cond:
+                token = self._token
+                if not token or 'refresh_token' not in token:
+                    # Not authorized yet (e.g. during setup_auth.py); wait for a token
+                    self._cond.wait(self.max_sleep)
+                    continue
+                delay = token.get('expires_at', 0) - time.time() - self.refresh_margin
+                if delay > 0:
+                    self._cond.wait(min(delay, self.max_sleep))
+                    continue
 
-    return spotipy.Spotify(auth_manager=auth_manager)
-
-def load_credentials():
-    """Load Spotify API credentials from config file."""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-            return config.get('client_id', ''), config.get('client_secret', '')
-    return '', ''
-
-def save_credentials(client_id, client_secret):
-    """Save Spotify API credentials to config file."""
-    config = {}
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-
-    config['client_id'] = client_id
-    config['client_secret'] = client_secret
-
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
-
-def load_config():
-    """Load full configuration."""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_config(config):
-    """Save full configuration."""
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+            try:
+                self._auth_manager.refresh_access_token(token['refresh_token'])
+            except Exception as e:
+                print(f"Error refreshing access token: {e}")
+                time.sleep(30)
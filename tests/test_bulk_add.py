@@ -0,0 +1,18 @@
+import unittest
+
+from bulk_add import new_tracks
+
+
+class NewTracksTest(unittest.TestCase):
+
+    def test_skips_existing_and_repeats_in_order(self):
+        self.assertEqual(new_tracks(['c', 'a', 'b', 'c', 'd'], {'a'}), ['c', 'b', 'd'])
+
+    def test_queued_changes_win_over_the_index(self):
+        pending = {'a': 'remove', 'b': 'add'}.get
+        # 'a' is in the playlist but about to be removed; 'b' isn't yet but is about to be added
+        self.assertEqual(new_tracks(['a', 'b', 'c'], {'a'}, pending), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
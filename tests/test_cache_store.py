@@ -0,0 +1,45 @@
+import unittest
+
+from cache_store import CacheStore
+
+
+class AddMutationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CacheStore(':memory:')
+
+    def actions(self):
+        return [(track_id, action) for _, _, track_id, action in self.store.load_mutations()]
+
+    def test_opposite_action_cancels_out(self):
+        self.store.add_mutation('p', 'a', 'add')
+        self.assertIsNone(self.store.add_mutation('p', 'a', 'remove'))
+        self.assertEqual(self.actions(), [])
+
+    def test_identical_action_is_kept_once(self):
+        first = self.store.add_mutation('p', 'a', 'add')
+        self.assertEqual(self.store.add_mutation('p', 'a', 'add'), first)
+        self.assertEqual(self.actions(), [('a', 'add')])
+
+    def test_in_flight_row_is_not_cancelled(self):
+        # The add is already being sent, so the remove has to follow it
+        mutation_id, _ = self.store.add_mutation('p', 'a', 'add')
+        _, action = self.store.add_mutation('p', 'a', 'remove', {mutation_id})
+        self.assertEqual(action, 'remove')
+        self.assertEqual(self.actions(), [('a', 'add'), ('a', 'remove')])
+
+    def test_cancelling_reveals_the_in_flight_row(self):
+        mutation_id, _ = self.store.add_mutation('p', 'a', 'add')
+        self.store.add_mutation('p', 'a', 'remove', {mutation_id})
+        self.assertEqual(self.store.add_mutation('p', 'a', 'add', {mutation_id}), (mutation_id, 'add'))
+        self.assertEqual(self.actions(), [('a', 'add')])
+
+    def test_tracks_and_playlists_are_independent(self):
+        self.store.add_mutation('p', 'a', 'add')
+        self.store.add_mutation('q', 'a', 'remove')
+        self.store.add_mutation('p', 'b', 'remove')
+        self.assertEqual(self.actions(), [('a', 'add'), ('a', 'remove'), ('b', 'remove')])
+
+
+if __name__ == '__main__':
+    unittest.main()
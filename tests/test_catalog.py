@@ -0,0 +1,69 @@
+import unittest
+
+from catalog import PlaylistCatalog
+
+PLAYLISTS = [('Road Trip', 'p1'), ('Trip Hop', 'p2'), ('Chill', 'p3'), ('Summer Road', 'p4'),
+             ('roadtrip', 'p5'), ('Rock and Dance', 'p6')]
+
+
+class SearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = PlaylistCatalog(PLAYLISTS)
+
+    def test_tiers_best_first(self):
+        # Prefix, prefix, word prefix, then fuzzy (r-o-a-d spread over "Rock and Dance")
+        self.assertEqual(self.catalog.search('road'), ['p5', 'p1', 'p4', 'p6'])
+        # Exact, then "Road Trip" fuzzily (only the space skipped)
+        self.assertEqual(self.catalog.search('roadtrip'), ['p5', 'p1'])
+
+    def test_narrowing_matches_a_fresh_search(self):
+        for query in ('r', 'ro', 'roa', 'road', 'road ', 'road t'):
+            with self.subTest(query=query):
+                self.assertEqual(self.catalog.search(query), PlaylistCatalog(PLAYLISTS).search(query))
+
+    def test_update_resets_narrowing(self):
+        self.catalog.search('chi')
+        self.catalog.update(PLAYLISTS + [('Chill Beats', 'p7')])
+        self.assertEqual(self.catalog.search('chil'), ['p3', 'p7'])
+
+    def test_empty_query_and_limit(self):
+        self.assertEqual(self.catalog.search('  '), [pid for _, pid in PLAYLISTS])
+        self.assertEqual(self.catalog.search('road', limit=2), ['p5', 'p1'])
+
+
+class UpdateTest(unittest.TestCase):
+
+    def test_diff(self):
+        catalog = PlaylistCatalog([('A', 'a'), ('B', 'b'), ('C', 'c')])
+        diff = catalog.update([('C', 'c'), ('B2', 'b'), ('D', 'd')])
+        self.assertEqual(diff, {'added': ['d'], 'removed': ['a'], 'renamed': ['b'], 'moved': True})
+        self.assertEqual(catalog.items(), [('C', 'c'), ('B2', 'b'), ('D', 'd')])
+        self.assertEqual(catalog.ids_named('B'), [])
+
+    def test_unchanged(self):
+        catalog = PlaylistCatalog([('A', 'a'), ('B', 'b')])
+        self.assertEqual(catalog.update([('A', 'a'), ('B', 'b')]),
+                         {'added': [], 'removed': [], 'renamed': [], 'moved': False})
+
+    def test_appending_is_not_a_move(self):
+        catalog = PlaylistCatalog([('A', 'a')])
+        self.assertFalse(catalog.update([('A', 'a'), ('B', 'b')])['moved'])
+
+
+class ResolveTest(unittest.TestCase):
+
+    def test_id_name_and_search(self):
+        catalog = PlaylistCatalog([('Mix', 'a'), ('Mix', 'b'), ('Chill', 'c')])
+        self.assertEqual(catalog.resolve('c'), 'c')
+        self.assertEqual(catalog.resolve('Chill'), 'c')
+        self.assertEqual(catalog.resolve('chi'), 'c')
+        self.assertEqual(catalog.label('b'), 'Mix (b)')
+        with self.assertRaises(ValueError):
+            catalog.resolve('Mix')
+        with self.assertRaises(ValueError):
+            catalog.resolve('zzz')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+import unittest
+
+from config_store import ConfigStore
+
+
+class ReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'config.json')
+
+    def write(self, text, mtime_ns):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_invalid_json_keeps_the_last_good_config(self):
+        self.write(json.dumps({'selected_playlist_id': 'p'}), 1_000_000_000)
+        store = ConfigStore(self.path, check_interval=0)
+        self.write('{"selected_playlist_id": ', 2_000_000_000)
+        self.assertEqual(store.load(), {'selected_playlist_id': 'p'})
+
+        # The same broken file is read again until it's fixed
+        self.write(json.dumps({'selected_playlist_id': 'q'}), 2_000_000_000)
+        self.assertEqual(store.load(), {'selected_playlist_id': 'q'})
+
+    def test_invalid_json_on_start(self):
+        self.write('not json', 1_000_000_000)
+        store = ConfigStore(self.path, check_interval=0)
+        self.assertEqual(store.load(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from daemon import PlaylistDaemon, _strip_current
+
+
+class FakeEngine:
+    """Playback that moves on to the next track every time it's refreshed."""
+
+    def __init__(self, tracks):
+        self.tracks = list(tracks)
+        self.track = None
+
+    def refresh_playback(self):
+        self.track = self.tracks.pop(0)
+
+    def current(self):
+        return self.track, self.track and self.track.upper()
+
+
+class StripCurrentTest(unittest.TestCase):
+
+    def test_phrases(self):
+        for args, expected in (
+            (['current', 'track', 'to', 'Road', 'Trip'], ['Road', 'Trip']),
+            (['Current', 'in', 'Chill'], ['Chill']),
+            (['current', 'track', 'from', 'Chill'], ['Chill']),
+            (['current'], []),
+        ):
+            with self.subTest(args=args):
+                self.assertEqual(_strip_current(args), expected)
+
+    def test_playlist_names_are_left_alone(self):
+        self.assertEqual(_strip_current(['Road', 'Trip']), ['Road', 'Trip'])
+        # Only a leading "current" is a phrase
+        self.assertEqual(_strip_current(['My', 'current', 'favourites']), ['My', 'current', 'favourites'])
+
+
+class CurrentTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'daemon.sock')
+
+    def make_daemon(self, engine):
+        daemon = PlaylistDaemon(engine, self.path)
+        self.addCleanup(daemon.server_close)
+        return daemon
+
+    def test_refreshes_before_every_answer(self):
+        daemon = self.make_daemon(FakeEngine(['a', 'b']))
+        self.assertEqual(daemon._current(), ('a', 'A'))
+        self.assertEqual(daemon._current(), ('b', 'B'))
+
+    def test_nothing_playing(self):
+        daemon = self.make_daemon(FakeEngine([None]))
+        with self.assertRaises(ValueError):
+            daemon._current()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import shlex
+import unittest
+
+import dedupe
+from dedupe import find_duplicates
+
+
+class FakeClient:
+    """playlist_items() over in-memory playlists of (track_id, isrc) pairs."""
+
+    def __init__(self, playlists):
+        self.playlists = playlists
+
+    def playlist(self, playlist_id, fields=None):
+        return {'snapshot_id': f'{playlist_id}-1'}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, additional_types=None):
+        tracks = self.playlists[playlist_id]
+        items = [{'track': {'id': tid, 'uri': f'spotify:track:{tid}', 'is_local': False,
+                            'external_ids': {'isrc': isrc} if isrc else {}}}
+                 for tid, isrc in tracks[offset:offset + limit]]
+        return {'total': len(tracks), 'items': items}
+
+
+class FindDuplicatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sp = FakeClient({
+            'p': [('a', 'X1'), ('b', 'X2'), ('a', 'X1'), ('c', 'X2'), ('d', None)],
+            'q': [('d', None), ('e', 'X3')],
+        })
+
+    def duplicates(self, playlist_ids, **kwargs):
+        return [(d.playlist_id, d.position, d.id, d.reason, d.first_playlist_id, d.first_position)
+                for d in find_duplicates(self.sp, playlist_ids, **kwargs)]
+
+    def test_by_id_and_isrc(self):
+        self.assertEqual(self.duplicates(['p']), [('p', 2, 'a', 'id', 'p', 0), ('p', 3, 'c', 'isrc', 'p', 1)])
+
+    def test_by_id_only(self):
+        self.assertEqual(self.duplicates(['p'], isrc=False), [('p', 2, 'a', 'id', 'p', 0)])
+
+    def test_playlists_are_separate_unless_across(self):
+        self.assertEqual(self.duplicates(['p', 'q'])[2:], [])
+        self.assertEqual(self.duplicates(['p', 'q'], across=True)[2:], [('q', 0, 'd', 'id', 'p', 4)])
+
+    def test_pages_are_read_in_order(self):
+        positions = [(t.position, t.id) for t in dedupe.iter_tracks(self.sp, 'p', page_size=2)]
+        self.assertEqual(positions, [(0, 'a'), (1, 'b'), (2, 'a'), (3, 'c'), (4, 'd')])
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_missing_and_extra_matched_by_id_or_isrc(self):
+        sp = FakeClient({
+            'src': [('a', 'X1'), ('b', 'X2'), ('c', None), ('a', 'X1')],
+            'dst': [('z', 'X9'), ('b2', 'X2'), ('a', 'X1')],
+        })
+        changes = dedupe.diff(sp, 'src', 'dst')
+        self.assertEqual(changes.missing, ['spotify:track:c'])
+        self.assertEqual(changes.extra, [(0, 'spotify:track:z')])
+        self.assertEqual(changes.target_snapshot_id, 'dst-1')
+
+    def test_without_isrc_other_releases_differ(self):
+        sp = FakeClient({'src': [('b', 'X2')], 'dst': [('b2', 'X2')]})
+        changes = dedupe.diff(sp, 'src', 'dst', isrc=False)
+        self.assertEqual((changes.missing, changes.extra), (['spotify:track:b'], [(0, 'spotify:track:b2')]))
+
+    def test_identical_playlists_are_falsy(self):
+        sp = FakeClient({'src': [('a', 'X1')], 'dst': [('a', 'X1')]})
+        self.assertFalse(dedupe.diff(sp, 'src', 'dst'))
+
+
+class ParserTest(unittest.TestCase):
+
+    def test_documented_invocations_parse(self):
+        lines = [line.strip() for line in dedupe.__doc__.splitlines() if line.strip().startswith('python dedupe.py')]
+        self.assertTrue(lines)
+        parser = dedupe.build_parser()
+        for line in lines:
+            command = line.split('#')[0]
+            with self.subTest(command=command):
+                parser.parse_args(shlex.split(command)[2:])
+
+    def test_options_after_command(self):
+        parser = dedupe.build_parser()
+        args = parser.parse_args(['dedupe', 'Road Trip', '--apply', '--no-isrc'])
+        self.assertEqual(args.playlists, ['Road Trip'])
+        self.assertTrue(args.apply)
+        self.assertFalse(args.isrc)
+
+        args = parser.parse_args(['mirror', 'A', 'B', '--delete', '--apply'])
+        self.assertEqual((args.source, args.target, args.delete, args.apply), ('A', 'B', True, True))
+
+        args = parser.parse_args(['diff', 'A', 'B'])
+        self.assertFalse(args.apply)
+        self.assertTrue(args.isrc)
+
+
+if __name__ == '__main__':
+    unittest.main()
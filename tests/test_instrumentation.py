@@ -0,0 +1,27 @@
+import unittest
+
+from instrumentation import ClickLatency, endpoint_name
+
+
+class EndpointNameTest(unittest.TestCase):
+
+    def test_ids_are_collapsed(self):
+        self.assertEqual(endpoint_name('GET', 'https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks'),
+                         endpoint_name('GET', 'https://api.spotify.com/v1/playlists/0vvXsWCC9xrXsKd4FyS8kM/tracks'))
+
+
+class ClickLatencyTest(unittest.TestCase):
+
+    def test_summary_counts_clicks_over_budget(self):
+        clicks = ClickLatency(budget=0.016)
+        clicks.record('next_track', 0.004)
+        clicks.record('next_track', 0.020)
+        summary = clicks.summary()['next_track']
+        self.assertEqual((summary['count'], summary['slow']), (2, 1))
+        self.assertAlmostEqual(summary['mean_seconds'], 0.012)
+        self.assertAlmostEqual(summary['worst_seconds'], 0.020)
+        self.assertIn('ui_click_slow_total{click="next_track"} 1', clicks.to_prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from membership import MembershipIndex
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = MembershipIndex()
+        self.index.store('p', 'snap1', ['a', 'b'])
+
+    def test_own_write_on_current_entry_advances_snapshot(self):
+        self.index.add('p', ['c'], 'snap2', 'snap1')
+        self.assertEqual(self.index.snapshot_id('p'), 'snap2')
+        self.assertTrue(self.index.has('p', 'c', 'snap2'))
+
+        self.index.remove('p', ['a'], 'snap3', 'snap2')
+        self.assertEqual(self.index.snapshot_id('p'), 'snap3')
+        self.assertFalse(self.index.has('p', 'a', 'snap3'))
+
+    def test_write_after_someone_elses_edit_keeps_old_snapshot(self):
+        # snap1 -> (edit elsewhere) -> snapX -> (our add) -> snapY
+        self.index.add('p', ['c'], 'snapY', 'snapX')
+        self.assertEqual(self.index.snapshot_id('p'), 'snap1')
+        # Known to hold our track locally, but a snapshot-checked lookup must rescan
+        self.assertTrue(self.index.has('p', 'c'))
+        self.assertIsNone(self.index.has('p', 'c', 'snapY'))
+
+    def test_unindexed_playlist_is_left_alone(self):
+        self.index.add('q', ['c'], 'snap2', 'snap1')
+        self.assertIsNone(self.index.snapshot_id('q'))
+        self.assertEqual(self.index.playlists_containing('c'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
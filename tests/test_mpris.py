@@ -0,0 +1,39 @@
+import unittest
+
+from mpris import MprisSource, track_from_metadata
+
+
+class TrackFromMetadataTest(unittest.TestCase):
+
+    def test_current_and_older_track_ids(self):
+        metadata = {'mpris:trackid': ('o', '/com/spotify/track/4uLU6hMCjMI75M1A2tKUQC'),
+                    'xesam:title': ('s', 'Song'), 'xesam:artist': ('as', ['A', 'B'])}
+        self.assertEqual(track_from_metadata(metadata), ('4uLU6hMCjMI75M1A2tKUQC', 'Song - A, B'))
+        # Older clients send plain values and spotify: URIs
+        metadata = {'mpris:trackid': 'spotify:track:4uLU6hMCjMI75M1A2tKUQC', 'xesam:title': 'Song',
+                    'xesam:artist': ['A']}
+        self.assertEqual(track_from_metadata(metadata), ('4uLU6hMCjMI75M1A2tKUQC', 'Song - A'))
+
+    def test_ads_and_empty_players(self):
+        self.assertEqual(track_from_metadata({'mpris:trackid': ('o', '/com/spotify/ad/123')}), (None, None))
+        self.assertEqual(track_from_metadata({}), (None, None))
+
+    def test_episodes_are_not_tracks(self):
+        self.assertEqual(track_from_metadata({'mpris:trackid': ('o', '/com/spotify/episode/123')}), (None, None))
+
+
+class ApplyTest(unittest.TestCase):
+
+    def test_reports_only_what_changed(self):
+        tracks, states = [], []
+        source = MprisSource(on_track_changed=lambda *track: tracks.append(track), on_play_state=states.append)
+        source._apply({'PlaybackStatus': ('s', 'Paused')})
+        source._apply({'Metadata': ('a{sv}', {'mpris:trackid': ('o', '/com/spotify/track/abc'),
+                                              'xesam:title': ('s', 'Song'), 'xesam:artist': ('as', ['A'])}),
+                       'PlaybackStatus': ('s', 'Playing')})
+        self.assertEqual(tracks, [('abc', 'Song - A')])
+        self.assertEqual(states, [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
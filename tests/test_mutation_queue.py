@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+
+from cache_store import CacheStore
+from membership import MembershipIndex
+from mutation_queue import BATCH_SIZE, MutationQueue, plan_batches
+
+
+class Refused(Exception):
+    http_status = 403
+
+
+class FakeSpotify:
+
+    def __init__(self, online=True):
+        self.online = online
+        self.snapshot_reads = 0
+
+    def playlist(self, playlist_id, fields=None):
+        self.snapshot_reads += 1
+        if not self.online:
+            raise ConnectionError("offline")
+        return {'snapshot_id': 's1'}
+
+    def playlist_add_items(self, playlist_id, track_ids):
+        raise Refused("forbidden")
+
+
+class PlanBatchesTest(unittest.TestCase):
+
+    def test_groups_by_playlist_and_action(self):
+        rows = [(1, 'p', 'a', 'add'), (2, 'q', 'b', 'add'), (3, 'p', 'c', 'remove'), (4, 'p', 'd', 'add')]
+        self.assertEqual(plan_batches(rows), [
+            ('p', 'add', [(1, 'a'), (4, 'd')]),
+            ('q', 'add', [(2, 'b')]),
+            ('p', 'remove', [(3, 'c')]),
+        ])
+
+    def test_same_track_twice_keeps_its_order(self):
+        # A retry left an add and a later remove of the same track: the remove must go last
+        rows = [(1, 'p', 'a', 'add'), (2, 'p', 'b', 'remove'), (3, 'p', 'a', 'remove')]
+        self.assertEqual(plan_batches(rows), [
+            ('p', 'add', [(1, 'a')]),
+            ('p', 'remove', [(2, 'b')]),
+            ('p', 'remove', [(3, 'a')]),
+        ])
+
+    def test_chunks_large_batches(self):
+        rows = [(n, 'p', f't{n}', 'add') for n in range(BATCH_SIZE * 2 + 1)]
+        self.assertEqual([len(items) for _, _, items in plan_batches(rows)], [BATCH_SIZE, BATCH_SIZE, 1])
+
+
+class WaitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def make_queue(self, sp):
+        queue = MutationQueue(CacheStore(os.path.join(self.dir.name, 'cache.db')), sp, MembershipIndex(),
+                              batch_delay=0)
+        self.addCleanup(queue.stop)
+        return queue
+
+    def test_returns_refused_tracks(self):
+        queue = self.make_queue(FakeSpotify())
+        queue.enqueue_many('p', ['a', 'b'], 'add')
+        self.assertEqual(queue.wait('p', ['a', 'b'], timeout=5), (['a', 'b'], []))
+
+    def test_timeout_returns_tracks_still_queued(self):
+        queue = self.make_queue(FakeSpotify(online=False))
+        queue.enqueue_many('p', ['a', 'b'], 'add')
+        self.assertEqual(queue.wait('p', ['a', 'b'], timeout=0.2), ([], ['a', 'b']))
+
+
+class BackoffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_enqueues_do_not_cut_the_backoff_short(self):
+        sp = FakeSpotify(online=False)
+        queue = MutationQueue(CacheStore(os.path.join(self.dir.name, 'cache.db')), sp, MembershipIndex(),
+                              batch_delay=0, retry_delay=60)
+        self.addCleanup(queue.stop)
+        queue.enqueue('p', 'a', 'add')
+        time.sleep(0.1)
+        for track_id in 'bcd':
+            queue.enqueue('p', track_id, 'add')
+            time.sleep(0.05)
+        self.assertEqual(sp.snapshot_reads, 1)
+
+    def test_stop_interrupts_the_backoff(self):
+        queue = MutationQueue(CacheStore(os.path.join(self.dir.name, 'cache.db')), FakeSpotify(online=False),
+                              MembershipIndex(), batch_delay=0, retry_delay=60)
+        queue.enqueue('p', 'a', 'add')
+        time.sleep(0.1)
+        queue.stop()
+        queue._thread.join(1)
+        self.assertFalse(queue._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
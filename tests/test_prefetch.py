@@ -0,0 +1,61 @@
+import unittest
+
+from prefetch import UpcomingTracks
+
+
+def track(track_id):
+    return {'id': track_id, 'type': 'track'}
+
+
+class FakePlayer:
+    """Answers sp.queue() from a fixed play order."""
+
+    def __init__(self, order, position=0):
+        self.order = order
+        self.position = position
+        self.reads = 0
+
+    def queue(self):
+        self.reads += 1
+        return {'currently_playing': track(self.order[self.position]),
+                'queue': [track(t) for t in self.order[self.position + 1:self.position + 21]]}
+
+
+class UpcomingTracksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.order = [f't{n}' for n in range(100)]
+        self.player = FakePlayer(self.order)
+        self.upcoming = UpcomingTracks(refill_below=5)
+
+    def test_reads_the_queue_only_when_running_low(self):
+        for n in range(40):
+            self.player.position = n
+            upcoming = self.upcoming.advance(self.player, self.order[n])
+            self.assertEqual(upcoming[0], self.order[n + 1])
+        # 20 queued per read, refilled below 5: one read per 16 changes
+        self.assertEqual(self.player.reads, 3)
+        self.assertEqual(self.upcoming.stats()['predicted'], 39)
+
+    def test_skips_ahead_within_the_queue(self):
+        self.upcoming.advance(self.player, 't0')
+        self.player.position = 3
+        self.assertEqual(self.upcoming.advance(self.player, 't3')[:2], ['t4', 't5'])
+        self.assertEqual(self.player.reads, 1)
+
+    def test_rereads_when_the_player_leaves_the_queue(self):
+        self.upcoming.advance(self.player, 't0')
+        self.player.position = 50
+        self.assertEqual(self.upcoming.advance(self.player, 't50')[0], 't51')
+        self.assertEqual(self.player.reads, 2)
+
+    def test_player_already_past_the_track(self):
+        # The queue is read after the next track started: that track is still upcoming
+        self.player.position = 1
+        self.assertEqual(self.upcoming.advance(self.player, 't0')[:2], ['t1', 't2'])
+        self.upcoming.advance(self.player, 't1')
+        self.assertEqual(self.upcoming.stats()['predicted'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import requests
+
+from response_cache import ResponseCache
+
+URL = 'https://api.spotify.com/v1/playlists/p/tracks'
+
+
+def response(status=200, body=b'{}', etag='"v1"'):
+    r = requests.Response()
+    r.status_code = status
+    r._content = body
+    if etag:
+        r.headers['ETag'] = etag
+    r.headers['Content-Type'] = 'application/json'
+    return r
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_key(self):
+        cache = ResponseCache(exclude=['me/player'])
+        self.assertIsNone(cache.key('POST', URL, None, None))
+        self.assertIsNone(cache.key('GET', 'https://api.spotify.com/v1/me/player/queue', None, None))
+        # Parameter order and None values don't matter; tokens do
+        self.assertEqual(cache.key('GET', URL, {'limit': 100, 'offset': 0, 'fields': None}, None),
+                         cache.key('GET', URL, {'offset': 0, 'limit': 100}, None))
+        self.assertNotEqual(cache.key('GET', URL, None, {'Authorization': 'Bearer a'}),
+                            cache.key('GET', URL, None, {'Authorization': 'Bearer b'}))
+
+    def test_serve_turns_304_into_cached_200(self):
+        cache = ResponseCache()
+        key = cache.key('GET', URL, None, None)
+        cache.store(key, response(body=b'{"items": []}'))
+        self.assertEqual(cache.etag(key), '"v1"')
+
+        not_modified = response(304, b'', etag=None)
+        self.assertTrue(cache.serve(key, not_modified))
+        self.assertEqual((not_modified.status_code, not_modified.content), (200, b'{"items": []}'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertFalse(cache.serve(cache.key('GET', URL + '?other', None, None), response(304, b'')))
+
+    def test_errors_keep_the_cached_entry(self):
+        cache = ResponseCache()
+        key = cache.key('GET', URL, None, None)
+        cache.store(key, response())
+        for status in (429, 500, 404):
+            cache.store(key, response(status, b'error', etag=None))
+        self.assertEqual(cache.etag(key), '"v1"')
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_200_without_etag_drops_the_entry(self):
+        cache = ResponseCache()
+        key = cache.key('GET', URL, None, None)
+        cache.store(key, response())
+        cache.store(key, response(etag=None))
+        self.assertIsNone(cache.etag(key))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_evicts_least_recently_used_by_count_and_size(self):
+        cache = ResponseCache(max_entries=2, max_bytes=10)
+        keys = [cache.key('GET', f'{URL}/{n}', None, None) for n in range(3)]
+        cache.store(keys[0], response(body=b'aaaa'))
+        cache.store(keys[1], response(body=b'bbbb'))
+        cache.serve(keys[0], response(304, b''))  # keys[0] is now the most recently used
+        cache.store(keys[2], response(body=b'cccc'))
+        self.assertEqual([cache.etag(k) is not None for k in keys], [True, False, True])
+
+        cache.store(keys[1], response(body=b'dddddddd'))  # 8 + 4 + 4 bytes > 10: two evictions
+        self.assertEqual([cache.etag(k) is not None for k in keys], [False, True, False])
+        self.assertEqual(cache.stats()['evictions'], 3)
+        self.assertEqual(cache.stats()['bytes'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from scheduler import PollScheduler, retry_after
+
+
+def playing(duration_ms, progress_ms, is_playing=True):
+    return {'item': {'duration_ms': duration_ms}, 'progress_ms': progress_ms, 'is_playing': is_playing}
+
+
+class RateLimited(Exception):
+    http_status = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.headers = headers
+
+
+class NextDelayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(max_playing_interval=5.0, lead=0.5, settle=0.3,
+                                       idle_interval=2.0, max_idle_interval=10.0, burst_interval=0.5)
+
+    def test_wakes_just_before_the_track_ends(self):
+        self.assertEqual(self.scheduler.next_delay(playing(200_000, 197_000)), 2.5)
+        # Long tracks still get checked for manual skips
+        self.assertEqual(self.scheduler.next_delay(playing(200_000, 0)), 5.0)
+        # About to end: just after the next track should have started
+        self.assertAlmostEqual(self.scheduler.next_delay(playing(200_000, 199_800)), 0.5)
+
+    def test_idle_backs_off_up_to_the_cap(self):
+        delays = [self.scheduler.next_delay(playing(200_000, 0, is_playing=False)) for _ in range(5)]
+        self.assertEqual(delays, [2.0, 4.0, 8.0, 10.0, 10.0])
+        self.assertEqual(self.scheduler.next_delay(None), 10.0)
+
+    def test_playing_resets_the_idle_backoff(self):
+        self.scheduler.next_delay(None)
+        self.scheduler.next_delay(None)
+        self.scheduler.next_delay(playing(200_000, 0))
+        self.assertEqual(self.scheduler.next_delay(None), 2.0)
+
+    def test_burst_after_wake(self):
+        self.scheduler.next_delay(None)
+        self.scheduler.next_delay(None)
+        self.scheduler.wake(burst=2)
+        delays = [self.scheduler.next_delay(None) for _ in range(3)]
+        # Two quick polls, then idle backoff starts over
+        self.assertEqual(delays, [0.5, 0.5, 2.0])
+
+    def test_errors_back_off_and_honor_retry_after(self):
+        self.assertEqual(self.scheduler.on_error(ConnectionError()), 2.0)
+        self.assertEqual(self.scheduler.on_error(ConnectionError()), 4.0)
+        self.assertEqual(self.scheduler.on_error(RateLimited({'Retry-After': '30'})), 30.0)
+        self.assertEqual(self.scheduler.stats()['rate_limited'], 1)
+
+
+class RetryAfterTest(unittest.TestCase):
+
+    def test_values(self):
+        self.assertEqual(retry_after(RateLimited({'Retry-After': '7'})), 7.0)
+        self.assertEqual(retry_after(RateLimited({})), 5.0)
+        self.assertEqual(retry_after(RateLimited({'Retry-After': 'soon'})), 5.0)
+        self.assertIsNone(retry_after(ConnectionError()))
+
+
+if __name__ == '__main__':
+    unittest.main()
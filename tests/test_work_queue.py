@@ -0,0 +1,84 @@
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from work_queue import WorkQueue
+
+
+class SubmitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = WorkQueue("test-worker")
+        self.addCleanup(self.queue.stop)
+        self.ran = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.blocked = 0
+
+        def block():
+            self.blocked += 1
+            self.started.set()
+            self.release.wait(5)
+
+        # Hold the worker so the jobs below stay pending
+        self.block = block
+        self.queue.submit('block', block)
+        self.assertTrue(self.started.wait(5))
+
+    def record(self, value):
+        self.ran.append(value)
+
+    def drain(self):
+        """Release the worker and wait until everything queued so far has run."""
+        done = threading.Event()
+        self.queue.submit(None, done.set)
+        self.release.set()
+        self.assertTrue(done.wait(5))
+
+    def test_same_key_supersedes_and_moves_to_the_back(self):
+        self.queue.submit('check', self.record, 'old')
+        self.queue.submit('other', self.record, 'other')
+        self.queue.submit('check', self.record, 'new')
+        self.drain()
+        self.assertEqual(self.ran, ['other', 'new'])
+
+    def test_identical_pending_job_keeps_its_place(self):
+        self.queue.submit('check', self.record, 'a')
+        self.queue.submit('other', self.record, 'other')
+        self.queue.submit('check', self.record, 'a')
+        self.drain()
+        self.assertEqual(self.ran, ['a', 'other'])
+
+    def test_identical_to_running_job_is_dropped(self):
+        self.queue.submit('block', self.block)
+        self.queue.submit('block', self.record, 'changed')
+        self.drain()
+        self.assertEqual((self.blocked, self.ran), (1, ['changed']))
+
+    def test_none_key_never_coalesces(self):
+        for _ in range(3):
+            self.queue.submit(None, self.record, 'x')
+        self.drain()
+        self.assertEqual(self.ran, ['x', 'x', 'x'])
+
+    def test_cancel(self):
+        self.queue.submit('check', self.record, 'a')
+        self.queue.cancel('check')
+        self.drain()
+        self.assertEqual(self.ran, [])
+
+    def test_failing_job_does_not_stop_the_worker(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        self.queue.submit('fail', fail)
+        self.queue.submit('after', self.record, 'after')
+        with redirect_stdout(StringIO()) as output:
+            self.drain()
+        self.assertEqual(self.ran, ['after'])
+        self.assertIn("Error in background job fail: boom", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
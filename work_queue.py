@@ -0,0 +1,64 @@
+"""
+Single background worker for Spotify API calls.
+Work items are keyed: submitting a new item under a key replaces any pending
+item with that key, and an item identical to one already pending or running
+is dropped, so rapid track skips never pile up threads or duplicate requests.
+"""
+import threading
+from collections import OrderedDict
+
+
+class WorkQueue:
+    """Runs keyed jobs one at a time on a daemon thread."""
+
+    def __init__(self, name="spotify-worker"):
+        self._pending = OrderedDict()  # key -> (fn, args)
+        self._running = None  # (key, fn, args) of the job in progress
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, fn, *args):
+        """
+        Queue fn(*args) under key, superseding any stale job with the same key.
+        A key of None never coalesces: every such job runs.
+        """
+        if key is None:
+            key = object()
+        with self._cond:
+            if self._running == (key, fn, args) or self._pending.get(key) == (fn, args):
+                return
+            self._pending.pop(key, None)
+            self._pending[key] = (fn, args)
+            self._cond.notify()
+
+    def cancel(self, key):
+        """Drop the pending job for key, if any."""
+        with self._cond:
+            self._pending.pop(key, None)
+
+    def stop(self):
+        """Stop the worker after the current job; pending jobs are discarded."""
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                key, (fn, args) = self._pending.popitem(last=False)
+                self._running = (key, fn, args)
+
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in background job {key}: {e}")
+            finally:
+                with self._cond:
+                    self._running = None